@@ -22,6 +22,9 @@ import sys
 # Add project root to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from serialization import dumps_bytes
+from color_histogram import ColorHistogram
+
 try:
     from semantic_analyzer import SemanticAnalyzer, analyze_semantic
     SEMANTIC_AVAILABLE = True
@@ -185,7 +188,6 @@ class AtomBus:
     def _extract_colors(self, items: List[Dict]) -> Dict:
         """Extract and cluster colors from all items"""
         all_colors = []
-        color_weights = defaultdict(float)
         
         for item in items:
             semantic = item.get('semantic_analysis', {})
@@ -193,34 +195,35 @@ class AtomBus:
                 colors_data = semantic['colors']
                 if 'most_common' in colors_data:
                     for color_info in colors_data['most_common']:
-                        hex_color = color_info['hex']
-                        weight = color_info['percentage'] / 100.0
-                        
                         all_colors.append({
-                            'hex': hex_color,
+                            'hex': color_info['hex'],
                             'rgb': color_info['rgb'],
-                            'weight': weight,
+                            'weight': color_info['percentage'] / 100.0,
                             'saturation': color_info['saturation'],
                             'brightness': color_info['brightness'],
                             'hue': color_info['hue']
                         })
-                        
-                        color_weights[hex_color] += weight
         
-        # Sort by total weight across all images
+        if not all_colors:
+            return {'primary': [], 'all_extracted': [], 'total_unique': 0}
+        
+        # Total weight of each color across all images, heaviest first
+        color_weights = ColorHistogram.from_weights([c['rgb'] for c in all_colors],
+                                                    [c['weight'] for c in all_colors])
+        first_info = {}
+        for color_info in all_colors:
+            first_info.setdefault(tuple(color_info['rgb']), color_info)
+        
         weighted_colors = []
-        for color_hex, total_weight in sorted(color_weights.items(), 
-                                            key=lambda x: x[1], reverse=True):
-            # Find color info
-            color_info = next((c for c in all_colors if c['hex'] == color_hex), None)
-            if color_info:
-                color_info['total_weight'] = total_weight
-                weighted_colors.append(color_info)
+        for rgb, total_weight in color_weights.most_common(color_weights.unique_count):
+            color_info = first_info[rgb]
+            color_info['total_weight'] = total_weight
+            weighted_colors.append(color_info)
         
         return {
             'primary': weighted_colors[:8],
             'all_extracted': weighted_colors,
-            'total_unique': len(color_weights)
+            'total_unique': color_weights.unique_count
         }
     
     def _canonicalize_tags(self, items: List[Dict]) -> Dict:
@@ -480,8 +483,8 @@ class AtomBus:
         output_dir = Path(output_path).parent
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w') as f:
-            json.dump(atoms, f, indent=2, ensure_ascii=False)
+        with open(output_path, 'wb') as f:
+            f.write(dumps_bytes(atoms, indent=True))
 
 
 def main():
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Shared on-disk cache for image analyzer results.
+
+Style vectors, semantic analysis, deep source analysis, vibe mapping and brand
+intelligence are all pure functions of the image pixels plus a few
+parameters, yet every re-scan, style-analysis run or atom merge recomputed
+them from scratch. Decorating an analyzer with @cached_analysis stores its
+result under
+
+    (image sha256, analyzer name, analyzer version, sha256 of the other arguments)
+
+in a SQLite database (content/analysis_cache.db), so an unchanged image is
+never analyzed twice - not by the server, not by its worker processes, not
+by scripts. Bump an analyzer's version when its output changes.
+
+The cache is bounded: once it grows past CONCIERTO_ANALYSIS_CACHE_MB
+(default 512) the least recently used entries are evicted. Hit and miss
+counters are kept per process and added to the database's totals every
+STATS_FLUSH_SECONDS, and a hit refreshes its entry's last use only when that
+is LAST_USED_GRANULARITY old, so cache hits read the database without
+taking its write lock. Set
+CONCIERTO_ANALYSIS_CACHE=off to disable it, or to a path to move it.
+
+Results are shared by every file with the same pixels (renamed, replaced
+and duplicate uploads included), so the fields that describe one particular
+call - the image's path and when it was analyzed (STAMP_FIELDS) - are not
+stored: they are stamped afresh on every result the cache returns.
+"""
+
+import dataclasses
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import util as multiprocessing_util
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import ANALYZER_LOOKUPS, ANALYZER_SECONDS
+from scan_index import file_sha256
+from serialization import loads, pack, unpack
+
+# Next to the content library, wherever the caller runs from
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "content" / "analysis_cache.db"
+DEFAULT_MAX_MB = 512
+
+# Evict down to this fraction of the limit, so eviction doesn't run on every insert
+_EVICT_TO = 0.9
+# Hit and miss counts are added to the shared totals at most this often
+STATS_FLUSH_SECONDS = 30
+# A hit updates its entry's last_used only once the stored one is this old
+LAST_USED_GRANULARITY = 300
+# Image hashes remembered per process, by (path, size, mtime)
+HASH_MEMO_SIZE = 4096
+
+# Top-level result fields describing the call rather than the image, and how to restamp them
+STAMP_FIELDS = {
+    'analyzed_at': lambda image: datetime.now().isoformat(),
+    'file_path': str,
+    'source_path': str,
+}
+# Entry key listing the stamp fields a stored result had
+_STAMPED = '__stamped__'
+
+
+def _plain(value):
+    """json.dumps default: numpy values become Python values, anything else is rejected"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _param(value):
+    """json.dumps default for cache key parameters (dataclasses, numpy, anything else by repr)"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    try:
+        return _plain(value)
+    except TypeError:
+        return repr(value)
+
+
+class AnalysisCache:
+    """Size-bounded LRU of analyzer results keyed by image content"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._total_bytes = 0
+        self._hashes: 'OrderedDict[tuple, str]' = OrderedDict()
+        self._unflushed = {'hits': 0, 'misses': 0}
+        self._flushed_at = time.monotonic()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process: analysis worker processes are forked
+        # from the server and must not share its connection
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, analyzer TEXT NOT NULL, value BLOB NOT NULL, "
+                    "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used)")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            self._total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if self._pid is not None:
+                # Counted by the parent process, before it forked this one
+                self._unflushed = {'hits': 0, 'misses': 0}
+            self._pid = os.getpid()
+            # Runs at exit in the server and in pool worker processes alike
+            multiprocessing_util.Finalize(self, self.flush, exitpriority=10)
+        return self._conn
+
+    def image_hash(self, image_path) -> Optional[str]:
+        """sha256 of an image file, memoized on (path, size, mtime)"""
+        try:
+            st = os.stat(image_path)
+        except (OSError, TypeError, ValueError):
+            return None
+        stat_key = (os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(stat_key)
+            if digest is not None:
+                self._hashes.move_to_end(stat_key)
+                return digest
+        digest = file_sha256(image_path)
+        with self._lock:
+            self._hashes[stat_key] = digest
+            if len(self._hashes) > HASH_MEMO_SIZE:
+                self._hashes.popitem(last=False)
+        return digest
+
+    @staticmethod
+    def make_key(image_hash: str, analyzer: str, version, params: Dict) -> str:
+        # A digest of the parameters: they can be whole analysis dicts (existing_analysis)
+        params_json = json.dumps(params, sort_keys=True, default=_param)
+        params_hash = hashlib.sha256(params_json.encode('utf-8')).hexdigest()
+        return f"{image_hash}:{analyzer}:{version}:{params_hash}"
+
+    def _flush_stats(self, conn, force: bool = False):
+        """Add this process's unflushed hit and miss counts to the shared totals, when due"""
+        if not any(self._unflushed.values()):
+            return
+        if not force and time.monotonic() - self._flushed_at < STATS_FLUSH_SECONDS:
+            return
+        with conn:
+            for name, count in self._unflushed.items():
+                conn.execute(
+                    "INSERT INTO stats (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, count)
+                )
+        self._unflushed = {'hits': 0, 'misses': 0}
+        self._flushed_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Write out the unflushed hit and miss counts now"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                try:
+                    self._flush_stats(self._conn, force=True)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not save analysis cache stats: {e}")
+
+    def get(self, key: str):
+        """Cached result for a key, or None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, last_used FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._unflushed['misses'] += 1
+            else:
+                self.hits += 1
+                self._unflushed['hits'] += 1
+                now = time.time()
+                if now - row[1] >= LAST_USED_GRANULARITY:
+                    with conn:
+                        conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self._flush_stats(conn)
+            if row is None:
+                return None
+            # Entries are packed (msgpack or JSON bytes); plain JSON text is also accepted
+            return unpack(row[0]) if isinstance(row[0], bytes) else loads(row[0])
+
+    def put(self, key: str, analyzer: str, value) -> bool:
+        """Store a result; returns False if it cannot be serialized"""
+        try:
+            packed = pack(value)
+        except (TypeError, ValueError, OverflowError):
+            return False
+        size = len(packed) + len(key)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, analyzer, value, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)", (key, analyzer, packed, size, time.time())
+                )
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+        return True
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the cache is under the limit"""
+        with conn:
+            # Other processes write too; start from the real total
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            target = int(self.max_bytes * _EVICT_TO)
+            if total > self.max_bytes:
+                cutoff = None
+                for last_used, size in conn.execute("SELECT last_used, size FROM entries ORDER BY last_used"):
+                    if total <= target:
+                        break
+                    total -= size
+                    cutoff = last_used
+                if cutoff is not None:
+                    conn.execute("DELETE FROM entries WHERE last_used <= ?", (cutoff,))
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for this process and for the cache as a whole"""
+        with self._lock:
+            conn = self._connection()
+            self._flush_stats(conn, force=True)
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            totals = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        lookups = totals.get('hits', 0) + totals.get('misses', 0)
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+            'hit_rate': round(totals.get('hits', 0) / lookups, 3) if lookups else None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM entries")
+                conn.execute("DELETE FROM stats")
+            self._total_bytes = 0
+            self._unflushed = {'hits': 0, 'misses': 0}
+
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def analysis_cache() -> Optional[AnalysisCache]:
+    """The process-wide analysis cache, or None when CONCIERTO_ANALYSIS_CACHE=off"""
+    global _cache
+    setting = os.getenv('CONCIERTO_ANALYSIS_CACHE', '').strip()
+    if setting.lower() in ('off', '0', 'false', 'no'):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            max_mb = float(os.getenv('CONCIERTO_ANALYSIS_CACHE_MB', DEFAULT_MAX_MB))
+            _cache = AnalysisCache(setting or DEFAULT_CACHE_PATH, int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def _unstamped(result):
+    """A result without its STAMP_FIELDS, recording which it had"""
+    if not isinstance(result, dict):
+        return result
+    stamped = [name for name in STAMP_FIELDS if name in result]
+    if not stamped:
+        return result
+    entry = {k: v for k, v in result.items() if k not in STAMP_FIELDS}
+    entry[_STAMPED] = stamped
+    return entry
+
+
+def _restamp(entry, image):
+    """A stored result with its STAMP_FIELDS for this call"""
+    if not isinstance(entry, dict) or _STAMPED not in entry:
+        return entry
+    for name in entry.pop(_STAMPED):
+        entry[name] = STAMP_FIELDS[name](image)
+    return entry
+
+
+def cached_analysis(analyzer: str, version=1, image_arg: str = 'image_path',
+                    instance_params: Tuple[str, ...] = (),
+                    settings: Optional[Dict[str, Callable[[], Any]]] = None):
+    """
+    Cache an analyzer function or method by image content.
+
+    The wrapped callable must take the image file path, or an ImageContext
+    (see image_context.py), as `image_arg`; every other argument (except self) becomes part of the cache key, as do the
+    instance attributes named in `instance_params` for methods whose result
+    depends on how the analyzer was configured, and the current value of each
+    of `settings` (name -> callable) for results that depend on process-wide
+    configuration, such as the palette method. Results that
+    are None, contain an "error" key or cannot be stored as JSON are passed
+    through uncached, as are calls whose image path is not a readable file
+    (including contexts without a path, such as thumbnails).
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = analysis_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                image = bound.arguments[image_arg]
+                # An ImageContext is hashed by its file (path None: in memory, uncached)
+                image_hash = cache.image_hash(getattr(image, 'path', image))
+                if image_hash is None:
+                    return func(*args, **kwargs)
+                params = {k: v for k, v in bound.arguments.items() if k not in ('self', image_arg)}
+                for name in instance_params:
+                    params[f"self.{name}"] = getattr(bound.arguments['self'], name, None)
+                for name, setting in (settings or {}).items():
+                    params[f"setting.{name}"] = setting()
+                key = cache.make_key(image_hash, analyzer, version, params)
+                cached = cache.get(key)
+            except Exception as e:
+                print(f"⚠️ Analysis cache unavailable for {analyzer}: {e}")
+                return func(*args, **kwargs)
+            if cached is not None:
+                ANALYZER_LOOKUPS.inc(1, analyzer, 'hit')
+                return _restamp(cached, image)
+
+            ANALYZER_LOOKUPS.inc(1, analyzer, 'miss')
+            with ANALYZER_SECONDS.time(analyzer):
+                result = func(*args, **kwargs)
+            if result is not None and not (isinstance(result, dict) and 'error' in result):
+                try:
+                    cache.put(key, analyzer, _unstamped(result))
+                except Exception as e:
+                    print(f"⚠️ Could not cache {analyzer} result: {e}")
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
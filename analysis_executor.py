@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Process pool for CPU-bound image analysis.
+
+Style vectors (colour clustering) and semantic analysis take hundreds
+of milliseconds per image and hold the GIL, so running them inside an aiohttp
+handler froze the whole server - page loads and static files included - for
+the length of a scan. The server hands that work to a shared
+ProcessPoolExecutor instead and awaits the result with run_in_executor.
+
+Worker count comes from CONCIERTO_ANALYSIS_WORKERS (default: one less than the
+number of CPUs, at least one). Set it to 0 to run analysis on a background
+thread in the server process, e.g. where worker processes are unavailable.
+
+Where workers are started with spawn or forkserver (macOS, and Linux from
+Python 3.14), each one imports the server's main module again. Workers start
+in _init_worker and only import the analyzers, so that module must not do
+more on import than define things: simple_server builds its content manager
+in create_app() / init(), not at import time.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from metrics import ANALYSIS_SECONDS
+
+
+def default_worker_count() -> int:
+    """Worker processes to use when CONCIERTO_ANALYSIS_WORKERS is not set"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+# Analysis functions, imported on first use inside each worker process
+
+_style_vector = None
+_semantic = None
+
+
+def _analyzers():
+    """Import the optional analyzers once per process, mirroring simple_server's fallbacks"""
+    global _style_vector, _semantic
+    if _style_vector is None:
+        try:
+            from style_vector_fixed import analyze_style_vector
+        except ImportError:
+            try:
+                from style_vector import analyze_style_vector
+            except ImportError:
+                analyze_style_vector = False
+        _style_vector = analyze_style_vector
+    if _semantic is None:
+        try:
+            from semantic_analyzer import analyze_semantic
+        except ImportError:
+            analyze_semantic = False
+        _semantic = analyze_semantic
+    return _style_vector, _semantic
+
+
+def _init_worker():
+    """Worker process entry point: load the analyzers before the first job"""
+    _analyzers()
+
+
+def style_vector_fields(image_path: str) -> Optional[Dict[str, Any]]:
+    """Style vector item fields for one image (runs in a worker)"""
+    analyze_style_vector, _ = _analyzers()
+    if not analyze_style_vector:
+        return None
+    return analyze_style_vector(image_path)
+
+
+def analyze_image_fields(image_path: str, description: str = '') -> Dict[str, Any]:
+    """
+    Style vector and semantic analysis fields for a newly scanned image
+    (runs in a worker), as {'fields': {...}, 'errors': [...]}. Each analysis
+    is optional; one that fails leaves its fields out and adds its error
+    message. Both analyses share one decoded image.
+    """
+    analyze_style_vector, analyze_semantic = _analyzers()
+    name = os.path.basename(image_path)
+    fields = {}
+    errors = []
+    try:
+        from image_context import ImageContext
+        image = ImageContext.of(image_path)
+    except ImportError:
+        image = image_path
+
+    if analyze_style_vector:
+        try:
+            style_data = analyze_style_vector(image)
+            if style_data:
+                fields.update(style_data)
+                print(f"✨ Style vector analyzed for {name}")
+        except Exception as e:
+            print(f"⚠️ Style vector analysis failed for {name}: {e}")
+            errors.append(f"Style vector analysis failed: {e}")
+
+    if analyze_semantic:
+        try:
+            semantic_data = analyze_semantic(image, description)
+            if semantic_data and 'error' in semantic_data:
+                raise RuntimeError(semantic_data['error'])
+            if semantic_data:
+                fields['semantic_analysis'] = semantic_data
+
+                # Extract key colors for quick access
+                if 'colors' in semantic_data and 'most_common' in semantic_data['colors']:
+                    colors = semantic_data['colors']['most_common']
+                    if colors:
+                        fields['primary_color_actual'] = colors[0]['hex']
+                        if len(colors) > 1:
+                            fields['secondary_color_actual'] = colors[1]['hex']
+
+                print(f"🔍 Semantic analysis completed for {name}")
+        except Exception as e:
+            print(f"⚠️ Semantic analysis failed for {name}: {e}")
+            errors.append(f"Semantic analysis failed: {e}")
+
+    return {'fields': fields, 'errors': errors}
+
+
+class AnalysisExecutor:
+    """Lazily started pool that runs analysis functions off the event loop"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            configured = os.getenv('CONCIERTO_ANALYSIS_WORKERS', '').strip()
+            max_workers = int(configured) if configured else default_worker_count()
+        self.max_workers = max_workers
+        self._pool: Optional[Executor] = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.max_workers > 0:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+                print(f"⚙️ Analysis pool: {self.max_workers} worker processes")
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+                print("⚙️ Analysis pool: background thread (CONCIERTO_ANALYSIS_WORKERS=0)")
+        return self._pool
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a picklable, module-level function in the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        with ANALYSIS_SECONDS.time(func.__name__):
+            return await loop.run_in_executor(self.pool, func, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
@@ -7,7 +7,7 @@ Extracts meaning, structure, and specifications from images with contextual bran
 import numpy as np
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -23,6 +23,9 @@ except ImportError:
     ADVANCED_DEPS = False
 
 from style_vector import StyleVector, analyze_style_vector
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+from palette import default_method
 
 @dataclass
 class BrandContext:
@@ -166,23 +169,28 @@ class BrandIntelligenceEngine:
             }
         }
     
-    def analyze_comprehensive(self, image_path: str, description: str = "", 
+    @cached_analysis('brand_intelligence', version=3, instance_params=('brand_context',),
+                     settings={'palette_method': default_method})
+    def analyze_comprehensive(self, image_path: Union[str, ImageContext], description: str = "", 
                             existing_analysis: Dict = None, brand_context: BrandContext = None) -> Dict:
         """
         Perform comprehensive brand intelligence analysis
+        (image_path may be an ImageContext, decoded once for every step)
         """
         try:
+            context = ImageContext.of(image_path)
+            
             # Start with existing style vector analysis
             if existing_analysis and 'style_vector' in existing_analysis:
                 style_analysis = existing_analysis
             else:
-                style_analysis = analyze_style_vector(image_path)
+                style_analysis = analyze_style_vector(context)
             
             if not style_analysis:
                 return None
                 
             # Extract semantic meaning
-            semantic_analysis = self._analyze_semantics(image_path, description, 
+            semantic_analysis = self._analyze_semantics(context, description, 
                                                        style_analysis['style_vector'])
             
             # Generate design specifications
@@ -214,10 +222,10 @@ class BrandIntelligenceEngine:
             print(f"Error in comprehensive analysis: {e}")
             return existing_analysis
     
-    def _analyze_semantics(self, image_path: str, description: str, style_vector: Dict) -> Dict:
+    def _analyze_semantics(self, context: ImageContext, description: str, style_vector: Dict) -> Dict:
         """Extract semantic meaning from image and description"""
         try:
-            img = Image.open(image_path).convert('RGB')
+            img = context.image
             
             # Analyze composition structure
             composition = self._analyze_composition(img)
@@ -761,7 +769,7 @@ class BrandIntelligenceEngine:
 
 
 # Integration function for existing system
-def analyze_brand_intelligence(image_path: str, description: str = "", 
+def analyze_brand_intelligence(image_path: Union[str, ImageContext], description: str = "", 
                              brand_context: Optional[BrandContext] = None,
                              existing_analysis: Dict = None) -> Dict:
     """
@@ -7,7 +7,7 @@ Actually analyzes image content to generate meaningful specifications
 import numpy as np
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 from dataclasses import dataclass
 from datetime import datetime
 import colorsys
@@ -15,7 +15,7 @@ import re
 
 try:
     from PIL import Image, ImageFilter, ImageStat
-    from sklearn.cluster import KMeans, DBSCAN
+    from sklearn.cluster import DBSCAN
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.metrics.pairwise import cosine_similarity
     import cv2
@@ -25,6 +25,9 @@ except ImportError:
     ADVANCED_DEPS = False
 
 from style_vector import StyleVector, analyze_style_vector
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+from palette import default_method
 
 @dataclass
 class BrandContext:
@@ -70,21 +73,25 @@ class BrandIntelligenceEngine:
             'Outlaw': ['rebellious', 'revolutionary', 'wild', 'disruptive', 'authentic']
         }
     
-    def analyze_comprehensive(self, image_path: str, description: str = "", 
+    @cached_analysis('brand_intelligence_fixed', version=3, instance_params=('brand_context',),
+                     settings={'palette_method': default_method})
+    def analyze_comprehensive(self, image_path: Union[str, ImageContext], description: str = "", 
                             existing_analysis: Dict = None, brand_context: BrandContext = None) -> Dict:
-        """Perform comprehensive brand intelligence analysis"""
+        """Perform comprehensive brand intelligence analysis (image_path may be an ImageContext)"""
         try:
+            context = ImageContext.of(image_path)
+            
             # Start with existing style vector analysis
             if existing_analysis and 'style_vector' in existing_analysis:
                 style_analysis = existing_analysis
             else:
-                style_analysis = analyze_style_vector(image_path)
+                style_analysis = analyze_style_vector(context)
             
             if not style_analysis:
                 return existing_analysis or {}
             
-            # Load and analyze the actual image
-            img = Image.open(image_path).convert('RGB')
+            # Analyze the actual image, decoded once for both analyses
+            img = context.image
             
             # Extract REAL semantic meaning from the image
             semantic_analysis = self._analyze_image_semantics(img, description, style_analysis['style_vector'])
@@ -166,36 +173,8 @@ class BrandIntelligenceEngine:
     
     def _extract_meaningful_colors(self, img: Image) -> List[str]:
         """Extract and analyze actual dominant colors from image"""
-        # Convert to numpy array for analysis
-        img_array = np.array(img)
-        
-        # Reshape for clustering
-        pixels = img_array.reshape(-1, 3)
-        
-        # Use KMeans to find dominant colors
-        if ADVANCED_DEPS:
-            kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-            kmeans.fit(pixels)
-            colors = []
-            
-            for center in kmeans.cluster_centers_:
-                # Convert to hex
-                hex_color = '#{:02x}{:02x}{:02x}'.format(int(center[0]), int(center[1]), int(center[2]))
-                colors.append(hex_color)
-            
-            return colors
-        else:
-            # Fallback: sample colors from different regions
-            colors = []
-            h, w = img_array.shape[:2]
-            sample_points = [(h//4, w//4), (h//2, w//2), (3*h//4, 3*w//4)]
-            
-            for y, x in sample_points:
-                color = img_array[y, x]
-                hex_color = '#{:02x}{:02x}{:02x}'.format(color[0], color[1], color[2])
-                colors.append(hex_color)
-            
-            return colors
+        # Dominant colors clustered from the color histogram of every pixel
+        return ImageContext.of(img).palette(5).hex()
     
     def _analyze_real_composition(self, img: Image) -> Dict:
         """Analyze actual composition structure of the image"""
@@ -211,8 +190,7 @@ class BrandIntelligenceEngine:
             comp_type = "balanced_square"
             
         # Analyze visual weight distribution by examining pixel intensity
-        img_gray = img.convert('L')
-        img_array = np.array(img_gray)
+        img_array = ImageContext.of(img).luma
         
         # Divide image into 9 regions (rule of thirds)
         h, w = img_array.shape
@@ -836,8 +814,7 @@ class BrandIntelligenceEngine:
         """Analyze visual hierarchy using image processing"""
         try:
             # Convert to grayscale for analysis
-            gray = img.convert('L')
-            img_array = np.array(gray)
+            img_array = ImageContext.of(img).luma
             
             # Find areas of high contrast (likely focal points)
             if ADVANCED_DEPS:
@@ -940,14 +917,12 @@ class BrandIntelligenceEngine:
     
     def _calculate_contrast_level(self, img: Image) -> float:
         """Calculate overall contrast level of the image"""
-        gray = img.convert('L')
-        img_array = np.array(gray)
+        img_array = ImageContext.of(img).luma
         return float(np.std(img_array) / 127.5)  # Normalize to 0-1
     
     def _analyze_texture_complexity(self, img: Image) -> str:
         """Analyze texture complexity of the image"""
-        gray = img.convert('L')
-        img_array = np.array(gray)
+        img_array = ImageContext.of(img).luma
         
         # Use local standard deviation as texture measure
         from scipy import ndimage
@@ -986,8 +961,7 @@ class BrandIntelligenceEngine:
         elements = []
         
         # This is a simplified approach - in practice you'd use more sophisticated computer vision
-        gray = img.convert('L')
-        img_array = np.array(gray)
+        img_array = ImageContext.of(img).luma
         
         # Look for high contrast edges that might indicate geometric shapes
         if ADVANCED_DEPS:
@@ -1794,7 +1768,7 @@ p {
 
 
 # Integration function for existing system
-def analyze_brand_intelligence_fixed(image_path: str, description: str = "", 
+def analyze_brand_intelligence_fixed(image_path: Union[str, ImageContext], description: str = "", 
                                    brand_context: Optional[BrandContext] = None,
                                    existing_analysis: Dict = None) -> Dict:
     """
@@ -14,6 +14,9 @@ import base64
 class BrandPreviewGenerator:
     """Generates visual previews and exports for brand specifications"""
     
+    # Bump when the preview template or token output changes (invalidates cached renders)
+    RENDER_VERSION = 1
+    
     def __init__(self):
         self.spacing_scale = [4, 8, 12, 16, 20, 24, 32, 40, 48, 64, 80, 96]
         self.font_sizes = [12, 14, 16, 18, 20, 24, 32, 40, 48, 56, 64]
@@ -1179,7 +1182,7 @@ class BrandPreviewGenerator:
                     <a href="/#item-{img_id}" 
                        class="source-image-link"
                        title="{title}: {tooltip_description}">
-                        <img src="/{path}" 
+                        <img src="{f'/thumb/{img_id}?w=640' if img_id else f'/{path}'}" 
                              alt="{title}" 
                              class="mood-image">
                     </a>
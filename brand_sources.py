@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Source image references for synthesized brands.
+
+Brands used to embed a full copy of every source item (style vectors, semantic
+analysis, colour tables, ...) in "source_items", and every alternative copied
+them again. Stored brands now keep only "source_refs": the item ID plus the key
+of a content-addressed snapshot holding just the fields the brand preview and
+dashboard show. Identical snapshots are stored once, in the "source_snapshots"
+collection, and resolved back into "source_items" when a brand is read.
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from content_store import ContentStore
+
+# Item fields used by BrandPreviewGenerator and the dashboard brand cards
+PREVIEW_FIELDS = ('id', 'path', 'title', 'description')
+
+SNAPSHOT_COLLECTION = 'source_snapshots'
+
+
+def source_snapshot(item: Dict) -> Dict:
+    """The subset of an item that a brand needs to render its sources"""
+    return {field: item[field] for field in PREVIEW_FIELDS if field in item}
+
+
+def snapshot_key(snapshot: Dict) -> str:
+    """Content address of a snapshot"""
+    canonical = json.dumps(snapshot, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:24]
+
+
+def detach_sources(brand: Dict) -> Tuple[Dict, List[Dict]]:
+    """
+    Replace a brand's embedded source_items with references.
+
+    Returns:
+        (brand copy without source_items, snapshot records to store)
+    """
+    if 'source_items' not in brand:
+        return brand, []
+
+    refs = []
+    snapshots = []
+    for item in brand.get('source_items') or []:
+        snapshot = source_snapshot(item)
+        key = snapshot_key(snapshot)
+        refs.append({'item_id': item.get('id'), 'snapshot': key})
+        snapshots.append({'id': key, 'item': snapshot})
+    detached = {k: v for k, v in brand.items() if k != 'source_items'}
+    detached['source_refs'] = refs
+    return detached, snapshots
+
+
+def _detach_all(store: ContentStore, brands: Iterable[Dict]) -> List[Dict]:
+    """Detach sources from brands and store any snapshots not already stored"""
+    stored = []
+    new_snapshots = {}
+    for brand in brands:
+        detached, snapshots = detach_sources(brand)
+        stored.append(detached)
+        for snapshot in snapshots:
+            if snapshot['id'] not in new_snapshots and not store.get_record(SNAPSHOT_COLLECTION, snapshot['id']):
+                new_snapshots[snapshot['id']] = snapshot
+    store.add_records(SNAPSHOT_COLLECTION, list(new_snapshots.values()))
+    return stored
+
+
+def save_brands(store: ContentStore, brands: Iterable[Dict]) -> List[Dict]:
+    """
+    Store new brands with their sources detached into shared snapshots.
+
+    Returns:
+        The brand records as stored
+    """
+    stored = _detach_all(store, brands)
+    store.add_records('brands', stored)
+    return stored
+
+
+def put_brand(store: ContentStore, brand: Dict) -> Dict:
+    """Store a brand, replacing any brand with the same ID"""
+    stored = _detach_all(store, [brand])[0]
+    store.put_record('brands', stored)
+    return stored
+
+
+def resolve_sources(brand: Optional[Dict], store: ContentStore) -> Optional[Dict]:
+    """
+    Return the brand with "source_items" rebuilt from its references.
+
+    Brands that still embed source_items (or have no sources) are returned
+    unchanged. A missing snapshot falls back to the live item.
+    """
+    if not brand or 'source_refs' not in brand:
+        return brand
+
+    source_items = []
+    for ref in brand['source_refs']:
+        record = store.get_record(SNAPSHOT_COLLECTION, ref.get('snapshot'))
+        if record:
+            source_items.append(dict(record['item']))
+            continue
+        item = store.get_record('items', ref.get('item_id'))
+        if item:
+            source_items.append(source_snapshot(item))
+    return dict(brand, source_items=source_items)
+
+
+def migrate_brand_sources(store: ContentStore) -> int:
+    """
+    Convert stored brands that still embed full source_items.
+
+    Runs as a single document rewrite, and only when something needs
+    migrating. Returns the number of brands converted.
+    """
+    if not any('source_items' in b for b in store.snapshot().get('brands', [])):
+        return 0
+
+    data = store.load()
+    snapshots = {s['id']: s for s in data.get(SNAPSHOT_COLLECTION, [])}
+    migrated = 0
+    brands = []
+    for brand in data.get('brands', []):
+        if 'source_items' in brand:
+            brand, brand_snapshots = detach_sources(brand)
+            for snapshot in brand_snapshots:
+                snapshots.setdefault(snapshot['id'], snapshot)
+            migrated += 1
+        brands.append(brand)
+    data['brands'] = brands
+    data[SNAPSHOT_COLLECTION] = list(snapshots.values())
+    store.save(data)
+    return migrated
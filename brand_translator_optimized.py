@@ -13,6 +13,7 @@ from datetime import datetime
 import colorsys
 from deep_source_analyzer_optimized import DeepSourceAnalyzerOptimized
 from vibe_mapper_optimized import VibeMapperOptimized
+from image_context import ImageContext
 
 class BrandTranslatorOptimized:
     """
@@ -29,9 +30,10 @@ class BrandTranslatorOptimized:
         Fast source-to-brand translation with essential elements
         """
         try:
-            # Get optimized analyses
-            deep_analysis = self.deep_analyzer.analyze_source_material(image_path, description)
-            vibe_analysis = self.vibe_mapper.map_vibe_intensity(image_path, description)
+            # Get optimized analyses, sharing one decoded image
+            context = ImageContext.of(image_path)
+            deep_analysis = self.deep_analyzer.analyze_source_material(context, description)
+            vibe_analysis = self.vibe_mapper.map_vibe_intensity(context, description)
             
             if 'error' in deep_analysis or 'error' in vibe_analysis:
                 return {'error': 'Analysis failed'}
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Colour histograms over packed RGB values.
+
+The semantic analyzer counted colours with a Counter over a Python tuple per
+pixel: millions of tuples for a phone photo, and the deep source analyzer and
+vibe mapper asked for the same counts several times per image. ColorHistogram
+packs each pixel into one uint32 (r << 16 | g << 8 | b) and counts them in a
+single NumPy pass: np.bincount when the colours are quantized to few enough
+bins, np.unique on the packed values otherwise. binned_colors() likewise
+reduces an image to the mean colour and size of each bin, which is what the
+palette quantizers (palette.py) cluster.
+
+Quantizing to `bits` per channel keeps each channel's top bits, so a colour
+stands for its bin by the bin's lowest value, as (pixels // 32) * 32 did.
+Ranking matches Counter.most_common: by count, ties in order of first
+occurrence.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+# Up to this many bins are counted with np.bincount (6 bits per channel)
+BINCOUNT_MAX_BINS = 1 << 18
+
+
+def pack_rgb(rgb: np.ndarray) -> np.ndarray:
+    """(..., 3) RGB values 0-255 as uint32 r << 16 | g << 8 | b, shape (...)"""
+    rgb = np.asarray(rgb).astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def unpack_rgb(codes: np.ndarray) -> np.ndarray:
+    """Packed colours back to an (..., 3) uint8 array"""
+    codes = np.asarray(codes, dtype=np.uint32)
+    return np.stack([(codes >> 16) & 0xFF, (codes >> 8) & 0xFF, codes & 0xFF], axis=-1).astype(np.uint8)
+
+
+def _dense_bins(pixels: np.ndarray, bits: int) -> np.ndarray:
+    """Bin index of each (n, 3) pixel: its quantized channels packed next to each other"""
+    q = pixels >> (8 - bits)
+    return (q[:, 0].astype(np.intp) << (2 * bits)) | (q[:, 1].astype(np.intp) << bits) | q[:, 2]
+
+
+def _bin_colors(bins: np.ndarray, bits: int) -> np.ndarray:
+    """Packed lowest colour of each dense bin"""
+    shift, mask = 8 - bits, (1 << bits) - 1
+    r, g, b = bins >> (2 * bits), (bins >> bits) & mask, bins & mask
+    return ((r << (16 + shift)) | (g << (8 + shift)) | (b << shift)).astype(np.uint32)
+
+
+def binned_colors(pixels: np.ndarray, bits: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (mean colour, pixel count) of every occupied bin of (..., 3) integer
+    pixels quantized to bits per channel (at most 6): an (m, 3) float64 and
+    an (m,) int array, in bin order. Clustering these instead of the pixels
+    costs the same however large the image is.
+    """
+    if 1 << (3 * bits) > BINCOUNT_MAX_BINS:
+        raise ValueError(f"At most 6 bits per channel can be binned, not {bits}")
+    pixels = np.asarray(pixels).reshape(-1, 3)
+    bins = _dense_bins(pixels, bits)
+    counts = np.bincount(bins, minlength=1 << (3 * bits))
+    present = np.flatnonzero(counts)
+    sums = np.stack([np.bincount(bins, weights=pixels[:, channel], minlength=len(counts))[present]
+                     for channel in range(3)], axis=1)
+    return sums / counts[present, None], counts[present]
+
+
+class ColorHistogram:
+    """Counts (or weights) of distinct packed colours, ascending by colour"""
+
+    def __init__(self, colors: np.ndarray, counts: np.ndarray, codes: np.ndarray):
+        self.colors = colors      # distinct packed colours, ascending
+        self.counts = counts      # count (or total weight) of each
+        self._codes = codes       # packed colour of every sample, in order, for tie-breaking
+        self.total = counts.sum()
+
+    @classmethod
+    def of(cls, pixels: np.ndarray, bits: int = 8) -> 'ColorHistogram':
+        """Histogram of (..., 3) integer pixels 0-255, quantized to bits per channel"""
+        pixels = np.asarray(pixels).reshape(-1, 3)
+        shift = 8 - bits
+        if bits < 8:
+            pixels = (pixels >> shift) << shift
+        codes = pack_rgb(pixels)
+        if 1 << (3 * bits) <= BINCOUNT_MAX_BINS:
+            bins = _dense_bins(pixels, bits)
+            counts = np.bincount(bins, minlength=1 << (3 * bits))
+            present = np.flatnonzero(counts)
+            return cls(_bin_colors(present, bits), counts[present], codes)
+        colors, counts = np.unique(codes, return_counts=True)
+        return cls(colors, counts, codes)
+
+    @classmethod
+    def from_weights(cls, rgb, weights) -> 'ColorHistogram':
+        """Total weight of each distinct colour in a list of (colour, weight) samples"""
+        codes = pack_rgb(np.asarray(rgb, dtype=np.int64).reshape(-1, 3))
+        colors, inverse = np.unique(codes, return_inverse=True)
+        return cls(colors, np.bincount(inverse, weights=np.asarray(weights, dtype=np.float64),
+                                       minlength=len(colors)), codes)
+
+    @property
+    def unique_count(self) -> int:
+        return len(self.colors)
+
+    def _ranked(self, n: int) -> np.ndarray:
+        """Indexes of the n most common colours, by count then first occurrence"""
+        n = min(n, len(self.counts))
+        if n <= 0:
+            return np.zeros(0, dtype=np.intp)
+        cutoff = np.partition(self.counts, len(self.counts) - n)[len(self.counts) - n]
+        candidates = np.flatnonzero(self.counts >= cutoff)
+        # First position of each candidate colour among the samples
+        positions = np.flatnonzero(np.isin(self._codes, self.colors[candidates]))
+        seen, first = np.unique(self._codes[positions], return_index=True)
+        first_seen = positions[first][np.searchsorted(seen, self.colors[candidates])]
+        order = np.lexsort((first_seen, -self.counts[candidates]))
+        return candidates[order[:n]]
+
+    def top(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(rgb, counts, percentages of the total) of the n most common colours"""
+        index = self._ranked(n)
+        counts = self.counts[index]
+        percentages = counts / self.total * 100 if self.total else np.zeros(len(index))
+        return unpack_rgb(self.colors[index]), counts, percentages
+
+    def most_common(self, n: int) -> List[Tuple[Tuple[int, int, int], float]]:
+        """[((r, g, b), count)] like Counter.most_common"""
+        rgb, counts, _ = self.top(n)
+        return [(tuple(int(c) for c in color), count.item()) for color, count in zip(rgb, counts)]
+
+    def coverage(self, n: int) -> float:
+        """Percentage of the total covered by the n most common colours"""
+        return float(self.top(n)[2].sum())
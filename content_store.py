@@ -0,0 +1,1457 @@
+#!/usr/bin/env python3
+"""
+Content storage backends for Concierto.
+
+The content library (items, projects, campaigns, brands and the global tag list)
+has always lived in content/data.json, which is parsed and rewritten in full on
+every change. This module puts a small storage interface in front of that
+document so the server can run on either:
+
+- JSONContentStore: the original data.json file (default)
+- SQLiteContentStore: a transactional SQLite database where a single-field
+  update writes one row instead of the whole library
+- JournaledContentStore: data.json as a snapshot plus an append-only JSONL
+  journal of small operations, compacted in the background
+
+Select the backend with CONCIERTO_STORE=json|sqlite|journal (see .env.example). The
+first time the SQLite backend starts it migrates the existing data.json, and
+`python content_store.py export` writes a read-only data.json snapshot back
+out for scripts that still read the file directly.
+
+Stores returned by open_store()/shared_store() are wrapped in a process-wide,
+write-through CachedContentStore. Readers get immutable snapshots of the
+document without re-parsing it; the cache revalidates against the backend's
+stamp (file mtime/size/inode for data.json) so external edits are picked up.
+Only the SQLite backend is safe to share between processes (see
+`multiprocess_safe`): its writes take the database write lock before they
+read, so several server workers can write the same library.
+
+Every write bumps the document's "version" counter. Callers that read, await
+something slow (an OpenAI call, an analysis) and then write can commit inside
+`store.transaction(expected_version)`, which raises VersionConflict instead of
+silently overwriting a change made in the meantime. New records get
+time-ordered, collision-free IDs from new_record_id().
+"""
+
+import argparse
+import atexit
+import bisect
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from metrics import STORE_LOAD, STORE_WRITE
+from serialization import dumps, loads
+
+# Record collections stored in the content document. Every record has an "id".
+# source_snapshots holds the content-addressed item snapshots brands refer to
+# (see brand_sources.py).
+COLLECTIONS = ('items', 'projects', 'campaigns', 'brands', 'source_snapshots')
+
+
+def empty_document() -> Dict:
+    """Return a fresh, empty content document"""
+    return {"items": [], "tags": [], "version": 0, "last_updated": datetime.now().isoformat()}
+
+
+class VersionConflict(Exception):
+    """The document changed since the version a compare-and-swap commit expected"""
+
+    def __init__(self, expected: int, actual: int):
+        super().__init__(f"Content changed (expected version {expected}, found {actual})")
+        self.expected = expected
+        self.actual = actual
+
+
+# Crockford base32, as used by ULIDs
+_ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_ulid_lock = threading.Lock()
+_ulid_last = (0, 0)
+
+
+def new_record_id(prefix: str) -> str:
+    """
+    New record ID such as "img_01JAB3K8Z5Q7W2N4X6Y8C0D2E4".
+
+    The suffix is a ULID: a 48-bit millisecond timestamp followed by 80 random
+    bits. IDs generated within the same millisecond increment the random part,
+    so IDs from this process are unique and sort in creation order, unlike the
+    old "img_{len(items)+1}" scheme, which reused numbers after deletions and
+    collided when two requests created records at once.
+    """
+    global _ulid_last
+    with _ulid_lock:
+        millis = time.time_ns() // 1_000_000
+        last_millis, last_random = _ulid_last
+        if millis <= last_millis:
+            millis, randomness = last_millis, (last_random + 1) & ((1 << 80) - 1)
+        else:
+            randomness = secrets.randbits(80)
+        _ulid_last = (millis, randomness)
+    value = (millis << 80) | randomness
+    chars = []
+    for _ in range(26):
+        value, digit = divmod(value, 32)
+        chars.append(_ULID_ALPHABET[digit])
+    return f"{prefix}_{''.join(reversed(chars))}"
+
+
+def _next_version(data: Dict) -> int:
+    return int(data.get('version') or 0) + 1
+
+
+class ContentStore:
+    """
+    Storage interface for the content library.
+
+    `load()` and `save()` work on the whole document and are kept for callers
+    that genuinely need everything. Record-level operations default to a
+    load/modify/save cycle here; backends that can do better override them.
+    """
+
+    def exists(self) -> bool:
+        """Whether the store has been initialized"""
+        return True
+
+    def load(self) -> Dict:
+        """Load the whole content document"""
+        raise NotImplementedError
+
+    def save(self, data: Dict) -> None:
+        """Replace the whole content document"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store"""
+
+    def stamp(self) -> Any:
+        """
+        Cheap token that changes whenever the stored document changes outside
+        this process. None means the backend cannot tell.
+        """
+        return None
+
+    def snapshot(self) -> Dict:
+        """Read-only view of the whole document (see CachedContentStore)"""
+        return freeze(self.load())
+
+    @property
+    def version(self) -> int:
+        """Counter bumped by every write to the document"""
+        return int(self.snapshot().get('version') or 0)
+
+    def view(self) -> 'ContentView':
+        """The current snapshot with its index and stamp (see CachedContentStore.view)"""
+        snapshot = self.snapshot()
+        return ContentView(snapshot, ContentIndex(snapshot), self.stamp())
+
+    @contextmanager
+    def transaction(self, expected_version: Optional[int] = None):
+        """
+        Group writes, failing with VersionConflict if the document is no longer
+        at `expected_version`. Only CachedContentStore holds a lock across the
+        block; on a bare backend this is a plain check.
+        """
+        if expected_version is not None and self.version != expected_version:
+            raise VersionConflict(expected_version, self.version)
+        yield self
+
+    # Whether record-level operations write only the affected records
+    supports_partial_writes = False
+    # Whether several processes can write the store at once
+    multiprocess_safe = False
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Hold the backend's cross-process write lock, if it has one, so a read
+        and the writes after it see no other process's commits in between
+        """
+        yield
+
+    # Record-level operations
+
+    def count(self, collection: str) -> int:
+        """Number of records in a collection"""
+        return len(self.load().get(collection, []))
+
+    def get_record(self, collection: str, record_id: str) -> Optional[Dict]:
+        """Find a record by ID"""
+        for record in self.load().get(collection, []):
+            if record.get('id') == record_id:
+                return record
+        return None
+
+    def get_records(self, collection: str, record_ids: Iterable[str]) -> List[Dict]:
+        """Find records by ID, in the order given, skipping unknown IDs"""
+        by_id = {r.get('id'): r for r in self.load().get(collection, [])}
+        return [by_id[i] for i in record_ids if i in by_id]
+
+    def item_by_filename(self, filename: str) -> Optional[Dict]:
+        """Find the item for a file in content/images"""
+        return next((i for i in self.load().get('items', []) if i.get('filename') == filename), None)
+
+    def item_by_hash(self, content_hash: str) -> Optional[Dict]:
+        """Find the item for an image by the sha256 of its contents"""
+        return next((i for i in self.load().get('items', []) if i.get('content_hash') == content_hash), None)
+
+    def brands_newest_first(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """A page of brands ordered by created_at, newest first"""
+        brands = sorted(self.load().get('brands', []), key=_brand_order_key, reverse=True)
+        return brands[offset:None if limit is None else offset + limit]
+
+    def brand_counts(self) -> Dict[str, int]:
+        """Totals shown on the brand archive"""
+        brands = self.load().get('brands', [])
+        return {
+            'total': len(brands),
+            'with_insights': sum(1 for b in brands if b.get('synthesized_insights')),
+            'accessible': sum(1 for b in brands if (b.get('accessibility') or {}).get('passed')),
+        }
+
+    def items_in_project(self, project_id: str) -> List[Dict]:
+        """Items assigned to a project"""
+        return [i for i in self.load().get('items', []) if i.get('project_id') == project_id]
+
+    def campaign_items(self, campaign_id: str) -> List[Dict]:
+        """Items linked to a campaign's mood board, in link order"""
+        campaign = self.get_record('campaigns', campaign_id)
+        return self.get_records('items', campaign.get('linked_items', [])) if campaign else []
+
+    def add_records(self, collection: str, records: List[Dict]) -> None:
+        """Append new records to a collection"""
+        if not records:
+            return
+        data = self.load()
+        _apply_add(data, collection, records)
+        self.save(data)
+
+    def put_record(self, collection: str, record: Dict) -> None:
+        """Insert a record, replacing any existing record with the same ID"""
+        data = self.load()
+        _apply_put(data, collection, record)
+        self.save(data)
+
+    def update_records(self, collection: str, updates: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        Set fields on several records in one write.
+
+        Args:
+            collection: Collection name ("items", "campaigns", ...)
+            updates: Mapping of record ID to the fields to set on it
+
+        Returns:
+            Mapping of record ID to the updated record, for the IDs that exist
+        """
+        if not updates:
+            return {}
+        data = self.load()
+        updated = _apply_update(data, collection, updates)
+        if updated:
+            self.save(data)
+        return updated
+
+    def update_record(self, collection: str, record_id: str, fields: Dict) -> Optional[Dict]:
+        """Set fields on a single record. Returns the updated record or None."""
+        return self.update_records(collection, {record_id: fields}).get(record_id)
+
+    def link_items(self, campaign_id: str, item_ids: List[str], action: str = 'add') -> Optional[List[str]]:
+        """
+        Add or remove item IDs on a campaign's mood board.
+
+        Returns:
+            The campaign's new linked_items list, or None if the campaign does not exist
+        """
+        campaign = self.get_record('campaigns', campaign_id)
+        if campaign is None:
+            return None
+        linked = _linked_items(campaign.get('linked_items', []), item_ids, action)
+        self.update_record('campaigns', campaign_id, {
+            'linked_items': linked,
+            'updated_at': datetime.now().isoformat()
+        })
+        return linked
+
+    def export_json(self, path) -> int:
+        """Write the whole document to a JSON file. Returns bytes written."""
+        payload = dumps(self.load(), indent=True)
+        _atomic_write_text(Path(path), payload)
+        return len(payload)
+
+
+class JSONContentStore(ContentStore):
+    """The original single-file backend: content/data.json rewritten on save"""
+
+    def __init__(self, path="content/data.json"):
+        self.path = Path(path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def stamp(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def load(self) -> Dict:
+        try:
+            with open(self.path, 'rb') as f:
+                return loads(f.read())
+        except Exception:
+            return empty_document()
+
+    def save(self, data: Dict) -> None:
+        data["version"] = _next_version(data)
+        data["last_updated"] = datetime.now().isoformat()
+        _atomic_write_text(self.path, dumps(data, indent=True))
+
+
+# SQLite layout: each collection gets its own table. Frequently queried scalar
+# fields are real columns, list fields that are read whole are JSON columns, and
+# everything else (style vectors, semantic analysis, generated concepts, ...)
+# lives in the "extra" JSON column.
+_SQLITE_COLUMNS = {
+    'items': ('type', 'filename', 'title', 'path', 'project_id', 'notes',
+              'description', 'added_at', 'last_modified'),
+    'projects': ('name', 'description', 'created_at'),
+    'campaigns': ('name', 'client', 'status', 'created_at', 'updated_at'),
+    'brands': ('name', 'created_at'),
+    'source_snapshots': (),
+}
+_SQLITE_JSON_COLUMNS = {
+    'items': ('tags',),
+    'projects': (),
+    'campaigns': ('linked_items',),
+    'brands': (),
+    'source_snapshots': (),
+}
+_SQLITE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS items_filename ON items(filename)",
+    "CREATE INDEX IF NOT EXISTS items_project ON items(project_id)",
+    "CREATE INDEX IF NOT EXISTS brands_created ON brands(created_at)",
+)
+SQLITE_SCHEMA_VERSION = 1
+
+
+class SQLiteContentStore(ContentStore):
+    """
+    Transactional SQLite backend.
+
+    Mutations touch only the affected rows inside a single transaction, so
+    updating an item's notes writes one row rather than re-serializing the
+    whole library. The database runs in WAL mode so readers never block the
+    writer. Writes begin with BEGIN IMMEDIATE, taking the write lock before
+    reading, so read-modify-write updates are atomic across processes too.
+    """
+
+    supports_partial_writes = True
+    multiprocess_safe = True
+
+    def __init__(self, path="content/concierto.db"):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        # Other server workers may hold the write lock for a moment
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            for table, columns in _SQLITE_COLUMNS.items():
+                column_defs = ''.join(f", {c}" for c in columns + _SQLITE_JSON_COLUMNS[table])
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    f"id TEXT NOT NULL UNIQUE{column_defs}, "
+                    f"extra TEXT NOT NULL DEFAULT '{{}}')"
+                )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS tags (name TEXT PRIMARY KEY)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for statement in _SQLITE_INDEXES:
+                self._conn.execute(statement)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (dumps(SQLITE_SCHEMA_VERSION),)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stamp(self):
+        # data_version changes whenever another connection commits
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @contextmanager
+    def exclusive(self):
+        """Write transaction (joined by nested writes), committed on exit"""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            with self._conn:
+                yield
+
+    # Row <-> record conversion
+
+    def _split_record(self, collection: str, record: Dict) -> Dict[str, Any]:
+        """Split a record into column values plus the JSON "extra" blob"""
+        columns = _SQLITE_COLUMNS[collection]
+        json_columns = _SQLITE_JSON_COLUMNS[collection]
+        # Every column is present (NULL = absent) so an upsert clears stale values;
+        # an explicit None goes to "extra" so it survives the round trip
+        row = dict.fromkeys(('id',) + columns + json_columns)
+        row['id'] = record['id']
+        extra = {}
+        for key, value in record.items():
+            if key == 'id':
+                continue
+            if key in columns and _is_scalar(value) and value is not None:
+                row[key] = value
+            elif key in json_columns:
+                row[key] = dumps(value)
+            else:
+                extra[key] = value
+        row['extra'] = dumps(extra)
+        return row
+
+    def _row_to_record(self, collection: str, row: sqlite3.Row) -> Dict:
+        record = {'id': row['id']}
+        for column in _SQLITE_COLUMNS[collection]:
+            if row[column] is not None:
+                record[column] = row[column]
+        for column in _SQLITE_JSON_COLUMNS[collection]:
+            if row[column] is not None:
+                record[column] = loads(row[column])
+        record.update(loads(row['extra']))
+        return record
+
+    def _select(self, sql: str, params: Iterable = ()) -> List[sqlite3.Row]:
+        cursor = self._conn.execute(sql, tuple(params))
+        cursor.row_factory = sqlite3.Row
+        return cursor.fetchall()
+
+    def _insert(self, collection: str, record: Dict, replace: bool = False):
+        row = self._split_record(collection, record)
+        names = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        self._conn.execute(
+            f"{verb} INTO {collection} ({names}) VALUES ({placeholders})",
+            tuple(row.values())
+        )
+
+    def _touch(self):
+        """Stamp a write: set last_updated and bump the document version"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+            (dumps(datetime.now().isoformat()),)
+        )
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def _add_tags(self, records: Iterable[Dict]):
+        tags = {t for r in records for t in (r.get('tags') or []) if isinstance(t, str)}
+        self._conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(t,) for t in tags])
+
+    def _rebuild_tags(self):
+        self._conn.execute("DELETE FROM tags")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO tags (name) "
+            "SELECT DISTINCT j.value FROM items, json_each(items.tags) AS j "
+            "WHERE items.tags IS NOT NULL AND j.type = 'text'"
+        )
+
+    # Whole-document operations
+
+    def load(self) -> Dict:
+        with self._lock:
+            data = {}
+            for key, value in self._select("SELECT key, value FROM meta WHERE key != 'schema_version'"):
+                data[key] = loads(value)
+            for collection in COLLECTIONS:
+                rows = self._select(f"SELECT * FROM {collection} ORDER BY seq")
+                data[collection] = [self._row_to_record(collection, r) for r in rows]
+            data['tags'] = [r['name'] for r in self._select("SELECT name FROM tags ORDER BY name")]
+            data.setdefault('last_updated', datetime.now().isoformat())
+            return data
+
+    def save(self, data: Dict) -> None:
+        with self.exclusive():
+            for collection in COLLECTIONS:
+                self._conn.execute(f"DELETE FROM {collection}")
+                for record in data.get(collection, []):
+                    self._insert(collection, record, replace=True)
+            self._conn.execute("DELETE FROM tags")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tags (name) VALUES (?)",
+                [(t,) for t in data.get('tags', []) if isinstance(t, str)]
+            )
+            self._conn.execute("DELETE FROM meta WHERE key NOT IN ('schema_version', 'version')")
+            for key, value in data.items():
+                if key not in COLLECTIONS and key not in ('tags', 'version'):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        (key, dumps(value))
+                    )
+            # Continue from the stored version even if `data` was loaded earlier
+            stored = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (dumps(max(int(data.get('version') or 0), int(stored[0]) if stored else 0)),)
+            )
+            self._touch()
+            data['version'] = loads(
+                self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+    # Record-level operations
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {_table(collection)}").fetchone()[0]
+
+    def get_record(self, collection: str, record_id: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._select(f"SELECT * FROM {_table(collection)} WHERE id = ?", (record_id,))
+            return self._row_to_record(collection, rows[0]) if rows else None
+
+    def add_records(self, collection: str, records: List[Dict]) -> None:
+        if not records:
+            return
+        with self.exclusive():
+            for record in records:
+                self._insert(_table(collection), record)
+            if collection == 'items':
+                self._add_tags(records)
+            self._touch()
+
+    def put_record(self, collection: str, record: Dict) -> None:
+        with self.exclusive():
+            # Upsert keeps the record's position (seq) when it already exists
+            row = self._split_record(_table(collection), record)
+            names = ', '.join(row)
+            placeholders = ', '.join('?' for _ in row)
+            assignments = ', '.join(f"{k} = excluded.{k}" for k in row if k != 'id')
+            self._conn.execute(
+                f"INSERT INTO {collection} ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {assignments}",
+                tuple(row.values())
+            )
+            if collection == 'items':
+                self._add_tags([record])
+            self._touch()
+
+    def update_records(self, collection: str, updates: Dict[str, Dict]) -> Dict[str, Dict]:
+        if not updates:
+            return {}
+        table = _table(collection)
+        columns = _SQLITE_COLUMNS[table]
+        json_columns = _SQLITE_JSON_COLUMNS[table]
+        updated = {}
+        with self.exclusive():
+            for record_id, fields in updates.items():
+                rows = self._select(f"SELECT extra FROM {table} WHERE id = ?", (record_id,))
+                if not rows:
+                    continue
+                extra = loads(rows[0]['extra'])
+                assignments = {}
+                extra_changed = False
+                for key, value in fields.items():
+                    if key == 'id':
+                        continue
+                    if key in columns and _is_scalar(value):
+                        assignments[key] = value
+                        if value is None:
+                            extra[key] = None
+                            extra_changed = True
+                        elif key in extra:
+                            del extra[key]
+                            extra_changed = True
+                    elif key in json_columns:
+                        assignments[key] = dumps(value)
+                    else:
+                        extra[key] = value
+                        extra_changed = True
+                if extra_changed:
+                    assignments['extra'] = dumps(extra)
+                if assignments:
+                    set_clause = ', '.join(f"{k} = ?" for k in assignments)
+                    self._conn.execute(
+                        f"UPDATE {table} SET {set_clause} WHERE id = ?",
+                        (*assignments.values(), record_id)
+                    )
+                updated[record_id] = self._row_to_record(
+                    table, self._select(f"SELECT * FROM {table} WHERE id = ?", (record_id,))[0]
+                )
+            if updated:
+                if table == 'items' and any('tags' in f for f in updates.values()):
+                    self._rebuild_tags()
+                self._touch()
+        return updated
+
+
+class JournaledContentStore(ContentStore):
+    """
+    data.json snapshot plus an append-only operation journal.
+
+    Every mutation is appended to data.journal.jsonl as one small JSON line
+    (set, add, put, link) instead of rewriting the library, so a write costs
+    O(size of change). Lines are flushed to the OS immediately and fsync'ed in
+    groups by a background thread, at most `fsync_interval` seconds (or
+    `group_size` operations) after they were written.
+
+    The same thread compacts the journal into data.json once it grows past
+    `compact_bytes` or has held operations for `compact_seconds`. Each
+    operation carries a sequence number and the snapshot records the last one
+    it includes ("journal_seq"), so startup recovery replays exactly the
+    operations the snapshot is missing, and a crash part-way through a
+    compaction is harmless. A torn final line is discarded.
+
+    One process owns the journal; use the SQLite backend for several writers.
+    """
+
+    supports_partial_writes = True
+
+    def __init__(self, path="content/data.json", fsync_interval: float = 0.05,
+                 group_size: int = 64, compact_bytes: int = 1024 * 1024,
+                 compact_seconds: float = 60.0):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(f"{self.path.stem}.journal.jsonl")
+        self.fsync_interval = fsync_interval
+        self.group_size = group_size
+        self.compact_bytes = compact_bytes
+        self.compact_seconds = compact_seconds
+
+        self._lock = threading.RLock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._pending_fsync = 0
+        self._first_uncompacted = None
+        self._data, self._seq = self._recover()
+        self._journal = open(self.journal_path, 'a')
+
+        self._worker = threading.Thread(target=self._maintain, name="content-journal", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    # Recovery and compaction
+
+    def _recover(self):
+        """Load the snapshot and replay any journal operations it is missing"""
+        data = JSONContentStore(self.path).load() if self.path.exists() else empty_document()
+        seq = data.get('journal_seq', 0)
+        replayed = 0
+
+        if self.journal_path.exists():
+            valid_bytes = 0
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        op = loads(line)
+                    except ValueError:
+                        print(f"⚠️ Discarding torn journal entry in {self.journal_path}")
+                        break
+                    valid_bytes += len(line)
+                    if op['seq'] > seq:
+                        _apply_journal_op(data, op)
+                        data['version'] = _next_version(data)
+                        seq = op['seq']
+                        replayed += 1
+            if valid_bytes < self.journal_path.stat().st_size:
+                os.truncate(self.journal_path, valid_bytes)
+
+        if replayed:
+            print(f"📒 Replayed {replayed} journal operations over {self.path}")
+            self._write_snapshot(data, seq)
+        return data, seq
+
+    def _write_snapshot(self, data: Dict, seq: int):
+        """Atomically replace data.json, then drop the journal it now covers"""
+        data['journal_seq'] = seq
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(dumps(data, indent=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Operations up to `seq` are in the snapshot; anything left in the
+        # journal would be skipped on replay, so truncating is safe even if we
+        # crash before it happens.
+        with open(self.journal_path, 'w'):
+            pass
+        self._first_uncompacted = None
+
+    def compact(self) -> None:
+        """Fold the journal into the data.json snapshot now"""
+        with self._lock:
+            if self._first_uncompacted is None:
+                return
+            self._sync()
+            self._journal.close()
+            self._write_snapshot(self._data, self._seq)
+            self._journal = open(self.journal_path, 'a')
+
+    def _sync(self):
+        if self._pending_fsync:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._pending_fsync = 0
+
+    def _maintain(self):
+        """Background group-fsync and compaction loop"""
+        with self._lock:
+            while not self._closed:
+                self._wake.wait(self.fsync_interval)
+                if self._closed:
+                    break
+                try:
+                    self._sync()
+                    if self._first_uncompacted is not None and (
+                            self._journal.tell() >= self.compact_bytes or
+                            time.monotonic() - self._first_uncompacted >= self.compact_seconds):
+                        self.compact()
+                except Exception as e:
+                    print(f"⚠️ Content journal maintenance failed: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify_all()
+        self._worker.join()
+        with self._lock:
+            self.compact()
+            self._journal.close()
+
+    # Journal writes
+
+    def _append(self, op: Dict):
+        """Apply an operation in memory and append it to the journal"""
+        self._seq += 1
+        op['seq'] = self._seq
+        op['at'] = datetime.now().isoformat()
+        self._journal.write(dumps(op) + '\n')
+        self._journal.flush()
+        self._data['last_updated'] = op['at']
+        self._data['version'] = _next_version(self._data)
+        self._pending_fsync += 1
+        if self._first_uncompacted is None:
+            self._first_uncompacted = time.monotonic()
+        if self._pending_fsync >= self.group_size:
+            self._wake.notify()
+
+    # ContentStore interface
+
+    def exists(self) -> bool:
+        return True
+
+    def stamp(self):
+        # Single-writer store: only our own operations change the document
+        return self._seq
+
+    def load(self) -> Dict:
+        with self._lock:
+            return thaw(self._data)
+
+    def save(self, data: Dict) -> None:
+        # Replacing the whole document is written as a fresh snapshot
+        with self._lock:
+            self._sync()
+            self._seq += 1
+            data['version'] = _next_version(data)
+            data['last_updated'] = datetime.now().isoformat()
+            self._data = thaw(data)
+            self._first_uncompacted = time.monotonic()
+            self.compact()
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return len(self._data.get(collection, []))
+
+    def get_record(self, collection: str, record_id: str) -> Optional[Dict]:
+        with self._lock:
+            for record in self._data.get(collection, []):
+                if record.get('id') == record_id:
+                    return thaw(record)
+            return None
+
+    def add_records(self, collection: str, records: List[Dict]) -> None:
+        if not records:
+            return
+        with self._lock:
+            op = {'op': 'add', 'collection': _table(collection), 'records': thaw(records)}
+            _apply_journal_op(self._data, op)
+            self._append(op)
+
+    def put_record(self, collection: str, record: Dict) -> None:
+        with self._lock:
+            op = {'op': 'put', 'collection': _table(collection), 'record': thaw(record)}
+            _apply_journal_op(self._data, op)
+            self._append(op)
+
+    def update_records(self, collection: str, updates: Dict[str, Dict]) -> Dict[str, Dict]:
+        with self._lock:
+            existing = {r.get('id') for r in self._data.get(collection, [])}
+            updates = {k: thaw(v) for k, v in updates.items() if k in existing}
+            if not updates:
+                return {}
+            op = {'op': 'set', 'collection': _table(collection), 'updates': updates}
+            updated = _apply_journal_op(self._data, op)
+            self._append(op)
+            return {k: thaw(v) for k, v in updated.items()}
+
+    def link_items(self, campaign_id: str, item_ids: List[str], action: str = 'add') -> Optional[List[str]]:
+        with self._lock:
+            if self.get_record('campaigns', campaign_id) is None:
+                return None
+            op = {'op': 'link', 'campaign_id': campaign_id, 'item_ids': list(item_ids),
+                  'action': action, 'updated_at': datetime.now().isoformat()}
+            linked = _apply_journal_op(self._data, op)
+            self._append(op)
+            return list(linked)
+
+
+def _apply_journal_op(data: Dict, op: Dict):
+    """Apply one journal operation to a document in place"""
+    kind = op['op']
+    if kind == 'add':
+        return _apply_add(data, op['collection'], op['records'])
+    if kind == 'put':
+        return _apply_put(data, op['collection'], op['record'])
+    if kind == 'set':
+        return _apply_update(data, op['collection'], op['updates'])
+    if kind == 'link':
+        return _apply_link(data, op['campaign_id'], op['item_ids'], op['action'], op['updated_at'])
+    raise ValueError(f"Unknown journal operation: {kind}")
+
+
+class FrozenDict(dict):
+    """Read-only dict handed out in content snapshots. Still JSON-serializable."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("content snapshots are read-only; copy the record before modifying it")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """Read-only list handed out in content snapshots. Still JSON-serializable."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("content snapshots are read-only; copy the list before modifying it")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value):
+    """Recursively copy a JSON-like value into FrozenDict/FrozenList"""
+    if isinstance(value, FrozenDict) or isinstance(value, FrozenList):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Recursively copy a (possibly frozen) JSON-like value into plain dicts/lists"""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _brand_order_key(brand: Dict) -> tuple:
+    return (brand.get('created_at') or '', brand.get('id') or '')
+
+
+class ContentIndex:
+    """
+    Lookup tables over one content snapshot.
+
+    Built once when a snapshot is loaded, then patched for every mutation
+    that goes through CachedContentStore, so ID lookups and the common joins
+    (filename or content hash -> item, project -> items, campaign -> linked
+    items) are O(1) instead of scans over the library. Brands are also kept
+    in created_at order, so the archive can page through them.
+    """
+
+    def __init__(self, snapshot: Dict):
+        self.by_id: Dict[str, Dict[str, Dict]] = {}
+        self.positions: Dict[str, Dict[str, int]] = {}
+        self.item_by_filename: Dict[str, str] = {}
+        self.item_by_hash: Dict[str, str] = {}
+        self.items_by_project: Dict[str, Dict[str, None]] = {}
+        self.campaign_items: Dict[str, tuple] = {}
+        self.item_campaigns: Dict[str, set] = {}
+        self.brand_order: List[tuple] = []   # (created_at, id), oldest first
+        self.brands_with_insights: set = set()
+        self.accessible_brands: set = set()
+        for collection in COLLECTIONS:
+            self.by_id[collection] = {}
+            self.positions[collection] = {}
+            self.added(collection, snapshot.get(collection, []), 0)
+
+    def get(self, collection: str, record_id: str) -> Optional[Dict]:
+        return self.by_id.get(collection, {}).get(record_id)
+
+    def added(self, collection: str, records: Iterable[Dict], start: int):
+        """Index records appended at list position `start` onwards"""
+        by_id = self.by_id[collection]
+        positions = self.positions[collection]
+        for offset, record in enumerate(records):
+            record_id = record.get('id')
+            if record_id in by_id:
+                continue
+            by_id[record_id] = record
+            positions[record_id] = start + offset
+            self._link(collection, record)
+
+    def replaced(self, collection: str, old: Dict, new: Dict):
+        """Re-index a record that was replaced in place"""
+        self._unlink(collection, old)
+        self.by_id[collection][new['id']] = new
+        self._link(collection, new)
+
+    def _link(self, collection: str, record: Dict):
+        record_id = record.get('id')
+        if collection == 'items':
+            if record.get('filename'):
+                self.item_by_filename.setdefault(record['filename'], record_id)
+            if record.get('content_hash'):
+                self.item_by_hash.setdefault(record['content_hash'], record_id)
+            if record.get('project_id'):
+                self.items_by_project.setdefault(record['project_id'], {})[record_id] = None
+        elif collection == 'campaigns':
+            linked = tuple(record.get('linked_items') or ())
+            self.campaign_items[record_id] = linked
+            for item_id in linked:
+                self.item_campaigns.setdefault(item_id, set()).add(record_id)
+        elif collection == 'brands':
+            bisect.insort(self.brand_order, _brand_order_key(record))
+            if record.get('synthesized_insights'):
+                self.brands_with_insights.add(record_id)
+            if (record.get('accessibility') or {}).get('passed'):
+                self.accessible_brands.add(record_id)
+
+    def _unlink(self, collection: str, record: Dict):
+        record_id = record.get('id')
+        if collection == 'items':
+            if self.item_by_filename.get(record.get('filename')) == record_id:
+                del self.item_by_filename[record['filename']]
+            if self.item_by_hash.get(record.get('content_hash')) == record_id:
+                del self.item_by_hash[record['content_hash']]
+            self.items_by_project.get(record.get('project_id'), {}).pop(record_id, None)
+        elif collection == 'campaigns':
+            for item_id in self.campaign_items.pop(record_id, ()):
+                self.item_campaigns.get(item_id, set()).discard(record_id)
+        elif collection == 'brands':
+            key = _brand_order_key(record)
+            position = bisect.bisect_left(self.brand_order, key)
+            if position < len(self.brand_order) and self.brand_order[position] == key:
+                del self.brand_order[position]
+            self.brands_with_insights.discard(record_id)
+            self.accessible_brands.discard(record_id)
+
+
+@dataclass(frozen=True)
+class ContentView:
+    """
+    One snapshot together with its index and the backend stamp it was read at.
+
+    The index is shared with later snapshots and patched as records are
+    appended, so it may know IDs that this snapshot does not contain yet.
+    """
+    snapshot: Dict
+    index: ContentIndex
+    stamp: Any
+
+    @property
+    def version(self) -> int:
+        return int(self.snapshot.get('version') or 0)
+
+    def position(self, collection: str, record_id: str) -> Optional[int]:
+        """List position of a record in this snapshot, or None"""
+        position = self.index.positions.get(collection, {}).get(record_id)
+        records = self.snapshot.get(collection, [])
+        if position is None or position >= len(records) or records[position].get('id') != record_id:
+            return None
+        return position
+
+
+class CachedContentStore(ContentStore):
+    """
+    Write-through, in-memory cache in front of another store.
+
+    The whole document is held as one frozen snapshot that is shared by every
+    reader, together with a ContentIndex over it. Each read revalidates the
+    snapshot with the backend's stamp() (a single stat() for data.json) and
+    reloads only when the store changed outside this process.
+
+    Writes build the next snapshot here, sharing every record that did not
+    change, and patch the index. Backends with record-level writes (SQLite,
+    journal) then receive just the change; whole-document backends are handed
+    the new snapshot to save.
+    """
+
+    def __init__(self, backend: ContentStore):
+        self.backend = backend
+        self.supports_partial_writes = backend.supports_partial_writes
+        self.multiprocess_safe = backend.multiprocess_safe
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._index = None
+        self._stamp = None
+
+    def __getattr__(self, name):
+        # Expose backend details such as .path
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def exists(self) -> bool:
+        return self.backend.exists()
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def stamp(self):
+        return self.backend.stamp()
+
+    def invalidate(self) -> None:
+        """Drop the cached snapshot; the next read reloads from the backend"""
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stamp = self.backend.stamp()
+            if self._snapshot is None or stamp is None or stamp != self._stamp:
+                with STORE_LOAD.time(type(self.backend).__name__):
+                    self._snapshot = freeze(self.backend.load())
+                self._index = ContentIndex(self._snapshot)
+                self._stamp = stamp
+            return self._snapshot
+
+    @property
+    def index(self) -> ContentIndex:
+        """Index over the current snapshot"""
+        with self._lock:
+            self.snapshot()
+            return self._index
+
+    def view(self) -> ContentView:
+        """
+        The current snapshot, its index and stamp, taken under one lock so a
+        write from another thread cannot land between them
+        """
+        with self._lock:
+            snapshot = self.snapshot()
+            return ContentView(snapshot, self._index, self._stamp)
+
+    def load(self) -> Dict:
+        """Mutable copy of the document, for callers that modify and save it"""
+        return thaw(self.snapshot())
+
+    def exclusive(self):
+        return self.backend.exclusive()
+
+    @contextmanager
+    def _writing(self):
+        """
+        Hold both write locks and revalidate, so the next snapshot is built
+        from the latest document even if another process just wrote it
+        """
+        with self._lock, self.backend.exclusive():
+            self.snapshot()
+            yield
+
+    def save(self, data: Dict) -> None:
+        with self._lock:
+            # Backends stamp `data` with the new version and last_updated
+            with STORE_WRITE.time(type(self.backend).__name__, 'save'):
+                self.backend.save(data)
+            self._snapshot = freeze(data)
+            self._index = ContentIndex(self._snapshot)
+            self._stamp = self.backend.stamp()
+
+    def _commit(self, operation: str, changes: Dict, write_backend):
+        """
+        Persist the next snapshot: `changes` are the replaced top-level keys and
+        `write_backend` performs the record-level write on partial backends.
+        """
+        document = dict(self._snapshot)
+        document.update(changes)
+        with STORE_WRITE.time(type(self.backend).__name__, operation):
+            if self.supports_partial_writes:
+                write_backend()
+                # Mirror the version bump and timestamp the backend just wrote
+                document['version'] = _next_version(document)
+                document['last_updated'] = datetime.now().isoformat()
+            else:
+                self.backend.save(document)
+        self._snapshot = FrozenDict(document)
+        self._stamp = self.backend.stamp()
+
+    @contextmanager
+    def transaction(self, expected_version: Optional[int] = None):
+        """
+        Hold the write lock across a group of writes (compare-and-swap).
+
+        Raises VersionConflict if the document is no longer at
+        `expected_version` - typically the version read before awaiting
+        something slow - so the caller can re-read and retry rather than
+        overwrite a concurrent change. The check revalidates against the
+        backend stamp first, so for SQLite it also sees other processes'
+        commits, and holds SQLite's write lock so the check stays true for
+        the whole block. Never await inside the block: it holds a thread lock.
+        """
+        with self._writing():
+            if expected_version is not None and self._snapshot.get('version', 0) != expected_version:
+                raise VersionConflict(expected_version, self._snapshot.get('version', 0))
+            yield self
+
+    # Record-level operations
+
+    def count(self, collection: str) -> int:
+        return len(self.snapshot().get(collection, []))
+
+    def get_record(self, collection: str, record_id: str) -> Optional[Dict]:
+        return self.index.get(collection, record_id)
+
+    def get_records(self, collection: str, record_ids: Iterable[str]) -> List[Dict]:
+        index = self.index
+        return [r for r in (index.get(collection, i) for i in record_ids) if r is not None]
+
+    def item_by_filename(self, filename: str) -> Optional[Dict]:
+        index = self.index
+        return index.get('items', index.item_by_filename.get(filename))
+
+    def item_by_hash(self, content_hash: str) -> Optional[Dict]:
+        index = self.index
+        return index.get('items', index.item_by_hash.get(content_hash))
+
+    def brands_newest_first(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        order = self.index.brand_order
+        end = len(order) - offset
+        if end <= 0:
+            return []
+        start = 0 if limit is None else max(0, end - limit)
+        return self.get_records('brands', [record_id for _, record_id in reversed(order[start:end])])
+
+    def brand_counts(self) -> Dict[str, int]:
+        index = self.index
+        return {
+            'total': len(index.brand_order),
+            'with_insights': len(index.brands_with_insights),
+            'accessible': len(index.accessible_brands),
+        }
+
+    def items_in_project(self, project_id: str) -> List[Dict]:
+        index = self.index
+        return self.get_records('items', index.items_by_project.get(project_id, {}))
+
+    def campaign_items(self, campaign_id: str) -> List[Dict]:
+        index = self.index
+        return self.get_records('items', index.campaign_items.get(campaign_id, ()))
+
+    def add_records(self, collection: str, records: List[Dict]) -> None:
+        if not records:
+            return
+        with self._writing():
+            current = self._snapshot.get(collection, [])
+            frozen = [freeze(r) for r in records]
+            changes = {collection: FrozenList(list(current) + frozen)}
+            if collection == 'items':
+                changes['tags'] = _merged_tag_list(self._snapshot.get('tags', []), frozen)
+            self._commit('add_records', changes, lambda: self.backend.add_records(collection, records))
+            self._index.added(collection, frozen, len(current))
+
+    def put_record(self, collection: str, record: Dict) -> None:
+        with self._writing():
+            if self._index.get(collection, record['id']) is None:
+                return self.add_records(collection, [record])
+            frozen = freeze(record)
+            changes = {collection: self._swap(collection, {record['id']: frozen})}
+            if collection == 'items':
+                changes['tags'] = _merged_tag_list(self._snapshot.get('tags', []), [frozen])
+            old = self._index.get(collection, record['id'])
+            self._commit('put_record', changes, lambda: self.backend.put_record(collection, record))
+            self._index.replaced(collection, old, frozen)
+
+    def update_records(self, collection: str, updates: Dict[str, Dict]) -> Dict[str, Dict]:
+        with self._writing():
+            old = {k: self._index.get(collection, k) for k in updates}
+            old = {k: v for k, v in old.items() if v is not None}
+            if not old:
+                return {}
+            updated = {k: FrozenDict({**v, **freeze(updates[k])}) for k, v in old.items()}
+            changes = {collection: self._swap(collection, updated)}
+            if collection == 'items' and any('tags' in updates[k] for k in updated):
+                changes['tags'] = _merged_tag_list([], changes[collection])
+            self._commit('update_records', changes, lambda: self.backend.update_records(
+                collection, {k: updates[k] for k in updated}))
+            for record_id, record in updated.items():
+                self._index.replaced(collection, old[record_id], record)
+            return updated
+
+    def link_items(self, campaign_id: str, item_ids: List[str], action: str = 'add') -> Optional[List[str]]:
+        with self._writing():
+            campaign = self._index.get('campaigns', campaign_id)
+            if campaign is None:
+                return None
+            linked = _linked_items(campaign.get('linked_items', []), item_ids, action)
+            updated = FrozenDict({**campaign, 'linked_items': FrozenList(linked),
+                                  'updated_at': datetime.now().isoformat()})
+            changes = {'campaigns': self._swap('campaigns', {campaign_id: updated})}
+            self._commit('link_items', changes, lambda: self.backend.link_items(campaign_id, item_ids, action))
+            self._index.replaced('campaigns', campaign, updated)
+            return linked
+
+    def _swap(self, collection: str, replacements: Dict[str, Dict]) -> FrozenList:
+        """Copy of a collection list with records replaced at their indexed positions"""
+        records = list(self._snapshot.get(collection, []))
+        positions = self._index.positions[collection]
+        for record_id, record in replacements.items():
+            records[positions[record_id]] = record
+        return FrozenList(records)
+
+    def export_json(self, path) -> int:
+        return self.backend.export_json(path)
+
+
+def _merged_tag_list(tags: Iterable[str], records: Iterable[Dict]) -> FrozenList:
+    all_tags = set(tags)
+    for record in records:
+        all_tags.update(record.get('tags') or [])
+    return FrozenList(sorted(all_tags))
+
+
+_shared_stores: Dict[Any, CachedContentStore] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_store(store_class, path) -> CachedContentStore:
+    """
+    Process-wide cached store for a backend class and path.
+
+    Every caller asking for the same file gets the same CachedContentStore,
+    so the document is parsed once per process rather than once per request.
+    """
+    key = (store_class, Path(path).resolve())
+    with _shared_lock:
+        if key not in _shared_stores:
+            _shared_stores[key] = CachedContentStore(store_class(path))
+        return _shared_stores[key]
+
+
+def _table(collection: str) -> str:
+    """Validate a collection name before it is interpolated into SQL"""
+    if collection not in COLLECTIONS:
+        raise ValueError(f"Unknown collection: {collection}")
+    return collection
+
+
+def _is_scalar(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _linked_items(current: List[str], item_ids: List[str], action: str) -> List[str]:
+    """Apply an add/remove of item IDs to a campaign's linked_items list"""
+    linked = list(current)
+    if action == 'add':
+        # Add items (avoid duplicates)
+        for item_id in item_ids:
+            if item_id not in linked:
+                linked.append(item_id)
+    elif action == 'remove':
+        linked = [item_id for item_id in linked if item_id not in item_ids]
+    return linked
+
+
+# In-place document mutations shared by the whole-document backends and by
+# journal replay.
+
+def _apply_add(data: Dict, collection: str, records: List[Dict]):
+    data.setdefault(collection, []).extend(records)
+    if collection == 'items':
+        _merge_tags(data, records)
+
+
+def _apply_put(data: Dict, collection: str, record: Dict):
+    records = data.setdefault(collection, [])
+    for position, existing in enumerate(records):
+        if existing.get('id') == record['id']:
+            records[position] = record
+            break
+    else:
+        records.append(record)
+    if collection == 'items':
+        _merge_tags(data, [record])
+
+
+def _apply_update(data: Dict, collection: str, updates: Dict[str, Dict]) -> Dict[str, Dict]:
+    updated = {}
+    for record in data.get(collection, []):
+        fields = updates.get(record.get('id'))
+        if fields is not None:
+            record.update(fields)
+            updated[record['id']] = record
+    if updated and collection == 'items' and any('tags' in f for f in updates.values()):
+        _rebuild_tags(data)
+    return updated
+
+
+def _apply_link(data: Dict, campaign_id: str, item_ids: List[str], action: str,
+                updated_at: str) -> Optional[List[str]]:
+    for campaign in data.get('campaigns', []):
+        if campaign.get('id') == campaign_id:
+            campaign['linked_items'] = _linked_items(campaign.get('linked_items', []), item_ids, action)
+            campaign['updated_at'] = updated_at
+            return campaign['linked_items']
+    return None
+
+
+def _merge_tags(data: Dict, records: Iterable[Dict]):
+    """Add tags from new records to the document's global tag list"""
+    all_tags = set(data.get('tags', []))
+    for record in records:
+        all_tags.update(record.get('tags', []))
+    data['tags'] = sorted(all_tags)
+
+
+def _rebuild_tags(data: Dict):
+    """Recompute the document's global tag list from its items"""
+    all_tags = set()
+    for item in data.get('items', []):
+        all_tags.update(item.get('tags', []))
+    data['tags'] = sorted(all_tags)
+
+
+def _atomic_write_text(path: Path, text: str):
+    """Write a file via a temporary sibling so readers never see a partial file"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def migrate_json_to_sqlite(json_path="content/data.json", db_path="content/concierto.db",
+                           overwrite: bool = False) -> Dict[str, int]:
+    """
+    One-shot migration of data.json into a SQLite store.
+
+    Returns:
+        Record counts per collection
+    """
+    json_path, db_path = Path(json_path), Path(db_path)
+    if not json_path.exists():
+        raise FileNotFoundError(f"No data file at {json_path}")
+    if db_path.exists() and not overwrite:
+        raise FileExistsError(f"{db_path} already exists (use overwrite=True to replace it)")
+
+    data = JSONContentStore(json_path).load()
+    store = SQLiteContentStore(db_path)
+    try:
+        store.save(data)
+        return {c: store.count(c) for c in COLLECTIONS}
+    finally:
+        store.close()
+
+
+def open_store(backend: Optional[str] = None, content_dir="content") -> CachedContentStore:
+    """
+    Open the configured content store (shared and cached per process).
+
+    Args:
+        backend: "json", "sqlite" or "journal". Defaults to $CONCIERTO_STORE, then "json".
+        content_dir: Directory holding data.json / concierto.db
+    """
+    backend = (backend or os.getenv('CONCIERTO_STORE') or 'json').strip().lower()
+    content_dir = Path(content_dir)
+    json_path = content_dir / "data.json"
+
+    if backend == 'json':
+        return shared_store(JSONContentStore, json_path)
+
+    if backend == 'journal':
+        return shared_store(JournaledContentStore, json_path)
+
+    if backend == 'sqlite':
+        db_path = content_dir / "concierto.db"
+        if not db_path.exists() and json_path.exists():
+            counts = migrate_json_to_sqlite(json_path, db_path)
+            print(f"🗄️ Migrated {json_path} to {db_path}: {counts}")
+        return shared_store(SQLiteContentStore, db_path)
+
+    raise ValueError(f"Unknown content store backend: {backend}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Concierto content store")
+    parser.add_argument('--content-dir', default='content', help='Content directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help='Migrate data.json into SQLite')
+    migrate.add_argument('--overwrite', action='store_true', help='Replace an existing database')
+
+    export = subparsers.add_parser('export', help='Export the SQLite store to a read-only JSON file')
+    export.add_argument('--output', help='Output path (default: <content-dir>/data.json)')
+
+    args = parser.parse_args()
+    content_dir = Path(args.content_dir)
+
+    if args.command == 'migrate':
+        counts = migrate_json_to_sqlite(content_dir / "data.json", content_dir / "concierto.db",
+                                        overwrite=args.overwrite)
+        print(f"✅ Migrated: {counts}")
+    elif args.command == 'export':
+        output = Path(args.output) if args.output else content_dir / "data.json"
+        store = SQLiteContentStore(content_dir / "concierto.db")
+        try:
+            size = store.export_json(output)
+        finally:
+            store.close()
+        output.chmod(0o444)
+        print(f"✅ Exported {size:,} bytes to {output} (read-only)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,13 @@ texture qualities, spatial relationships, and cultural signals from source image
 import numpy as np
 from PIL import Image, ImageFilter, ImageEnhance
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-import colorsys
+from typing import Dict, List, Optional, Tuple, Union
 import json
 from datetime import datetime
 from semantic_analyzer import SemanticAnalyzer
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+import imageops
 
 try:
     from sklearn.cluster import KMeans
@@ -31,9 +33,11 @@ class DeepSourceAnalyzer:
     def __init__(self):
         self.semantic_analyzer = SemanticAnalyzer()
         
-    def analyze_source_material(self, image_path: str, description: str = "") -> Dict:
+    @cached_analysis('deep_source', version=3)
+    def analyze_source_material(self, image_path: Union[str, ImageContext], description: str = "") -> Dict:
         """
         Comprehensive analysis of source material for brand DNA extraction
+        (image_path may be an ImageContext, shared with the semantic analysis)
         
         Returns:
             - Basic semantic analysis
@@ -44,15 +48,15 @@ class DeepSourceAnalyzer:
             - Brand DNA fingerprint
         """
         try:
-            # Get basic semantic analysis first
-            base_analysis = self.semantic_analyzer.analyze_image(image_path, description)
+            # Get basic semantic analysis first, on the same decoded image
+            context = ImageContext.of(image_path)
+            base_analysis = self.semantic_analyzer.analyze_image(context, description)
             
             if 'error' in base_analysis:
                 return base_analysis
             
-            # Load image for deep analysis
-            img = Image.open(image_path).convert('RGB')
-            img_array = np.array(img)
+            img = context.image
+            img_array = context.rgb
             
             # Deep brand analysis
             analysis = {
@@ -110,18 +114,9 @@ class DeepSourceAnalyzer:
         sample_size = min(2000, h * w)
         
         # Get color harmony patterns
-        harmonies = []
-        saturations = []
-        hue_distances = []
-        
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            hue, sat, val = colorsys.rgb_to_hsv(r, g, b)
-            
-            saturations.append(sat)
-            harmonies.append(hue)
+        hsv = ImageContext.of(img_array).sample_hsv(sample_size)
+        harmonies = hsv[:, 0].tolist()
+        saturations = hsv[:, 1]
         
         # Analyze color relationships
         hue_variance = np.var(harmonies)
@@ -158,7 +153,7 @@ class DeepSourceAnalyzer:
         """Analyze how visual weight is distributed"""
         
         # Convert to grayscale for weight analysis
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         h, w = gray.shape
         
         # Divide into quadrants
@@ -215,7 +210,7 @@ class DeepSourceAnalyzer:
         """Detect repetition and rhythm in the composition"""
         
         # Convert to grayscale for pattern detection
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Apply edge detection
         edges = self._simple_edge_detection(gray)
@@ -237,22 +232,12 @@ class DeepSourceAnalyzer:
     
     def _simple_edge_detection(self, gray: np.ndarray) -> np.ndarray:
         """Simple edge detection without external dependencies"""
-        # Sobel-like edge detection
-        kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-        kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
-        
-        # Manual convolution for edge detection
-        edges = np.zeros_like(gray)
-        h, w = gray.shape
+        # An image's gray plane has its edges computed once, by its context
+        context = ImageContext.owner(gray)
+        if context is not None:
+            return context.sobel
         
-        for y in range(1, h-1):
-            for x in range(1, w-1):
-                region = gray[y-1:y+2, x-1:x+2]
-                gx = np.sum(region * kernel_x)
-                gy = np.sum(region * kernel_y)
-                edges[y, x] = np.sqrt(gx**2 + gy**2)
-        
-        return edges
+        return imageops.sobel_magnitude(gray)
     
     def _measure_pattern_strength(self, edges: np.ndarray, axis: str) -> float:
         """Measure pattern strength along an axis"""
@@ -345,7 +330,7 @@ class DeepSourceAnalyzer:
     
     def _measure_content_along_lines(self, img_array: np.ndarray, h_lines: List[float], v_lines: List[float]) -> float:
         """Measure how much content aligns with compositional lines"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         edges = self._simple_edge_detection(gray)
         
         total_score = 0.0
@@ -371,7 +356,7 @@ class DeepSourceAnalyzer:
     
     def _analyze_whitespace(self, img_array: np.ndarray) -> Dict:
         """Analyze whitespace and breathing room"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Consider bright areas as potential whitespace
         brightness_threshold = 200
@@ -413,7 +398,7 @@ class DeepSourceAnalyzer:
     
     def _detect_focal_points(self, img_array: np.ndarray) -> Dict:
         """Detect visual focal points in the image"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Use contrast and edge density to find focal points
         edges = self._simple_edge_detection(gray)
@@ -461,7 +446,7 @@ class DeepSourceAnalyzer:
         """Analyze texture patterns and surface qualities"""
         
         # Convert to grayscale for texture analysis
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Texture roughness (using local standard deviation)
         roughness = self._calculate_roughness(gray)
@@ -484,16 +469,13 @@ class DeepSourceAnalyzer:
         """Calculate texture roughness"""
         # Use local standard deviation as roughness measure
         h, w = gray.shape
-        roughness_values = []
         
         window_size = min(h, w) // 20
         if window_size < 3:
             window_size = 3
         
-        for y in range(0, h-window_size, window_size//2):
-            for x in range(0, w-window_size, window_size//2):
-                window = gray[y:y+window_size, x:x+window_size]
-                roughness_values.append(np.std(window))
+        # Half-overlapping windows
+        roughness_values = imageops.block_stats(gray, window_size, window_size // 2).std
         
         return float(np.mean(roughness_values) / 128)  # Normalized
     
@@ -573,7 +555,7 @@ class DeepSourceAnalyzer:
         # This is a simplified text detection
         # In production, would use OCR or text detection models
         
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Look for text-like patterns (high contrast, linear elements)
         edges = self._simple_edge_detection(gray)
@@ -704,7 +686,7 @@ class DeepSourceAnalyzer:
     
     def _analyze_color_culture(self, img: Image) -> Dict:
         """Analyze color for cultural associations"""
-        img_array = np.array(img)
+        img_array = ImageContext.of(img).rgb
         
         # Get dominant colors
         colors = self.semantic_analyzer._extract_colors(img_array)
@@ -793,7 +775,7 @@ class DeepSourceAnalyzer:
             luxury_score += 0.3
         
         # Check for minimal, clean composition
-        edges = self._simple_edge_detection(np.mean(img_array, axis=2))
+        edges = self._simple_edge_detection(ImageContext.of(img_array).gray)
         edge_density = np.mean(edges)
         
         if edge_density < 0.3:  # Clean, minimal
@@ -815,7 +797,7 @@ class DeepSourceAnalyzer:
     def _analyze_energy_levels(self, img_array: np.ndarray) -> Dict:
         """Analyze visual energy and dynamism"""
         
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Motion blur detection (simplified)
         motion_score = self._detect_motion_blur(gray)
@@ -845,19 +827,12 @@ class DeepSourceAnalyzer:
         # Look for directional streaking
         h, w = gray.shape
         
-        # Check for horizontal streaking
-        h_blur = 0
-        for y in range(1, h-1):
-            row_diff = np.diff(gray[y, :])
-            if np.std(row_diff) < np.mean(np.abs(row_diff)) * 0.5:
-                h_blur += 1
-        
-        # Check for vertical streaking
-        v_blur = 0
-        for x in range(1, w-1):
-            col_diff = np.diff(gray[:, x])
-            if np.std(col_diff) < np.mean(np.abs(col_diff)) * 0.5:
-                v_blur += 1
+        # Streaking rows (and columns): differences along them vary little
+        # (an empty difference never counts, so skip reducing it)
+        row_diff = np.diff(gray[1:-1, :], axis=1)
+        h_blur = np.count_nonzero(np.std(row_diff, axis=1) < np.mean(np.abs(row_diff), axis=1) * 0.5) if row_diff.size else 0
+        col_diff = np.diff(gray[:, 1:-1], axis=0)
+        v_blur = np.count_nonzero(np.std(col_diff, axis=0) < np.mean(np.abs(col_diff), axis=0) * 0.5) if col_diff.size else 0
         
         blur_score = max(h_blur / h, v_blur / w)
         return min(1.0, blur_score)
@@ -868,13 +843,7 @@ class DeepSourceAnalyzer:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        saturations = []
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            _, s, _ = colorsys.rgb_to_hsv(r, g, b)
-            saturations.append(s)
+        saturations = ImageContext.of(img_array).sample_hsv(sample_size)[:, 1]
         
         return float(np.mean(saturations))
     
@@ -883,19 +852,12 @@ class DeepSourceAnalyzer:
         # Detect diagonal patterns
         edges = self._simple_edge_detection(gray)
         
-        # Create diagonal kernels
+        # Diagonal kernel; its mirror (the \ diagonal) is its negation,
+        # so the stronger of the two is the absolute response
         diag1 = np.array([[1, 0, -1], [0, 0, 0], [-1, 0, 1]])  # / diagonal
-        diag2 = np.array([[-1, 0, 1], [0, 0, 0], [1, 0, -1]])  # \ diagonal
         
         h, w = edges.shape
-        diag_strength = 0
-        
-        for y in range(1, h-1):
-            for x in range(1, w-1):
-                region = edges[y-1:y+2, x-1:x+2]
-                d1 = np.sum(region * diag1)
-                d2 = np.sum(region * diag2)
-                diag_strength += max(abs(d1), abs(d2))
+        diag_strength = np.abs(imageops.correlate(edges, diag1, mode='valid')).sum()
         
         return min(1.0, diag_strength / (h * w * 255))
     
@@ -1002,7 +964,7 @@ class DeepSourceAnalyzer:
     
     def _assess_texture_complexity(self, img_array: np.ndarray) -> float:
         """Assess texture complexity"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         edges = self._simple_edge_detection(gray)
         
         # Complex textures have high edge density and variation
@@ -1086,7 +1048,7 @@ class DeepSourceAnalyzer:
             return 'balanced'
 
 
-def analyze_deep_source(image_path: str, description: str = "") -> Dict:
+def analyze_deep_source(image_path: Union[str, ImageContext], description: str = "") -> Dict:
     """
     Simple integration function for deep source analysis
     
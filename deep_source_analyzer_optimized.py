@@ -7,10 +7,12 @@ Fast, efficient brand DNA extraction with caching and simplified algorithms
 import numpy as np
 from PIL import Image
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import colorsys
 from datetime import datetime
 from semantic_analyzer import SemanticAnalyzer
+from analysis_cache import cached_analysis
+from image_context import ImageContext
 
 class DeepSourceAnalyzerOptimized:
     """
@@ -22,10 +24,12 @@ class DeepSourceAnalyzerOptimized:
         self.semantic_analyzer = SemanticAnalyzer()
         self._cache = {}  # Cache for repeated calculations
         
-    def analyze_source_material(self, image_path: str, description: str = "") -> Dict:
+    @cached_analysis('deep_source_optimized', version=3)
+    def analyze_source_material(self, image_path: Union[str, ImageContext], description: str = "") -> Dict:
         """
         Fast analysis of source material for brand DNA extraction
         Optimized for speed while maintaining quality
+        (image_path may be an ImageContext, shared with the semantic analysis)
         """
         try:
             # Check cache first
@@ -34,20 +38,17 @@ class DeepSourceAnalyzerOptimized:
                 return self._cache[cache_key]
             
             # Get basic semantic analysis (already fast)
-            base_analysis = self.semantic_analyzer.analyze_image(image_path, description)
+            context = ImageContext.of(image_path)
+            base_analysis = self.semantic_analyzer.analyze_image(context, description)
             
             if 'error' in base_analysis:
                 return base_analysis
             
-            # Load and downsample image for faster processing
-            img = Image.open(image_path).convert('RGB')
-            
             # Downsample if image is large
             max_dimension = 512  # Process at lower resolution
-            if img.width > max_dimension or img.height > max_dimension:
-                img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
-            
-            img_array = np.array(img)
+            small = context.downscaled(max_dimension)
+            img = small.image
+            img_array = small.rgb
             
             # Fast brand analysis with essential elements only
             analysis = {
@@ -121,7 +122,7 @@ class DeepSourceAnalyzerOptimized:
     def _fast_energy_analysis(self, img_array: np.ndarray) -> str:
         """Fast energy level detection"""
         # Use standard deviation as quick energy metric
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Downsample for speed
         if gray.shape[0] > 100:
@@ -165,7 +166,7 @@ class DeepSourceAnalyzerOptimized:
         # Simplified archetype detection based on visual properties
         
         brightness = np.mean(img_array) / 255
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128
         
         # Simple rules for archetype
@@ -256,7 +257,7 @@ class DeepSourceAnalyzerOptimized:
         return brandable
 
 
-def analyze_deep_source_optimized(image_path: str, description: str = "") -> Dict:
+def analyze_deep_source_optimized(image_path: Union[str, ImageContext], description: str = "") -> Dict:
     """
     Optimized deep source analysis - fast and efficient
     """
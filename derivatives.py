@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Thumbnails and other derivatives of content images.
+
+The gallery, brand previews and exported mood boards all used the original
+files from content/images - some of them multi-megabyte JPEGs and GIFs - even
+where they are shown 40 to 300 pixels wide. Derivatives are downscaled copies
+in a few fixed width buckets, encoded as WebP (or JPEG where WebP is not
+available or not wanted), and served from /thumb/{item_id}?w=.
+
+They are keyed by the source file's content hash, so a derivative never goes
+stale and can be cached by browsers for good. Files live under
+content/derivatives/ and the directory is bounded by
+CONCIERTO_DERIVATIVE_CACHE_MB (default 256), evicting the least recently used
+files. JPEG sources are decoded at reduced scale with PIL's draft mode, which
+makes a thumbnail of a large photo several times cheaper than a full decode.
+"""
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps, features
+    PIL_AVAILABLE = True
+    WEBP_AVAILABLE = features.check('webp')
+except ImportError:
+    PIL_AVAILABLE = False
+    WEBP_AVAILABLE = False
+
+# Widths derivatives are made at; requests are rounded up to the next bucket
+SIZE_BUCKETS = (160, 320, 640, 1280)
+# Made for every image at ingest (gallery cards)
+INGEST_WIDTHS = (320,)
+DEFAULT_MAX_MB = 256
+
+# Formats PIL cannot decode are served as originals
+RASTER_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+_FORMATS = {'webp': ('WEBP', '.webp'), 'jpeg': ('JPEG', '.jpg')}
+
+
+def bucket_for(width: Optional[int]) -> int:
+    """Smallest size bucket at least `width` wide"""
+    if not width:
+        return INGEST_WIDTHS[0]
+    for bucket in SIZE_BUCKETS:
+        if width <= bucket:
+            return bucket
+    return SIZE_BUCKETS[-1]
+
+
+def default_format() -> str:
+    return 'webp' if WEBP_AVAILABLE else 'jpeg'
+
+
+def can_derive(source) -> bool:
+    return PIL_AVAILABLE and Path(source).suffix.lower() in RASTER_EXTENSIONS
+
+
+def thumbnail_url(item: Dict, width: int = INGEST_WIDTHS[0]) -> str:
+    """URL of an item's derivative, pinned to its content so it can be cached forever"""
+    url = f"/thumb/{item['id']}?w={width}"
+    if item.get('content_hash'):
+        url += f"&v={item['content_hash'][:16]}"
+    return url
+
+
+def render_derivative(source: str, dest: str, width: int, fmt: str) -> int:
+    """
+    Write a `width`-pixel-wide derivative of `source` to `dest` (runs in an
+    analysis worker). Never upscales. Returns the size of the written file.
+    """
+    pil_format, _ = _FORMATS[fmt]
+    with Image.open(source) as img:
+        if img.format == 'JPEG':
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that's still big enough
+            img.draft('RGB', (width, max(1, img.height * width // max(1, img.width))))
+        img.seek(0)   # first frame of animations
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        if pil_format == 'JPEG' or not has_alpha:
+            img = img.convert('RGB')
+        else:
+            img = img.convert('RGBA')
+
+        tmp_path = f"{dest}.{os.getpid()}.tmp"
+        if pil_format == 'WEBP':
+            img.save(tmp_path, 'WEBP', quality=80, method=4)
+        else:
+            img.save(tmp_path, 'JPEG', quality=82, optimize=True, progressive=True)
+    os.replace(tmp_path, dest)
+    return os.path.getsize(dest)
+
+
+class DerivativeCache:
+    """Content-addressed, size-bounded directory of derivatives"""
+
+    def __init__(self, directory="content/derivatives", max_bytes: Optional[int] = None):
+        self.directory = Path(directory)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('CONCIERTO_DERIVATIVE_CACHE_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self._pending: Dict[Tuple[str, int, str], asyncio.Future] = {}
+
+    def path_for(self, content_hash: str, width: int, fmt: str) -> Path:
+        _, extension = _FORMATS[fmt]
+        return self.directory / content_hash[:2] / f"{content_hash}_{width}{extension}"
+
+    def lookup(self, content_hash: str, width: int, fmt: str) -> Optional[Path]:
+        """Existing derivative, marked as recently used"""
+        path = self.path_for(content_hash, width, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    async def ensure(self, source, content_hash: str, width: int, fmt: str, executor) -> Path:
+        """
+        The derivative for a source image, generating it in `executor` (an
+        AnalysisExecutor) if needed. Concurrent requests for the same
+        derivative share one generation.
+        """
+        path = self.lookup(content_hash, width, fmt)
+        if path is not None:
+            return path
+
+        key = (content_hash, width, fmt)
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            path = self.path_for(content_hash, width, fmt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            size = await executor.run(render_derivative, str(source), str(path), width, fmt)
+            self._added(size)
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self.directory.glob('*/*'):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _added(self, size: int):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used derivatives until 90% of the limit"""
+        files = []
+        for path in self.directory.glob('*/*'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
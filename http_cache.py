@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Conditional GET helpers for the API.
+
+Responses derived from the content store carry a strong ETag built from the
+document version (plus the backend stamp, so hand edits to data.json count)
+and whatever else selects the representation, such as the query string.
+Clients send it back in If-None-Match and get an empty 304 while nothing
+has changed, so polling the dashboard costs a stat() and a hash.
+"""
+
+import hashlib
+from typing import Optional
+
+from aiohttp import web
+
+# Always revalidate, but let the client keep its copy
+REVALIDATE = 'no-cache'
+
+
+def etag_for(*parts) -> str:
+    """Strong ETag over the given parts"""
+    digest = hashlib.sha1('\x1f'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def content_etag(store, *parts) -> str:
+    """ETag for a representation of the content store at its current version"""
+    return etag_for(store.version, store.stamp(), *parts)
+
+
+def view_etag(view, *parts) -> str:
+    """ETag for a representation built from one ContentView (same form as content_etag)"""
+    return etag_for(view.version, view.stamp, *parts)
+
+
+def query_key(request: web.Request) -> str:
+    """Canonical form of the query string (parameter order doesn't matter)"""
+    return '&'.join(f"{k}={v}" for k, v in sorted(request.query.items()))
+
+
+def etag_matches(request: web.Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (or is *)"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(',')]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> web.Response:
+    return web.Response(status=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+
+
+def cache_headers(etag: str, cache_control: str = REVALIDATE, extra: Optional[dict] = None) -> dict:
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if extra:
+        headers.update(extra)
+    return headers
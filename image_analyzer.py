@@ -8,11 +8,14 @@ import base64
 import json
 import asyncio
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from datetime import datetime
 import aiohttp
 import aiofiles
 
+from content_store import ContentStore, new_record_id, open_store
+from scan_index import ScanIndex
+
 class ImageAnalyzer:
     """AI-powered image content analyzer"""
     
@@ -232,11 +235,16 @@ Provide 2-3 key insights that would be valuable for creative inspiration."""
 class SmartContentManager:
     """Enhanced content manager with AI analysis"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, store: Optional[ContentStore] = None,
+                 scan_index: Optional[ScanIndex] = None):
         self.analyzer = ImageAnalyzer(api_key)
         self.content_dir = Path("content")
         self.images_dir = self.content_dir / "images"
         self.data_file = self.content_dir / "data.json"
+        self.store = store or open_store(content_dir=self.content_dir)
+        # When given, candidate files come from the (already scanned) index
+        # instead of a directory listing
+        self.scan_index = scan_index
         
         # Create directories
         self.content_dir.mkdir(exist_ok=True)
@@ -244,40 +252,47 @@ class SmartContentManager:
     
     def _load_data(self):
         """Load content data"""
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {
-                "items": [],
-                "tags": [],
-                "last_updated": "",
-                "ai_analysis_enabled": bool(self.analyzer.api_key)
-            }
+        return self.store.load()
     
     def _save_data(self, data):
         """Save content data"""
-        from datetime import datetime
-        data["last_updated"] = datetime.now().isoformat()
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.store.save(data)
     
-    async def analyze_and_update_images(self, force_reanalyze: bool = False, max_images: int = 5):
-        """Analyze images with AI and update database"""
-        data = self._load_data()
-        
-        # Find images that need analysis
-        existing_items = {item.get('filename'): item for item in data['items'] if item.get('type') == 'image'}
+    def images_needing_analysis(self, force_reanalyze: bool = False) -> List[Path]:
+        """Image files without an AI analysis yet (all of them with force_reanalyze)"""
+        existing_items = {}
         
         image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}  # Remove .svg as it can't be analyzed
         images_to_analyze = []
         
-        for image_file in self.images_dir.iterdir():
-            if (image_file.suffix.lower() in image_extensions and 
-                (image_file.name not in existing_items or 
+        if self.scan_index is not None:
+            image_files = [self.images_dir / name for name in self.scan_index.filenames()]
+        else:
+            image_files = list(self.images_dir.iterdir())
+        
+        for image_file in image_files:
+            if image_file.suffix.lower() not in image_extensions:
+                continue
+            item = self.store.item_by_filename(image_file.name)
+            if item and item.get('type') == 'image':
+                existing_items[image_file.name] = item
+            if (image_file.name not in existing_items or 
                  force_reanalyze or 
-                 not existing_items.get(image_file.name, {}).get('ai_analysis'))):
+                 not existing_items[image_file.name].get('ai_analysis')):
                 images_to_analyze.append(image_file)
+        return images_to_analyze
+    
+    async def analyze_and_update_images(self, force_reanalyze: bool = False, max_images: int = 5,
+                                        progress: Optional[Callable] = None,
+                                        images: Optional[List[Path]] = None):
+        """
+        Analyze images with AI and update database.
+        
+        images, if given, are analyzed instead of images_needing_analysis().
+        progress, if given, is called as progress(item_id, result=..., error=...)
+        for each image once the batch is saved.
+        """
+        images_to_analyze = self.images_needing_analysis(force_reanalyze) if images is None else list(images)
         
         if not images_to_analyze:
             print("No new images to analyze")
@@ -295,23 +310,33 @@ class SmartContentManager:
         
         # Update or create items
         updated_count = 0
+        new_items = []
+        updates = {}
+        outcomes = []
         for image_path in images_to_analyze:
+            item_id = image_path.name
             try:
                 filename = image_path.name
                 analysis = analysis_results.get(str(image_path), {})
                 
                 # Create or update item
-                if filename in existing_items:
-                    item = existing_items[filename]
+                existing = self.store.item_by_filename(filename)
+                # Uploads are stored under content hashes: title and tag them by the name they came with
+                source_name = (existing or {}).get('original_filename') or filename
+                if existing and existing.get('type') == 'image':
+                    item = {}
+                    item_id = existing['id']
+                    updates[item_id] = item
                 else:
                     item = {
-                        "id": f"img_{len(data['items']) + updated_count + 1}",
+                        "id": new_record_id("img"),
                         "type": "image",
                         "filename": filename,
                         "path": f"content/images/{filename}",
                         "added_at": datetime.now().isoformat()
                     }
-                    data['items'].append(item)
+                    item_id = item["id"]
+                    new_items.append(item)
                 
                 # Add AI analysis if successful
                 if analysis.get('success'):
@@ -319,7 +344,7 @@ class SmartContentManager:
                     
                     # Update with AI insights
                     item.update({
-                        "title": self._generate_smart_title(filename, ai_data),
+                        "title": self._generate_smart_title(source_name, ai_data),
                         "description": ai_data.get('content_description', ''),
                         "ai_tags": ai_data.get('ai_tags', []),
                         "creative_insights": ai_data.get('creative_insights', ''),
@@ -331,39 +356,41 @@ class SmartContentManager:
                     })
                     
                     # Combine filename tags with AI tags
-                    filename_tags = self._extract_tags_from_filename(filename)
+                    filename_tags = self._extract_tags_from_filename(source_name)
                     all_tags = list(set(filename_tags + ai_data.get('ai_tags', [])))
                     item["tags"] = all_tags[:12]  # Limit total tags
                     
                     updated_count += 1
+                    outcomes.append((item_id, item["title"], None))
                     print(f"✅ Analyzed: {filename}")
                 
                 else:
                     # Fallback to filename-based analysis
                     item.update({
-                        "title": self._filename_to_title(filename),
-                        "tags": self._extract_tags_from_filename(filename),
+                        "title": self._filename_to_title(source_name),
+                        "tags": self._extract_tags_from_filename(source_name),
                         "ai_analysis": {
                             "analyzed_at": datetime.now().isoformat(),
                             "success": False,
                             "error": analysis.get('error', 'Unknown error')
                         }
                     })
+                    outcomes.append((item_id, None, analysis.get('error', 'Unknown error')))
                     print(f"⚠️ Failed to analyze: {filename}")
             
             except Exception as e:
+                outcomes.append((item_id, None, str(e)))
                 print(f"❌ Error processing {image_path.name}: {e}")
         
-        # Update global tags
-        all_tags = set(data.get('tags', []))
-        for item in data['items']:
-            all_tags.update(item.get('tags', []))
-        data['tags'] = sorted(list(all_tags))
-        
-        # Save updated data
-        self._save_data(data)
+        # Save updated data (the store keeps the global tag list in sync)
+        self.store.update_records('items', updates)
+        self.store.add_records('items', new_items)
         print(f"🎉 Successfully analyzed {updated_count} images")
         
+        if progress:
+            for item_id, title, error in outcomes:
+                progress(item_id, result=title, error=error)
+        
         return updated_count
     
     def _generate_smart_title(self, filename: str, ai_data: Dict) -> str:
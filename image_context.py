@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+One decoded image shared by every analyzer.
+
+Vibe mapping runs the deep source analyzer, which runs the semantic analyzer,
+and brand intelligence runs the style vector: each of them used to open and
+decode the image again, and then recompute the same grayscale plane (often
+several times per analyzer), HSV values pixel by pixel through colorsys and
+per-pixel Sobel edges. An ImageContext decodes the image once, on first use,
+and memoizes what the analyzers derive from it:
+
+- rgb: the uint8 RGB array
+- gray: the channel mean as float64, exactly what the analyzers computed
+- luminance: ITU-R 601 weighted luminance as float64
+- luma: the uint8 pixels of the image converted to PIL 'L'
+- hsv: colorsys-compatible HSV of every pixel, vectorized
+- sobel: Sobel gradient magnitude of gray (zero on the border)
+- integral: summed-area table of gray, for O(1) region means
+- histogram(bits): colour counts of the pixels (see color_histogram.py)
+- palette(n_colors): dominant colours, clustered from a histogram (palette.py)
+- downscaled(max_side): a thumbnail, itself a context with its own planes
+
+Analyzer entry points accept a path or a context and pass the context on to
+the analyzers they call, so passing one context through a chain decodes the
+image once. Memoized arrays are read-only because they are shared.
+
+Helpers that only receive img_array (or img) can get back to the context
+that owns it with ImageContext.of(img_array); any other array, such as a
+crop, gets a fresh context of its own. ImageContext.owner(gray) likewise
+finds the context a memoized plane came from.
+"""
+
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+import imageops
+from color_histogram import ColorHistogram, binned_colors
+from palette import PALETTE_BITS, PALETTE_SEED, Palette, default_method, quantize
+
+# id(array or PIL image) -> weak reference to the context that owns it
+_owners: Dict[int, weakref.ref] = {}
+_owners_lock = threading.Lock()
+
+
+def rgb_to_hsv(rgb: np.ndarray) -> np.ndarray:
+    """
+    HSV of an (..., 3) array of 0-255 RGB values, as float64 in 0-1.
+    Same arithmetic as colorsys.rgb_to_hsv on r/255, g/255, b/255.
+    """
+    rgb = np.asarray(rgb, dtype=np.float64) / 255
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    rangec = maxc - minc
+    chromatic = rangec > 0
+    safe_max = np.where(chromatic, maxc, 1.0)
+    safe_range = np.where(chromatic, rangec, 1.0)
+    s = np.where(chromatic, rangec / safe_max, 0.0)
+    rc = (maxc - r) / safe_range
+    gc = (maxc - g) / safe_range
+    bc = (maxc - b) / safe_range
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(chromatic, (h / 6.0) % 1.0, 0.0)
+    return np.stack([h, s, maxc], axis=-1)
+
+
+def _shared(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class ImageContext:
+    """A decoded RGB image plus lazily computed, memoized derived planes"""
+
+    def __init__(self, path=None, image: Optional[Image.Image] = None, rgb: Optional[np.ndarray] = None):
+        self.path = Path(path) if path is not None else None
+        self._image = image
+        self._rgb = rgb
+        self._planes: Dict[str, object] = {}
+        self._downscaled: Dict[int, 'ImageContext'] = {}
+        self._lock = threading.Lock()
+        if image is not None:
+            self._own(image)
+        if rgb is not None:
+            self._own(rgb)
+
+    @classmethod
+    def of(cls, source: Union['ImageContext', str, Path, Image.Image, np.ndarray]) -> 'ImageContext':
+        """
+        Context for an image path, PIL image or RGB array - the existing one
+        if source belongs to a context - or source itself if it is one
+        """
+        if isinstance(source, ImageContext):
+            return source
+        if isinstance(source, (Image.Image, np.ndarray)):
+            context = ImageContext.owner(source)
+            if context is not None and (context._image is source or context._rgb is source):
+                return context
+            if isinstance(source, np.ndarray):
+                return cls(rgb=source)
+            return cls(image=source if source.mode == 'RGB' else source.convert('RGB'))
+        return cls(path=source)
+
+    @staticmethod
+    def owner(array) -> Optional['ImageContext']:
+        """The context whose image, pixels or memoized plane array is, if any"""
+        ref = _owners.get(id(array))
+        context = ref() if ref is not None else None
+        if context is None:
+            return None
+        if array is context._image or array is context._rgb:
+            return context
+        if any(array is plane for plane in context._planes.values()):
+            return context
+        return None
+
+    def __repr__(self):
+        return f"ImageContext({str(self.path)!r})" if self.path else f"ImageContext(<{self.width}x{self.height}>)"
+
+    def __str__(self):
+        return str(self.path) if self.path else repr(self)
+
+    def _own(self, obj):
+        """Register obj so ImageContext.of(obj) finds this context"""
+        key = id(obj)
+
+        def forget(ref, key=key):
+            with _owners_lock:
+                if _owners.get(key) is ref:
+                    del _owners[key]
+
+        with _owners_lock:
+            # A live owner keeps obj alive, so its id can't have been reused
+            current = _owners.get(key)
+            if current is None or current() is None:
+                _owners[key] = weakref.ref(self, forget)
+
+    def _memo(self, name: str, compute):
+        value = self._planes.get(name)
+        if value is None:
+            value = compute()
+            with self._lock:
+                if name not in self._planes:
+                    self._planes[name] = value
+                    if isinstance(value, np.ndarray):
+                        self._own(value)
+                value = self._planes[name]
+        return value
+
+    # Decoded image
+
+    @property
+    def image(self) -> Image.Image:
+        """The RGB PIL image, decoded on first use. Don't modify it in place."""
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    if self._rgb is not None:
+                        image = Image.fromarray(self._rgb)
+                    else:
+                        with Image.open(self.path) as opened:
+                            image = opened.convert('RGB')
+                    self._own(image)
+                    self._image = image
+        return self._image
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """(h, w, 3) uint8 pixels"""
+        if self._rgb is None:
+            rgb = np.array(self.image)
+            with self._lock:
+                if self._rgb is None:
+                    self._own(_shared(rgb))
+                    self._rgb = rgb
+        return self._rgb
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height)"""
+        if self._image is None and self._rgb is not None:
+            return self._rgb.shape[1], self._rgb.shape[0]
+        return self.image.size
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    def downscaled(self, max_side: int) -> 'ImageContext':
+        """
+        Context of a thumbnail no larger than max_side (as Image.thumbnail
+        with LANCZOS), or this context if the image is already that small.
+        The thumbnail has no path: its results must not be cached as the file's.
+        """
+        if self.width <= max_side and self.height <= max_side:
+            return self
+        context = self._downscaled.get(max_side)
+        if context is None:
+            thumbnail = self.image.copy()
+            thumbnail.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            with self._lock:
+                context = self._downscaled.setdefault(max_side, ImageContext(image=thumbnail))
+        return context
+
+    # Derived planes
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Mean of the RGB channels, float64 0-255"""
+        return self._memo('gray', lambda: _shared(np.mean(self.rgb, axis=2)))
+
+    @property
+    def luminance(self) -> np.ndarray:
+        """0.299 R + 0.587 G + 0.114 B, float64 0-255"""
+        return self._memo('luminance', lambda: _shared(np.dot(self.rgb, [0.299, 0.587, 0.114])))
+
+    @property
+    def luma(self) -> np.ndarray:
+        """np.array(image.convert('L')): rounded ITU-R 601 luma, uint8"""
+        return self._memo('luma', lambda: _shared(np.array(self.image.convert('L'))))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """(h, w, 3) float64 hue, saturation and value, each 0-1"""
+        return self._memo('hsv', lambda: _shared(rgb_to_hsv(self.rgb)))
+
+    @property
+    def sobel(self) -> np.ndarray:
+        """Sobel gradient magnitude of gray; the one-pixel border is zero"""
+        return self._memo('sobel', lambda: _shared(imageops.sobel_magnitude(self.gray)))
+
+    @property
+    def integral(self) -> np.ndarray:
+        """Summed-area table of gray, (h+1, w+1) with a zero first row and column"""
+        def compute():
+            table = np.zeros((self.gray.shape[0] + 1, self.gray.shape[1] + 1))
+            table[1:, 1:] = self.gray.cumsum(axis=0).cumsum(axis=1)
+            return _shared(table)
+        return self._memo('integral', compute)
+
+    def region_mean(self, y1: int, y2: int, x1: int, x2: int) -> float:
+        """Mean of gray[y1:y2, x1:x2] from the integral image (nan if empty)"""
+        area = (y2 - y1) * (x2 - x1)
+        if area <= 0:
+            return float('nan')
+        t = self.integral
+        return float((t[y2, x2] - t[y1, x2] - t[y2, x1] + t[y1, x1]) / area)
+
+    def histogram(self, bits: int = 8) -> ColorHistogram:
+        """Colour histogram of the pixels, quantized to bits per channel"""
+        return self._memo(f'histogram{bits}', lambda: ColorHistogram.of(self.rgb, bits))
+
+    def palette(self, n_colors: int, method: Optional[str] = None, bits: int = PALETTE_BITS,
+                seed: int = PALETTE_SEED) -> Palette:
+        """Palette of at most n_colors (see palette.py), from the pixels binned to bits per channel"""
+        method = method or default_method()
+        bins = self._memo(f'bins{bits}', lambda: binned_colors(self.rgb, bits))
+        return self._memo(f'palette{n_colors}:{method}:{bits}:{seed}',
+                          lambda: quantize(*bins, n_colors, method, seed))
+
+    def sample(self, count: int) -> np.ndarray:
+        """count random pixels (with replacement) as an (n, 3) uint8 array"""
+        h, w = self.rgb.shape[:2]
+        ys = np.random.randint(0, h, count)
+        xs = np.random.randint(0, w, count)
+        return self.rgb[ys, xs]
+
+    def sample_hsv(self, count: int) -> np.ndarray:
+        """HSV of count random pixels, (n, 3) float64"""
+        return rgb_to_hsv(self.sample(count))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Job state shared between server worker processes.
+
+With `python simple_server.py --workers N` the dashboard is served by several
+processes, and the request that polls /api/jobs/{id} or streams its events
+can land on a different one from the request that started the job. JobBoard
+keeps what the workers have to agree on in one SQLite database
+(content/jobs.db):
+
+- the queue: jobs are queued here and claimed by whichever worker has a free
+  runner, so analysis work spreads across the processes
+- every job's latest state, as returned by /api/jobs/{id}
+- the event log, whose row id is the event sequence number for all workers;
+  each worker tails it and streams other workers' events to its own clients
+- cancellation requests, picked up by the worker running the job
+
+The supervisor creates a fresh board on every start: as with the in-process
+queue, jobs don't outlive the server.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from serialization import dumps, loads
+
+# Events kept in the database (older ones are pruned every PRUNE_EVERY inserts)
+BOARD_EVENTS = 20000
+PRUNE_EVERY = 500
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+
+class JobBoard:
+    """SQLite-backed queue, state and event log of jobs, shared by processes"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, "
+                "status TEXT NOT NULL, owner INTEGER, cancel INTEGER NOT NULL DEFAULT 0, "
+                "state TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, origin INTEGER NOT NULL, "
+                "job TEXT, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS events_job ON events(job, seq)")
+
+    @classmethod
+    def create(cls, path) -> 'JobBoard':
+        """A new, empty board at path (replacing any left by an earlier run)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for suffix in ('', '-wal', '-shm'):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+        return cls(path)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _write(self):
+        """Transaction holding the database write lock from the start"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    # Queue
+
+    def add(self, state: Dict, owner: Optional[int] = None, unique: bool = False) -> Optional[Dict]:
+        """
+        Add a job. Without an owner it is queued for any worker to claim;
+        with one it is already running there. With unique, an unfinished job
+        of the same kind is returned instead and nothing is added.
+        """
+        with self._lock, self._write():
+            if unique:
+                row = self._conn.execute(
+                    "SELECT state FROM jobs WHERE kind = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (state['kind'], QUEUED, RUNNING)).fetchone()
+                if row is not None:
+                    return loads(row[0])
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, owner, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (state['id'], state['kind'], dumps(state.get('params') or {}),
+                 QUEUED if owner is None else RUNNING, owner, dumps(state), state['created_at']))
+        return None
+
+    def claim(self, kinds: Iterable[str], owner: int) -> Optional[Dict]:
+        """Take the oldest queued job of one of these kinds: {id, kind, params, created_at}"""
+        kinds = list(kinds)
+        if not kinds:
+            return None
+        placeholders = ', '.join('?' for _ in kinds)
+        with self._lock, self._write():
+            row = self._conn.execute(
+                f"SELECT id, kind, params, created_at FROM jobs WHERE status = ? AND kind IN ({placeholders}) "
+                f"ORDER BY created_at LIMIT 1", (QUEUED, *kinds)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE jobs SET status = ?, owner = ? WHERE id = ?", (RUNNING, owner, row[0]))
+        return {'id': row[0], 'kind': row[1], 'params': loads(row[2]), 'created_at': row[3]}
+
+    def cancel_queued(self, job_id: str) -> bool:
+        """Cancel a job nobody has claimed yet; False if it was already claimed"""
+        with self._lock, self._write():
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = ?", (job_id, QUEUED)
+            ).rowcount == 1
+
+    def request_cancel(self, job_id: str):
+        """Ask the worker running a job to cancel it"""
+        with self._lock, self._write():
+            self._conn.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+
+    def cancel_requests(self, owner: int) -> List[str]:
+        """Running jobs of a worker that someone asked to cancel"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE owner = ? AND status = ? AND cancel = 1", (owner, RUNNING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # State and events
+
+    def publish(self, event: Dict, state: Dict, origin: int) -> int:
+        """Append an event, store the job's state with it, and return the event's sequence number"""
+        with self._lock, self._write():
+            seq = self._conn.execute(
+                "INSERT INTO events (origin, job, data) VALUES (?, ?, ?)",
+                (origin, event.get('job'), dumps(event))).lastrowid
+            if state['status'] in FINISHED:
+                self._conn.execute("UPDATE jobs SET state = ?, status = ? WHERE id = ?",
+                                   (dumps(state), state['status'], state['id']))
+            else:
+                self._conn.execute("UPDATE jobs SET state = ? WHERE id = ?", (dumps(state), state['id']))
+            self._inserts += 1
+            if self._inserts % PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM events WHERE seq <= ?", (seq - BOARD_EVENTS,))
+        return seq
+
+    def events_after(self, seq: int, job_id: Optional[str] = None, limit: int = 1000) -> List[Dict]:
+        """Events after a sequence number (of one job, or all), oldest first, with their origin"""
+        with self._lock:
+            if job_id is None:
+                rows = self._conn.execute(
+                    "SELECT seq, origin, data FROM events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT seq, origin, data FROM events WHERE job = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (job_id, seq, limit)).fetchall()
+        events = []
+        for seq, origin, data in rows:
+            event = loads(data)
+            event['seq'] = seq
+            event['origin'] = origin
+            events.append(event)
+        return events
+
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT state, status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _state(row) if row else None
+
+    def list(self, limit: int) -> List[Dict]:
+        """Newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, status FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [_state(row) for row in rows]
+
+    def fail_owner(self, owner: int, message: str) -> int:
+        """Fail the running jobs of a worker that exited, ending their event streams"""
+        with self._lock, self._write():
+            rows = self._conn.execute(
+                "SELECT state FROM jobs WHERE owner = ? AND status = ?", (owner, RUNNING)).fetchall()
+            for (data,) in rows:
+                state = loads(data)
+                state.update(status='failed', message=message, error=message, finished_at=time.time())
+                self._conn.execute("UPDATE jobs SET state = ?, status = 'failed' WHERE id = ?",
+                                   (dumps(state), state['id']))
+                event = {"type": "job_finished", "job": state['id'], "kind": state['kind'], "item": None,
+                         "time": state['finished_at'], "status": 'failed', "message": message,
+                         "error": message, "completed": state.get('completed', 0),
+                         "failed": state.get('failed', 0), "summary": None}
+                self._conn.execute("INSERT INTO events (origin, job, data) VALUES (?, ?, ?)",
+                                   (os.getpid(), state['id'], dumps(event)))
+        return len(rows)
+
+
+def _state(row) -> Dict:
+    state = loads(row[0])
+    if row[1] == 'cancelled' and state.get('status') == QUEUED:
+        # Cancelled before a worker claimed it and published its final state
+        state['status'] = 'cancelled'
+    return state
+
+
+def open_job_board() -> Optional[JobBoard]:
+    """The board this worker process was started with, if any (set by the supervisor)"""
+    path = os.getenv('CONCIERTO_JOB_BOARD', '').strip()
+    return JobBoard(path) if path else None
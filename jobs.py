@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Background jobs for long-running analysis endpoints.
+
+/api/ai-scan, /api/style-analysis and /api/batch-multi-agent-analysis used to
+do all their work inside the HTTP request: AI scans gave up after 120 seconds
+and large backlogs never finished. They now submit a job and return its id
+straight away. Jobs run on an in-process queue with a bounded number of
+workers (CONCIERTO_JOB_WORKERS, default 2), report per-item progress, results
+and errors through /api/jobs/{id}, and can be cancelled.
+
+A job handler is a coroutine taking the Job. It sets job.total when it knows
+how much work there is, calls job.item_done() for every item, and should
+commit its results as it goes so a cancelled job keeps what it finished.
+Its return value becomes job.summary.
+
+Jobs also emit structured events - job_queued, job_started, job_finished and,
+per item, queued, started, stage (with its duration), finished and failed -
+which the server streams to the dashboard as Server-Sent Events. Every event
+has a sequence number, so a reconnecting client can resume where it left off.
+
+Jobs live in memory: a restart forgets them, but the work they committed
+stays in the content store. When the server runs several worker processes,
+each JobQueue is given the shared JobBoard (see job_board.py): jobs are then
+queued there and run by whichever worker claims them, so job kinds must be
+registered with register() in every worker and handlers take their inputs
+from job.params.
+"""
+
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from content_store import new_record_id
+from metrics import JOBS_FINISHED
+
+DEFAULT_WORKERS = 2
+# Finished jobs kept for /api/jobs
+JOB_HISTORY = 100
+# Events kept for replay, per job and across all jobs
+EVENT_BACKLOG = 2000
+# Events buffered for one slow subscriber before it is cut off
+SUBSCRIBER_BUFFER = 1000
+# How often workers sharing a job board look for new jobs, events and cancellations
+BOARD_POLL_SECONDS = 0.25
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class Job:
+    """One unit of background work and its progress"""
+
+    def __init__(self, kind: str, handler: Callable[['Job'], Awaitable[Any]], params: Optional[Dict] = None,
+                 publish: Optional[Callable[['Job', Dict], None]] = None, job_id: Optional[str] = None):
+        self.id = job_id or new_record_id("job")
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.message = ''
+        self.total: Optional[int] = None
+        self.completed = 0
+        self.failed = 0
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.summary: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: Deque[Dict] = deque(maxlen=EVENT_BACKLOG)
+        self._handler = handler
+        self._task: Optional[asyncio.Task] = None
+        self._publish = publish
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def emit(self, event_type: str, item_id: Optional[str] = None, **data) -> Dict:
+        """Record an event and send it to subscribers"""
+        event = {"type": event_type, "job": self.id, "kind": self.kind, "item": item_id,
+                 "time": time.time(), **data}
+        if self._publish is not None:
+            self._publish(self, event)
+        self.events.append(event)
+        return event
+
+    def items_queued(self, item_ids: Iterable[str]):
+        item_ids = list(item_ids)
+        if self.total is None:
+            self.total = len(item_ids)
+        for item_id in item_ids:
+            self.emit('queued', item_id)
+
+    def item_started(self, item_id: str, **data):
+        self.emit('started', item_id, **data)
+
+    async def stage(self, item_id: str, name: str, awaitable: Awaitable) -> Any:
+        """Await one stage of an item's work and report how long it took"""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.emit('stage', item_id, stage=name, seconds=round(time.perf_counter() - started, 3))
+
+    def item_done(self, item_id: str, result: Any = None, error: Optional[str] = None):
+        """Record the outcome of one item (call once its results are saved)"""
+        if error is not None:
+            self.failed += 1
+            self.errors[item_id] = str(error)
+            self.emit('failed', item_id, error=str(error))
+        else:
+            self.completed += 1
+            self.results[item_id] = result
+            self.emit('finished', item_id, result=result)
+
+    def to_dict(self, details: bool = True) -> Dict[str, Any]:
+        processed = self.completed + self.failed
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "message": self.message,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "progress": round(processed / self.total, 3) if self.total else (1.0 if self.status == SUCCEEDED else 0.0),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if details:
+            data.update(params=self.params, summary=self.summary, results=self.results, errors=self.errors)
+        return data
+
+
+class JobView:
+    """Last published state of a job owned by another worker process"""
+
+    def __init__(self, state: Dict):
+        self.state = state
+        self.id = state['id']
+        self.kind = state['kind']
+        self.status = state['status']
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self, details: bool = True) -> Dict[str, Any]:
+        data = dict(self.state)
+        if not details:
+            for key in ('params', 'summary', 'results', 'errors'):
+                data.pop(key, None)
+        return data
+
+
+class JobQueue:
+    """Job queue with a fixed number of workers, optionally shared between processes"""
+
+    def __init__(self, workers: Optional[int] = None, history: int = JOB_HISTORY, board=None):
+        if workers is None:
+            workers = int(os.getenv('CONCIERTO_JOB_WORKERS', DEFAULT_WORKERS))
+        self.worker_count = max(1, workers)
+        self.history = history
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self.events: Deque[Dict] = deque(maxlen=EVENT_BACKLOG)
+        self._sequence = itertools.count(1)
+        # queue -> (job id or None, highest sequence number already replayed to it)
+        self._subscribers: Dict[asyncio.Queue, Tuple[Optional[str], int]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.board = board
+        self.handlers: Dict[str, Callable[[Job], Awaitable[Any]]] = {}
+        self._wake: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: Callable[[Job], Awaitable[Any]]):
+        """Handler for a kind of job, so any worker process can run it"""
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, handler: Callable[[Job], Awaitable[Any]],
+               params: Optional[Dict] = None, unique: bool = True) -> Job:
+        """
+        Queue a job and return it. With unique, an unfinished job of the same
+        kind is returned instead of starting a second one.
+        """
+        if self.board is not None:
+            return self._submit_shared(kind, handler, params, unique)
+        if unique:
+            for job in self.jobs.values():
+                if job.kind == kind and not job.finished:
+                    return job
+        self.start()
+        job = self._create(kind, handler, params)
+        self._queue.put_nowait(job)
+        return job
+
+    def _submit_shared(self, kind, handler, params, unique):
+        """Queue a job on the board for whichever worker claims it first"""
+        self.handlers.setdefault(kind, handler)
+        self.start()
+        job = Job(kind, handler, params, publish=self._publish)
+        active = self.board.add(job.to_dict(), unique=unique)
+        if active is not None:
+            return self.jobs.get(active['id']) or JobView(active)
+        job.emit('job_queued')
+        self._wake.set()
+        return job
+
+    async def run(self, kind: str, handler: Callable[[Job], Awaitable[Any]],
+                  params: Optional[Dict] = None) -> Job:
+        """
+        Run a job in the calling task, bypassing the queue, for work the
+        caller waits for anyway (it is still listed, streamed and cancellable)
+        """
+        job = self._create(kind, handler, params)
+        await self._run(job)
+        return job
+
+    def _create(self, kind, handler, params) -> Job:
+        job = Job(kind, handler, params, publish=self._publish)
+        if self.board is not None:
+            # Runs here; other workers only see it
+            self.board.add(job.to_dict(), owner=os.getpid())
+        self._adopt(job)
+        job.emit('job_queued')
+        return job
+
+    def _adopt(self, job: Job):
+        self.jobs[job.id] = job
+        self._prune()
+
+    def subscribe(self, job_id: Optional[str] = None, after: int = 0) -> asyncio.Queue:
+        """
+        Queue receiving new events (of one job, or all). Events after sequence
+        number `after` that are still buffered are replayed first (for a job,
+        all of them by default). A None on the queue means the subscriber fell
+        too far behind and should reconnect.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        replayed = 0
+        if after or job_id is not None:
+            if job_id in self.jobs:
+                backlog = self.jobs[job_id].events
+            elif job_id is not None and self.board is not None:
+                backlog = self.board.events_after(after, job_id=job_id, limit=EVENT_BACKLOG)
+                for event in backlog:
+                    event.pop("origin")
+            else:
+                backlog = self.events
+            events = [e for e in backlog if e["seq"] > after and job_id in (None, e["job"])]
+            for event in events[-(SUBSCRIBER_BUFFER - 1):]:
+                queue.put_nowait(event)
+            if job_id is not None and events:
+                # A job's events arrive in order; don't repeat these when relayed
+                replayed = max(e["seq"] for e in events)
+        self._subscribers[queue] = (job_id, replayed)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+
+    def _publish(self, job: Job, event: Dict):
+        if self.board is not None:
+            state = job.to_dict(details=event["type"] == 'job_finished')
+            event["seq"] = self.board.publish(event, state, origin=os.getpid())
+        else:
+            event["seq"] = next(self._sequence)
+        self.events.append(event)
+        self._deliver(event)
+
+    def _deliver(self, event: Dict):
+        for queue, (job_id, replayed) in list(self._subscribers.items()):
+            if job_id is not None and (job_id != event["job"] or event["seq"] <= replayed):
+                continue
+            if queue.qsize() >= SUBSCRIBER_BUFFER - 1:
+                # Too slow: drop it, telling it to resume from its last event
+                self.unsubscribe(queue)
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(event)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None and self.board is not None:
+            state = self.board.get(job_id)
+            job = JobView(state) if state else None
+        return job
+
+    def list(self) -> List[Job]:
+        """Newest first"""
+        if self.board is not None:
+            return [self.jobs.get(state['id']) or JobView(state) for state in self.board.list(self.history)]
+        return list(reversed(self.jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; returns None for unknown ids"""
+        job = self.jobs.get(job_id)
+        if job is None and self.board is not None:
+            return self._cancel_shared(job_id)
+        if job is None or job.finished:
+            return job
+        if job._task is None:
+            self._finish(job, CANCELLED, "Cancelled before it started")
+        else:
+            job.message = "Cancelling..."
+            job._task.cancel()
+        return job
+
+    def _cancel_shared(self, job_id: str):
+        """Cancel a job of the board that isn't running in this process"""
+        state = self.board.get(job_id)
+        if state is None or state['status'] in FINISHED:
+            return JobView(state) if state else None
+        if self.board.cancel_queued(job_id):
+            job = Job(state['kind'], self.handlers.get(state['kind']), state.get('params'),
+                      publish=self._publish, job_id=job_id)
+            job.created_at = state['created_at']
+            self._adopt(job)
+            self._finish(job, CANCELLED, "Cancelled before it started")
+            return job
+        # Running elsewhere: its worker cancels it on its next poll
+        self.board.request_cancel(job_id)
+        state['message'] = "Cancelling..."
+        return JobView(state)
+
+    async def stop(self):
+        """Cancel running jobs and stop the workers"""
+        for job in self.jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def start(self):
+        """Start the workers (done on first submit; call at startup to take jobs from a shared board)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._wake = asyncio.Event()
+        if not self._workers:
+            if self.board is None:
+                self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+            else:
+                self._workers = [asyncio.create_task(self._shared_worker()) for _ in range(self.worker_count)]
+                self._workers.append(asyncio.create_task(self._follow_board()))
+
+    async def _shared_worker(self):
+        while True:
+            claimed = self.board.claim(self.handlers, os.getpid())
+            if claimed is None:
+                self._wake.clear()
+                # wait(), not wait_for(): it never swallows the worker's own cancellation
+                waiter = asyncio.ensure_future(self._wake.wait())
+                try:
+                    await asyncio.wait({waiter}, timeout=BOARD_POLL_SECONDS)
+                finally:
+                    waiter.cancel()
+                continue
+            job = Job(claimed['kind'], self.handlers[claimed['kind']], claimed['params'],
+                      publish=self._publish, job_id=claimed['id'])
+            job.created_at = claimed['created_at']
+            self._adopt(job)
+            await self._run(job)
+
+    async def _follow_board(self):
+        """Relay other workers' events to our subscribers and honour cancel requests"""
+        pid = os.getpid()
+        last = max(0, self.board.last_seq() - EVENT_BACKLOG)
+        while True:
+            for event in self.board.events_after(last):
+                last = event["seq"]
+                if event.pop("origin") != pid:
+                    self.events.append(event)
+                    self._deliver(event)
+            for job_id in self.board.cancel_requests(pid):
+                job = self.jobs.get(job_id)
+                if job is not None and not job.finished and job.message != "Cancelling...":
+                    self.cancel(job_id)
+            await asyncio.sleep(BOARD_POLL_SECONDS)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.finished:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.emit('job_started')
+        print(f"⏳ Job {job.id} ({job.kind}) started")
+        job._task = asyncio.create_task(job._handler(job))
+        try:
+            # wait() keeps cancel() of the job apart from the worker being stopped
+            await asyncio.wait({job._task})
+        except asyncio.CancelledError:
+            job._task.cancel()
+            self._finish(job, CANCELLED, "Cancelled")
+            raise
+        if job._task.cancelled():
+            self._finish(job, CANCELLED, "Cancelled")
+        elif job._task.exception() is not None:
+            job.error = str(job._task.exception())
+            self._finish(job, FAILED)
+        else:
+            job.summary = job._task.result()
+            self._finish(job, SUCCEEDED)
+
+    def _finish(self, job: Job, status: str, message: Optional[str] = None):
+        job.status = status
+        if message is not None:
+            job.message = message
+        job.finished_at = time.time()
+        JOBS_FINISHED.inc(1, job.kind, status)
+        job.emit('job_finished', status=status, message=job.message, error=job.error,
+                 completed=job.completed, failed=job.failed, summary=job.summary)
+        elapsed = job.finished_at - (job.started_at or job.created_at)
+        print(f"{'✅' if status == SUCCEEDED else '⚠️'} Job {job.id} ({job.kind}) {status} "
+              f"after {elapsed:.1f}s: {job.completed} done, {job.failed} failed")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Request and internals metrics in Prometheus text format.
+
+The server only ever reported what it was doing through print(), so there was
+no way to tell which routes were slow. This module keeps a small in-process
+registry of counters, gauges and histograms and serves it at /metrics:
+
+- per route (the route pattern, e.g. /api/jobs/{job_id}, never the raw
+  path): requests by status, latency histogram and requests in flight, from
+  metrics_middleware
+- content store load and write durations
+- bytes serialized by serialization.dumps()/pack()
+- analysis durations (pool tasks and cached analyzers) and cache lookups
+- finished jobs, plus whatever collectors the server registers (cache sizes)
+
+Recording is a dict update under a lock, cheap enough to leave on. With
+several server workers (see web_workers.py) each worker also writes its
+samples to CONCIERTO_METRICS_DIR every few seconds, and /metrics on any
+worker adds up all of them. Samples of exited workers keep counting (so
+counters never go backwards) except for gauges.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a cached 304 to a slow analysis
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# How often workers publish their samples for the others to aggregate
+FLUSH_SECONDS = 5
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """A metric family: one value (or histogram) per combination of label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[Tuple, object]]:
+        with self._lock:
+            return [(key, _copy(value)) for key, value in self._values.items()]
+
+    def render(self, samples) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(samples, key=lambda s: tuple(map(str, s[0]))):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels):
+        self.inc(-amount, *labels)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # [per-bucket counts (last is +Inf), sum, count]
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *labels) -> '_Timer':
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def render(self, samples) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(samples, key=lambda s: tuple(map(str, s[0]))):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+def _copy(value):
+    return [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+
+
+def _merge(kind: str, a, b):
+    if kind == 'histogram':
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+    return a + b
+
+
+# A collector returns extra gauge samples at scrape time: [(name, help, {label: value}, value)]
+Collector = Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]
+
+
+class Registry:
+    """Named metrics of this process, plus scrape-time collectors"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric: Metric) -> Metric:
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector: Collector):
+        self.collectors.append(collector)
+
+    # Sharing between worker processes
+
+    def snapshot(self) -> Dict:
+        return {name: [[list(key), value] for key, value in metric.samples()]
+                for name, metric in self.metrics.items()}
+
+    def write_snapshot(self, directory) -> None:
+        directory = Path(directory)
+        path = directory / f"{os.getpid()}.json"
+        tmp_path = directory / f".{os.getpid()}.tmp"
+        # Plain json: serialization.py is instrumented with these metrics
+        tmp_path.write_text(json.dumps({'pid': os.getpid(), 'metrics': self.snapshot()}))
+        os.replace(tmp_path, path)
+
+    def _all_samples(self, directory) -> Dict[str, Dict[Tuple, object]]:
+        """Samples of every worker that wrote to directory, this one's current"""
+        merged: Dict[str, Dict[Tuple, object]] = {name: {} for name in self.metrics}
+        snapshots = [(os.getpid(), self.snapshot())]
+        for path in Path(directory).glob('*.json'):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if data['pid'] != os.getpid():
+                snapshots.append((data['pid'], data['metrics']))
+        for pid, metrics in snapshots:
+            alive = pid == os.getpid() or _alive(pid)
+            for name, samples in metrics.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not alive):
+                    continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = _merge(metric.kind, values[key], value) if key in values else value
+        return merged
+
+    def render(self, directory=None) -> str:
+        if directory:
+            samples = self._all_samples(directory)
+        else:
+            samples = {name: dict(metric.samples()) for name, metric in self.metrics.items()}
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            if samples[name]:
+                lines.extend(metric.render(samples[name].items()))
+        collected: Dict[str, List] = {}
+        for collector in self.collectors:
+            try:
+                for name, help_text, labels, value in collector():
+                    collected.setdefault(name, [help_text, []])[1].append((labels, value))
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        for name, (help_text, values) in sorted(collected.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values:
+                lines.append(f"{name}{_label_text(list(labels), list(labels.values()))} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'concierto_http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'concierto_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'concierto_http_requests_in_flight', 'HTTP requests being handled, by route', ('route',))
+STORE_LOAD = REGISTRY.histogram(
+    'concierto_store_load_seconds', 'Full content document loads from the store backend', ('backend',))
+STORE_WRITE = REGISTRY.histogram(
+    'concierto_store_write_seconds', 'Content store writes by operation', ('backend', 'operation'))
+SERIALIZED_BYTES = REGISTRY.counter(
+    'concierto_serialized_bytes_total', 'Bytes produced by serialization.dumps()/pack()', ('format',))
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    'concierto_analysis_seconds', 'Analysis run in the worker pool, including queueing', ('function',))
+ANALYZER_SECONDS = REGISTRY.histogram(
+    'concierto_analyzer_seconds', 'Cached analyzers computed in this process (cache misses)', ('analyzer',))
+ANALYZER_LOOKUPS = REGISTRY.counter(
+    'concierto_analyzer_cache_lookups_total', 'Analysis cache lookups made in this process', ('analyzer', 'result'))
+JOBS_FINISHED = REGISTRY.counter(
+    'concierto_jobs_finished_total', 'Background jobs by kind and final status', ('kind', 'status'))
+
+
+def metrics_dir() -> Optional[str]:
+    """Directory shared by server workers (set by the supervisor), if any"""
+    return os.getenv('CONCIERTO_METRICS_DIR', '').strip() or None
+
+
+def route_name(request) -> str:
+    """Route pattern of a request, so raw paths and ids don't become labels"""
+    resource = request.match_info.route.resource
+    return resource.canonical if resource is not None else 'unmatched'
+
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+if web is not None:
+    @web.middleware
+    async def metrics_middleware(request, handler):
+        """Count, time and track in-flight requests per route"""
+        route = route_name(request)
+        status = 500
+        HTTP_IN_FLIGHT.inc(1, route)
+        started = time.perf_counter()
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - started, request.method, route)
+            HTTP_REQUESTS.inc(1, request.method, route, status)
+            HTTP_IN_FLIGHT.dec(1, route)
+
+    async def metrics_handler(request):
+        """Prometheus scrape endpoint"""
+        return web.Response(body=REGISTRY.render(metrics_dir()).encode('utf-8'),
+                            headers={'Content-Type': CONTENT_TYPE, 'Cache-Control': 'no-store'})
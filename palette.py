@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Palette quantization over a colour histogram.
+
+The style vectors, the semantic analyzer and the brand intelligence engine
+each fitted sklearn KMeans (n_init=10) to find an image's dominant colours -
+brand intelligence on every pixel of the image. Here the pixels are first
+reduced to the mean colour and pixel count of each occupied bin of a 3-D
+histogram (binned_colors, 5 bits per channel: at most 32768 bins), and the
+palette is found by clustering those weighted bins, so its cost is bounded by
+the histogram size rather than the pixel count. Methods:
+
+- kmeans: weighted k-means++ initialisation and Lloyd iterations (default)
+- minibatch: mini-batch k-means on bins drawn by weight, for large k
+- median_cut: recursively split the most varied box at its weighted median
+- octree: fold the lightest octree nodes into their parents until k leaves remain
+
+More can be added to METHODS. Every method is deterministic for a given seed
+(PALETTE_SEED unless one is passed); CONCIERTO_PALETTE_METHOD picks the
+default, and cached analyzers that build palettes include it in their cache
+keys (the `settings` of @cached_analysis). Each palette colour is the pixel-weighted mean of the bins assigned
+to it, and palettes are ordered by the share of the image they cover.
+`python palette_benchmark.py` compares the methods with the KMeans they
+replaced.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from color_histogram import binned_colors
+
+PALETTE_SEED = 42
+PALETTE_BITS = 5
+DEFAULT_METHOD = 'kmeans'
+
+KMEANS_INITS = 4
+KMEANS_MAX_ITER = 100
+# Converged when centers move less than this times the colours' variance (as sklearn)
+KMEANS_TOLERANCE = 1e-4
+MINIBATCH_SIZE = 1024
+MINIBATCH_ITER = 100
+
+
+@dataclass
+class Palette:
+    """Palette colours, most prominent first"""
+    colors: np.ndarray    # (k, 3) float64 RGB
+    weights: np.ndarray   # (k,) share of the pixels each colour stands for
+    method: str
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """(k, 3) int colours, truncated like cluster_centers_.astype(int)"""
+        return np.clip(self.colors, 0, 255).astype(int)
+
+    def hex(self) -> List[str]:
+        return ['#{:02x}{:02x}{:02x}'.format(*color) for color in self.rgb.tolist()]
+
+
+def _sq_distances(colors: np.ndarray, centers: np.ndarray, color_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """(m, k) squared distances between colours and centers"""
+    if color_norms is None:
+        color_norms = np.sum(colors ** 2, axis=1)
+    distances = color_norms[:, None] - 2 * colors @ centers.T + np.sum(centers ** 2, axis=1)[None, :]
+    return np.maximum(distances, 0, out=distances)
+
+
+def _weighted_means(colors: np.ndarray, weights: np.ndarray, labels: np.ndarray, k: int):
+    """(k, 3) weighted mean colour and (k,) total weight of each label"""
+    totals = np.bincount(labels, weights=weights, minlength=k)
+    sums = np.stack([np.bincount(labels, weights=weights * colors[:, c], minlength=k) for c in range(3)], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / totals[:, None], totals
+
+
+def _kmeans_plus_plus(colors, weights, k, rng) -> np.ndarray:
+    """k-means++ seeding, each candidate drawn with probability weight x distance²"""
+    centers = [colors[rng.choice(len(colors), p=weights / weights.sum())]]
+    closest = _sq_distances(colors, centers[0][None, :])[:, 0]
+    for _ in range(1, k):
+        p = weights * closest
+        if p.sum() <= 0:
+            break
+        center = colors[rng.choice(len(colors), p=p / p.sum())]
+        centers.append(center)
+        closest = np.minimum(closest, _sq_distances(colors, center[None, :])[:, 0])
+    return np.array(centers)
+
+
+def kmeans(colors, weights, k, rng) -> np.ndarray:
+    """Weighted Lloyd k-means from k-means++ seeds; the best of KMEANS_INITS runs"""
+    best_labels, best_inertia = None, np.inf
+    mean = np.average(colors, axis=0, weights=weights)
+    tolerance = KMEANS_TOLERANCE * np.mean(np.average((colors - mean) ** 2, axis=0, weights=weights))
+    norms = np.sum(colors ** 2, axis=1)
+    for _ in range(KMEANS_INITS):
+        centers = _kmeans_plus_plus(colors, weights, k, rng)
+        for _ in range(KMEANS_MAX_ITER):
+            distances = _sq_distances(colors, centers, norms)
+            labels = distances.argmin(axis=1)
+            means, totals = _weighted_means(colors, weights, labels, len(centers))
+            empty = totals == 0
+            if empty.any():
+                # Reseed empty clusters at the colours worst served so far
+                worst = np.argsort(weights * distances[np.arange(len(colors)), labels])[::-1]
+                means[empty] = colors[worst[:empty.sum()]]
+            shift = np.sum((means - centers) ** 2)
+            centers = means
+            if shift <= tolerance:
+                break
+        distances = _sq_distances(colors, centers, norms)
+        labels = distances.argmin(axis=1)
+        inertia = np.sum(weights * distances[np.arange(len(colors)), labels])
+        if inertia < best_inertia:
+            best_labels, best_inertia = labels, inertia
+    return best_labels
+
+
+def minibatch_kmeans(colors, weights, k, rng) -> np.ndarray:
+    """Mini-batch k-means: centers follow batches of bins drawn by weight"""
+    centers = _kmeans_plus_plus(colors, weights, k, rng).astype(np.float64)
+    seen = np.zeros(len(centers))
+    p = weights / weights.sum()
+    for _ in range(MINIBATCH_ITER):
+        batch = colors[rng.choice(len(colors), size=MINIBATCH_SIZE, p=p)]
+        labels = _sq_distances(batch, centers).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        hit = counts > 0
+        sums = np.stack([np.bincount(labels, weights=batch[:, c], minlength=len(centers)) for c in range(3)], axis=1)
+        seen += counts
+        # Per-center learning rate: batch points over all points it has seen
+        centers[hit] += (sums[hit] - counts[hit, None] * centers[hit]) / seen[hit, None]
+    return _sq_distances(colors, centers).argmin(axis=1)
+
+
+def median_cut(colors, weights, k, rng) -> np.ndarray:
+    """Split the box with the largest weighted variance at its weighted median, until k boxes"""
+    boxes = [np.arange(len(colors))]
+    while len(boxes) < k:
+        spread = []
+        for box in boxes:
+            if len(box) < 2:
+                spread.append(-1.0)
+                continue
+            mean = np.average(colors[box], axis=0, weights=weights[box])
+            spread.append(np.sum(weights[box] * np.sum((colors[box] - mean) ** 2, axis=1)))
+        index = int(np.argmax(spread))
+        if spread[index] <= 0:
+            break
+        box = boxes.pop(index)
+        channel = int(np.argmax(np.ptp(colors[box], axis=0)))
+        box = box[np.argsort(colors[box, channel], kind='stable')]
+        cumulative = np.cumsum(weights[box])
+        split = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+        split = min(max(split, 1), len(box) - 1)
+        boxes.extend([box[:split], box[split:]])
+    labels = np.empty(len(colors), dtype=np.intp)
+    for label, box in enumerate(boxes):
+        labels[box] = label
+    return labels
+
+
+def octree(colors, weights, k, rng) -> np.ndarray:
+    """
+    Octree reduction: from the deepest level up, fold the children of the
+    lightest nodes into them until at most k leaves remain. The eight
+    top-level octants are never folded into one; if more than k of them are
+    left, the lightest leaves join the leaf nearest in colour.
+    """
+    values = np.clip(colors, 0, 255).astype(np.int64)
+    level = np.full(len(colors), 8)   # depth of the leaf each colour is in
+
+    def node(depth, index):
+        shifted = values[index] >> (8 - depth)[:, None]
+        return (depth << 24) | (shifted[:, 0] << 16) | (shifted[:, 1] << 8) | shifted[:, 2]
+
+    everything = np.arange(len(colors))
+    for depth in range(8, 1, -1):
+        excess = len(np.unique(node(level, everything))) - k
+        if excess <= 0:
+            break
+        here = np.flatnonzero(level == depth)
+        children, first = np.unique(node(level[here], here), return_index=True)
+        parents, parent_of = np.unique(node(level[here] - 1, here), return_inverse=True)
+        child_counts = np.bincount(parent_of[first], minlength=len(parents))
+        parent_weights = np.bincount(parent_of, weights=weights[here], minlength=len(parents))
+        # Fold the lightest parents first, just enough of them
+        order = np.argsort(parent_weights, kind='stable')
+        reduced = np.cumsum(child_counts[order] - 1)
+        done = reduced[-1] >= excess
+        needed = int(np.searchsorted(reduced, excess)) + 1 if done else len(order)
+        level[here[np.isin(parent_of, order[:needed])]] = depth - 1
+        if done:
+            break
+    labels = np.unique(node(level, everything), return_inverse=True)[1]
+    while labels.max() + 1 > k:
+        means, totals = _weighted_means(colors, weights, labels, labels.max() + 1)
+        lightest = int(np.argmin(totals))
+        distances = np.sum((means - means[lightest]) ** 2, axis=1)
+        distances[lightest] = np.inf
+        labels[labels == lightest] = int(np.argmin(distances))
+        labels = np.unique(labels, return_inverse=True)[1]
+    return labels
+
+
+METHODS: Dict[str, Callable] = {
+    'kmeans': kmeans,
+    'minibatch': minibatch_kmeans,
+    'median_cut': median_cut,
+    'octree': octree,
+}
+
+
+def default_method() -> str:
+    """CONCIERTO_PALETTE_METHOD, else kmeans"""
+    method = os.getenv('CONCIERTO_PALETTE_METHOD', '').strip() or DEFAULT_METHOD
+    if method not in METHODS:
+        raise ValueError(f"Unknown palette method: {method} (choose from {', '.join(METHODS)})")
+    return method
+
+
+def quantize(colors: np.ndarray, counts: np.ndarray, n_colors: int, method: Optional[str] = None,
+             seed: int = PALETTE_SEED) -> Palette:
+    """Palette of at most n_colors for histogram bins (mean colours and pixel counts)"""
+    method = method or default_method()
+    if method not in METHODS:
+        raise ValueError(f"Unknown palette method: {method} (choose from {', '.join(METHODS)})")
+    colors = np.asarray(colors, dtype=np.float64)
+    weights = np.asarray(counts, dtype=np.float64)
+    k = min(n_colors, len(colors))
+    if k <= 0:
+        return Palette(np.zeros((0, 3)), np.zeros(0), method)
+    if k == len(colors):
+        labels = np.arange(k)
+    else:
+        labels = METHODS[method](colors, weights, k, np.random.default_rng(seed))
+    labels = np.unique(labels, return_inverse=True)[1]
+    means, totals = _weighted_means(colors, weights, labels, labels.max() + 1)
+    order = np.argsort(-totals, kind='stable')
+    return Palette(means[order], totals[order] / weights.sum(), method)
+
+
+def extract_palette(pixels: np.ndarray, n_colors: int, method: Optional[str] = None,
+                    bits: int = PALETTE_BITS, seed: int = PALETTE_SEED) -> Palette:
+    """Palette of at most n_colors for (..., 3) uint8 pixels"""
+    colors, counts = binned_colors(pixels, bits)
+    return quantize(colors, counts, n_colors, method, seed)
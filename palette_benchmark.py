@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: palette quantizers vs the sklearn KMeans palettes they replaced
+
+For each image, times every palette.py method and the previous KMeans
+extraction (n_init=10 on all pixels, as brand intelligence did, and on a
+5000-pixel sample, as the semantic analyzer did), and reports
+
+- error: root mean squared RGB distance from each pixel to its nearest
+  palette colour (lower is better)
+- vs kmeans: mean distance from each KMeans colour to the nearest colour of
+  the palette (how far the new palette is from the old output)
+
+Usage: python palette_benchmark.py [image ...] [--colors N]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from image_context import ImageContext
+from palette import METHODS, PALETTE_SEED, extract_palette
+
+try:
+    from sklearn.cluster import KMeans
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+# Pixels scored per image (a fixed random sample keeps scoring fast)
+SCORE_PIXELS = 200000
+
+
+def palette_error(pixels: np.ndarray, colors: np.ndarray) -> float:
+    distances = ((pixels[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2)
+    return float(np.sqrt(distances.min(axis=1).mean()))
+
+
+def palette_distance(reference: np.ndarray, colors: np.ndarray) -> float:
+    distances = np.sqrt(((reference[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2))
+    return float(distances.min(axis=1).mean())
+
+
+def kmeans_palette(pixels: np.ndarray, n_colors: int, sample: int = 0) -> np.ndarray:
+    if sample and len(pixels) > sample:
+        pixels = pixels[np.random.default_rng(PALETTE_SEED).choice(len(pixels), sample, replace=False)]
+    n_clusters = min(n_colors, len(np.unique(pixels, axis=0)))
+    return KMeans(n_clusters=n_clusters, random_state=PALETTE_SEED, n_init=10).fit(pixels).cluster_centers_
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def benchmark(image_path: str, n_colors: int):
+    context = ImageContext(image_path)
+    pixels = context.rgb.reshape(-1, 3).astype(np.float64)
+    scored = pixels
+    if len(pixels) > SCORE_PIXELS:
+        scored = pixels[np.random.default_rng(0).choice(len(pixels), SCORE_PIXELS, replace=False)]
+
+    print(f"\n📸 {Path(image_path).name} ({context.width}x{context.height}), {n_colors} colours")
+    print(f"   {'method':<22}{'time':>10}{'error':>10}{'vs kmeans':>12}")
+
+    reference = None
+    rows = []
+    if SKLEARN_AVAILABLE:
+        reference, elapsed = timed(lambda: kmeans_palette(pixels, n_colors))
+        rows.append(('sklearn kmeans (all)', elapsed, reference))
+        sampled, elapsed = timed(lambda: kmeans_palette(pixels, n_colors, sample=5000))
+        rows.append(('sklearn kmeans (5000)', elapsed, sampled))
+    for method in METHODS:
+        result, elapsed = timed(lambda: extract_palette(context.rgb, n_colors, method))
+        rows.append((method, elapsed, result.colors))
+
+    for name, elapsed, colors in rows:
+        versus = f"{palette_distance(reference, colors):>12.1f}" if reference is not None else f"{'-':>12}"
+        print(f"   {name:<22}{elapsed * 1000:>8.0f}ms{palette_error(scored, colors):>10.1f}{versus}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark palette quantizers against sklearn KMeans")
+    parser.add_argument('images', nargs='*', help="Images (default: a few from content/)")
+    parser.add_argument('--colors', type=int, default=5, help="Palette size (default 5)")
+    args = parser.parse_args()
+
+    images = args.images
+    if not images:
+        for folder in ("content/manual-input/images", "content/images"):
+            images += [str(p) for p in sorted(Path(folder).glob("*")) if p.suffix.lower() in ('.png', '.jpg', '.jpeg')]
+        images = images[:3]
+    if not images:
+        print("❌ No images found; pass image paths")
+        return
+
+    print("\n🎨 PALETTE QUANTIZER BENCHMARK")
+    print("=" * 56)
+    if not SKLEARN_AVAILABLE:
+        print("⚠️  scikit-learn not installed: no KMeans reference")
+    for image_path in images:
+        benchmark(image_path, args.colors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Cache of rendered brand previews and tokens.
+
+/brand/{id}, /api/brand-preview/{id} and /api/brand-tokens/{id} used to build a
+BrandPreviewGenerator and re-render the whole preview template (or token set)
+on every request, so a shared preview link re-did the same work for every
+visitor. Renders are now cached under a hash of
+
+    (what was rendered, generator version, brand spec, day)
+
+The spec is the brand as the generator sees it, with its source items
+resolved, so editing the brand (or anything it shows) changes the key and
+old renders simply stop being used. The day is included because previews
+print their generation date.
+
+Entries are kept gzip-compressed, in a memory LRU and on disk under
+content/render_cache/ (bounded by file count, oldest evicted), and served
+with a strong ETag. Set CONCIERTO_RENDER_CACHE=memory to skip the disk.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from serialization import dumps_bytes
+
+MEMORY_ENTRIES = 128
+DISK_FILES = 1000
+GZIP_LEVEL = 6
+
+
+def spec_hash(kind: str, version, spec: Dict) -> str:
+    """Stable key for rendering `spec` as `kind` with generator `version`"""
+    canonical = dumps_bytes([kind, version, date.today().isoformat(), spec], sort_keys=True)
+    return hashlib.sha256(canonical).hexdigest()
+
+
+def render_etag(key: str) -> str:
+    return f'"{key[:20]}"'
+
+
+class Rendered:
+    """One cached render: gzip-compressed body plus its ETag and type"""
+
+    __slots__ = ('key', 'gzipped', 'content_type')
+
+    def __init__(self, key: str, gzipped: bytes, content_type: str):
+        self.key = key
+        self.gzipped = gzipped
+        self.content_type = content_type
+
+    @property
+    def etag(self) -> str:
+        return render_etag(self.key)
+
+    def body(self) -> bytes:
+        """Uncompressed body, for clients that don't accept gzip"""
+        return gzip.decompress(self.gzipped)
+
+
+class RenderCache:
+    """Memory LRU of compressed renders, backed by an optional directory"""
+
+    def __init__(self, directory=None, memory_entries: int = MEMORY_ENTRIES, disk_files: int = DISK_FILES):
+        self.directory = Path(directory) if directory else None
+        self.memory_entries = memory_entries
+        self.disk_files = disk_files
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Rendered]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+        # (brand id, store version, stamp) -> spec hash, so repeat hits skip hashing
+        self._keys: 'OrderedDict[Tuple, str]' = OrderedDict()
+
+    def key_for(self, kind: str, version, brand_id: str, store_state: Tuple,
+                load_spec: Callable[[], Optional[Dict]]) -> Optional[str]:
+        """
+        Cache key of a brand render, memoized while the store is unchanged.
+        Returns None if load_spec() finds no brand.
+        """
+        memo_key = (kind, version, brand_id, store_state, date.today())
+        with self._lock:
+            key = self._keys.get(memo_key)
+            if key is not None:
+                self._keys.move_to_end(memo_key)
+                return key
+        spec = load_spec()
+        if spec is None:
+            return None
+        key = spec_hash(kind, version, spec)
+        with self._lock:
+            self._keys[memo_key] = key
+            while len(self._keys) > self.memory_entries * 4:
+                self._keys.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[Rendered]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(entry)
+        return entry
+
+    async def get_or_render(self, key: str, render: Callable[[], bytes], content_type: str) -> Rendered:
+        """
+        Cached render for key, or run render() (in a thread) and cache it.
+        Concurrent misses for one key share a single render.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            entry = await asyncio.to_thread(self._render, key, render, content_type)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()   # don't warn if nobody else was waiting
+            raise
+        finally:
+            del self._pending[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'disk': str(self.directory) if self.directory else None}
+
+    def _render(self, key: str, render: Callable[[], bytes], content_type: str) -> Rendered:
+        entry = Rendered(key, gzip.compress(render(), compresslevel=GZIP_LEVEL), content_type)
+        with self._lock:
+            self._remember(entry)
+        self._write(entry)
+        return entry
+
+    def _remember(self, entry: Rendered):
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        while len(self._entries) > self.memory_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.gz"
+
+    def _read(self, key: str) -> Optional[Rendered]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        content_type, _, gzipped = data.partition(b'\n')
+        return Rendered(key, gzipped, content_type.decode('ascii'))
+
+    def _write(self, entry: Rendered):
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(entry.key)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(entry.content_type.encode('ascii') + b'\n' + entry.gzipped)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError as e:
+            print(f"⚠️ Could not write render cache entry: {e}")
+
+    def _evict(self):
+        """Drop the least recently used files beyond the disk limit"""
+        files = list(self.directory.glob('*.gz'))
+        if len(files) <= self.disk_files:
+            return
+        by_age = []
+        for path in files:
+            try:
+                by_age.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                pass
+        by_age.sort()
+        for _, path in by_age[:len(by_age) - self.disk_files]:
+            path.unlink(missing_ok=True)
+
+
+def open_render_cache(content_dir) -> RenderCache:
+    """Render cache configured from CONCIERTO_RENDER_CACHE (a directory, or "memory")"""
+    setting = os.getenv('CONCIERTO_RENDER_CACHE', '').strip()
+    if setting.lower() == 'memory':
+        return RenderCache()
+    return RenderCache(setting or Path(content_dir) / "render_cache")
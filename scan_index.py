@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Incremental scanning of content/images.
+
+Scans used to list the directory and compare filenames against every item in
+the library, so a renamed file was analyzed again as a new image, a replaced
+file (same name, new pixels) was never re-analyzed, and every scan paid for
+a full directory walk plus a document load.
+
+ScanIndex keeps a persistent record of filename -> (size, mtime, sha256) in
+content/scan_index.json. A scan stats each entry, hashes only files whose
+size or mtime changed, matches new hashes against vanished files to detect
+renames, and returns just the delta for the caller to analyze.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from serialization import dumps_bytes, loads
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
+
+INDEX_VERSION = 1
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ScanDelta:
+    """What changed in the directory since the last scan"""
+    added: List[Path] = field(default_factory=list)
+    changed: List[Path] = field(default_factory=list)
+    renamed: List[Tuple[str, Path]] = field(default_factory=list)   # (old filename, new path)
+    hashes: Dict[str, str] = field(default_factory=dict)            # filename -> sha256, for added/changed/renamed
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.renamed)
+
+
+class ScanIndex:
+    """
+    Persistent stat/hash cache for one directory.
+
+    scan() updates the in-memory index and returns the delta; save() persists
+    it. Callers save only after they have recorded the delta, so a crash
+    mid-analysis means the same files show up again on the next scan. Where
+    several processes share the index, refresh() picks up their saves.
+    Deleted files are dropped from the index (their items stay in the
+    library); that is persisted with the next save.
+    """
+
+    def __init__(self, directory, index_path, extensions: Iterable[str] = IMAGE_EXTENSIONS):
+        self.directory = Path(directory)
+        self.index_path = Path(index_path)
+        self.extensions = {e.lower() for e in extensions}
+        self._stamp = None
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refresh(self) -> None:
+        """Reload the index if another process saved it since we last did"""
+        if self._file_stamp() != self._stamp:
+            self.entries = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        self._stamp = self._file_stamp()
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = loads(f.read())
+            if data.get('version') == INDEX_VERSION:
+                return data.get('files', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Rebuilding scan index {self.index_path}: {e}")
+        return {}
+
+    def save(self) -> None:
+        """Persist the index (atomically, via a temporary sibling file)"""
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(dumps_bytes({'version': INDEX_VERSION, 'files': self.entries}))
+        os.replace(tmp_path, self.index_path)
+        self._stamp = self._file_stamp()
+
+    def filenames(self) -> List[str]:
+        """Files present as of the last scan"""
+        return list(self.entries)
+
+    def sha256(self, filename: str) -> Optional[str]:
+        entry = self.entries.get(filename)
+        return entry['sha256'] if entry else None
+
+    def record(self, path, sha256: str) -> None:
+        """Add a file the caller has already hashed (e.g. an upload), so scans skip it"""
+        st = os.stat(path)
+        self.entries[Path(path).name] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': sha256}
+
+    def scan(self) -> ScanDelta:
+        """Stat the directory and return what changed since the last scan"""
+        delta = ScanDelta()
+        seen = {}
+        fresh = {}   # filename -> (entry, path) for new or modified files
+
+        with os.scandir(self.directory) as listing:
+            for entry in listing:
+                if not entry.is_file() or Path(entry.name).suffix.lower() not in self.extensions:
+                    continue
+                st = entry.stat()
+                known = self.entries.get(entry.name)
+                if known and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns:
+                    seen[entry.name] = known
+                    continue
+                try:
+                    digest = file_sha256(entry.path)
+                except OSError as e:
+                    print(f"⚠️ Could not hash {entry.name}: {e}")
+                    continue
+                record = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+                seen[entry.name] = record
+                if known and known['sha256'] == digest:
+                    continue   # touched, not modified
+                fresh[entry.name] = (record, Path(entry.path))
+
+        vanished_by_hash = {}
+        for name, e in self.entries.items():
+            if name not in seen:
+                vanished_by_hash.setdefault(e['sha256'], []).append(name)
+
+        for name, (record, path) in fresh.items():
+            delta.hashes[name] = record['sha256']
+            if name in self.entries:
+                delta.changed.append(path)
+            elif vanished_by_hash.get(record['sha256']):
+                delta.renamed.append((vanished_by_hash[record['sha256']].pop(), path))
+            else:
+                delta.added.append(path)
+
+        self.entries = seen
+        return delta
@@ -8,15 +8,12 @@ No hallucinated brand strategies or fake specifications
 import numpy as np
 from PIL import Image
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import colorsys
 from datetime import datetime
-
-try:
-    from sklearn.cluster import KMeans
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+from palette import default_method
 
 class SemanticAnalyzer:
     """
@@ -24,9 +21,12 @@ class SemanticAnalyzer:
     Only returns what can actually be determined from the image
     """
     
-    def analyze_image(self, image_path: str, description: str = "") -> Dict:
+    @cached_analysis('semantic', version=3, settings={'palette_method': default_method})
+    def analyze_image(self, image_path: Union[str, ImageContext], description: str = "") -> Dict:
         """
         Analyze an image and return ONLY what we can actually determine
+
+        image_path may also be an ImageContext shared with other analyzers
         
         Returns:
             - colors: Actual extracted colors with weights
@@ -35,9 +35,10 @@ class SemanticAnalyzer:
             - description_keywords: Keywords from provided description (if any)
         """
         try:
-            # Load image
-            img = Image.open(image_path).convert('RGB')
-            img_array = np.array(img)
+            # Load image (decoded once per context)
+            context = ImageContext.of(image_path)
+            img = context.image
+            img_array = context.rgb
             
             # Extract real colors
             colors = self._extract_colors(img_array)
@@ -53,7 +54,7 @@ class SemanticAnalyzer:
             
             return {
                 'analyzed_at': datetime.now().isoformat(),
-                'file_path': str(image_path),
+                'file_path': str(context),
                 'colors': colors,
                 'composition': composition,
                 'visual_properties': visual_properties,
@@ -74,16 +75,14 @@ class SemanticAnalyzer:
         pixels = img_array.reshape(-1, 3)
         
         # Get unique colors and their counts
-        from collections import Counter
-        pixel_tuples = [tuple(p) for p in pixels]
-        color_counts = Counter(pixel_tuples)
+        color_counts = ImageContext.of(img_array).histogram()
         total_pixels = len(pixels)
         
         # Get most common colors
-        most_common = color_counts.most_common(10)
+        most_common = color_counts.most_common(8)
         
         colors = []
-        for color_tuple, count in most_common[:8]:
+        for color_tuple, count in most_common:
             hex_color = '#{:02x}{:02x}{:02x}'.format(
                 color_tuple[0], color_tuple[1], color_tuple[2]
             )
@@ -101,33 +100,17 @@ class SemanticAnalyzer:
                 'hue': round(h * 360, 1)  # Convert to degrees
             })
         
-        # Use clustering for dominant color groups if sklearn available
+        # Dominant color groups, clustered from the color histogram
         dominant_groups = []
-        if SKLEARN_AVAILABLE and len(pixels) > 100:
-            # Sample for speed
-            sample_size = min(5000, len(pixels))
-            if len(pixels) > sample_size:
-                indices = np.random.choice(len(pixels), sample_size, replace=False)
-                sample_pixels = pixels[indices]
-            else:
-                sample_pixels = pixels
-            
-            # Cluster into color groups
-            n_clusters = min(5, len(np.unique(sample_pixels, axis=0)))
-            if n_clusters > 1:
-                kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-                kmeans.fit(sample_pixels)
-                
-                for center in kmeans.cluster_centers_:
-                    hex_color = '#{:02x}{:02x}{:02x}'.format(
-                        int(center[0]), int(center[1]), int(center[2])
-                    )
-                    dominant_groups.append(hex_color)
+        if len(pixels) > 100:
+            palette = ImageContext.of(img_array).palette(5)
+            if len(palette) > 1:
+                dominant_groups = palette.hex()
         
         return {
             'most_common': colors,
             'dominant_groups': dominant_groups,
-            'total_unique_colors': min(len(color_counts), 10000)  # Cap for sanity
+            'total_unique_colors': min(color_counts.unique_count, 10000)  # Cap for sanity
         }
     
     def _analyze_composition(self, img: Image) -> Dict:
@@ -157,23 +140,16 @@ class SemanticAnalyzer:
     def _calculate_visual_properties(self, img_array: np.ndarray) -> Dict:
         """Calculate measurable visual properties"""
         # Convert to grayscale for some calculations
-        gray = np.mean(img_array, axis=2)
+        context = ImageContext.of(img_array)
+        gray = context.gray
         
         # Calculate actual measurable properties
         brightness = round(np.mean(gray) / 255, 2)
         contrast = round(np.std(gray) / 128, 2)  # Normalized
         
-        # Color saturation (average)
-        saturations = []
-        # Sample pixels for saturation calculation
+        # Color saturation (average) of sampled pixels
         sample_size = min(1000, img_array.shape[0] * img_array.shape[1])
-        h, w = img_array.shape[:2]
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            _, s, _ = colorsys.rgb_to_hsv(r, g, b)
-            saturations.append(s)
+        saturations = context.sample_hsv(sample_size)[:, 1]
         
         avg_saturation = round(np.mean(saturations), 2)
         
@@ -192,15 +168,10 @@ class SemanticAnalyzer:
         """Check if image is grayscale"""
         # Sample some pixels
         sample_size = min(100, img_array.shape[0] * img_array.shape[1])
-        h, w = img_array.shape[:2]
+        pixels = ImageContext.of(img_array).sample(sample_size)
         
-        color_differences = []
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            # Check if R, G, B are similar
-            diff = np.max(pixel) - np.min(pixel)
-            color_differences.append(diff)
+        # Check if R, G, B are similar
+        color_differences = pixels.max(axis=1) - pixels.min(axis=1)
         
         # If most pixels have similar RGB values, it's grayscale
         avg_diff = np.mean(color_differences)
@@ -235,7 +206,7 @@ class SemanticAnalyzer:
         return list(set(keywords))[:20]  # Limit to 20 keywords
 
 
-def analyze_semantic(image_path: str, description: str = "") -> Dict:
+def analyze_semantic(image_path: Union[str, ImageContext], description: str = "") -> Dict:
     """
     Simple integration function for semantic analysis
     
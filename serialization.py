@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Serialization for storage and API responses.
+
+Everything used to go through the stdlib json module - data.json rewrites,
+journal lines, SQLite JSON columns and every web.json_response - with NumPy
+values converted by hand first. This module is the one place that encodes and
+decodes:
+
+- dumps()/loads(): JSON via orjson when it is installed (several times faster,
+  native numpy support), falling back to the stdlib encoder
+- pack()/unpack(): compact binary encoding for internal caches - msgpack when
+  installed, JSON bytes otherwise. Packed data records which format it used,
+  so either side can read data written by the other.
+- json_response(): drop-in for aiohttp's web.json_response using dumps()
+
+Both paths accept numpy scalars and arrays anywhere in the value.
+"""
+
+import json
+from typing import Any, Optional, Union
+
+from metrics import SERIALIZED_BYTES
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# pack() format markers
+_PACK_MSGPACK = b'm'
+_PACK_JSON = b'j'
+
+
+def to_builtin(value: Any) -> Any:
+    """Encoder fallback: numpy scalars/arrays (and sets) as plain Python values"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(value: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Encode a value as UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        options = _ORJSON_OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        data = orjson.dumps(value, default=to_builtin, option=options)
+    else:
+        data = json.dumps(value, default=to_builtin, indent=2 if indent else None,
+                          sort_keys=sort_keys, ensure_ascii=False).encode('utf-8')
+    SERIALIZED_BYTES.inc(len(data), 'json')
+    return data
+
+
+def dumps(value: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """Encode a value as a JSON string"""
+    return dumps_bytes(value, indent=indent, sort_keys=sort_keys).decode('utf-8')
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Decode JSON from a string or bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack(value: Any) -> bytes:
+    """Binary encoding for internal caches and snapshots"""
+    if MSGPACK_AVAILABLE:
+        data = msgpack.packb(value, default=to_builtin, use_bin_type=True)
+        SERIALIZED_BYTES.inc(len(data), 'msgpack')
+        return _PACK_MSGPACK + data
+    return _PACK_JSON + dumps_bytes(value)
+
+
+def unpack(data: bytes) -> Any:
+    """Decode pack() output (from either format)"""
+    marker, payload = data[:1], data[1:]
+    if marker == _PACK_MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("Packed data needs msgpack, which is not installed")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if marker == _PACK_JSON:
+        return loads(payload)
+    raise ValueError("Unknown packed data format")
+
+
+def json_response(data: Any = None, *, status: int = 200, reason: Optional[str] = None,
+                  headers=None, content_type: str = 'application/json'):
+    """web.json_response encoded with dumps()"""
+    return web.json_response(data, status=status, reason=reason, headers=headers,
+                             content_type=content_type, dumps=dumps)
@@ -7,12 +7,35 @@ Enhanced with AI image analysis capabilities.
 
 import json
 import os
+import sys
+import argparse
 import asyncio
+import base64
+import hashlib
+import itertools
+import time
+import mimetypes
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 from aiohttp import web
 import aiofiles
 
+from content_store import open_store, empty_document, new_record_id, VersionConflict
+from serialization import dumps, dumps_bytes, json_response
+from http_cache import cache_headers, content_etag, etag_matches, not_modified, query_key, view_etag
+from brand_sources import migrate_brand_sources, resolve_sources, save_brands
+from analysis_executor import AnalysisExecutor, analyze_image_fields, style_vector_fields
+from scan_index import ScanIndex, file_sha256
+from jobs import JobQueue
+from job_board import open_job_board
+from web_workers import ProcessLock, serve, web_worker_count
+from metrics import FLUSH_SECONDS, REGISTRY, metrics_dir, metrics_handler, metrics_middleware
+from analysis_cache import analysis_cache
+from render_cache import open_render_cache, render_etag
+from derivatives import (DerivativeCache, INGEST_WIDTHS, bucket_for, can_derive,
+                         default_format, thumbnail_url)
+
 # Import AI analysis (optional - works without API key)
 try:
     from image_analyzer import SmartContentManager
@@ -94,14 +117,27 @@ class SimpleContentManager:
         self.notes_dir = self.content_dir / "notes"
         self.data_file = self.content_dir / "data.json"
         
+        # Load .env first: it selects the storage backend and holds the API key
+        self._load_env_file()
+        self.store = open_store(content_dir=self.content_dir)
+        # Serializes read-compute-commit sequences between handlers. Only held
+        # around the commit itself, never across OpenAI/analysis awaits.
+        self.write_lock = asyncio.Lock()
+        # CPU-bound style/semantic analysis runs in worker processes
+        self.analysis = AnalysisExecutor()
+        # Held across server worker processes (see web_workers.py)
+        self._scan_lock = ProcessLock(self.content_dir / ".scan.lock")
+        self.scan_index = ScanIndex(self.images_dir, self.content_dir / "scan_index.json")
+        self.derivatives = DerivativeCache(self.content_dir / "derivatives")
+        self.jobs = JobQueue(board=open_job_board())
+        self.renders = open_render_cache(self.content_dir)
+        
         # Initialize AI analyzer if available
         self.ai_manager = None
         self.concept_generator = None
         if AI_AVAILABLE:
-            # Try to load API key from .env file
-            self._load_env_file()
             api_key = os.getenv('OPENAI_API_KEY')
-            self.ai_manager = SmartContentManager(api_key)
+            self.ai_manager = SmartContentManager(api_key, store=self.store, scan_index=self.scan_index)
             print(f"🤖 AI Analysis: {'Enabled' if api_key else 'Disabled (no API key)'}")
             
             # Initialize concept generator
@@ -115,12 +151,30 @@ class SimpleContentManager:
         self.notes_dir.mkdir(exist_ok=True)
         
         # Initialize data file
-        if not self.data_file.exists():
-            self._save_data({
-                "items": [],
-                "tags": [],
-                "last_updated": datetime.now().isoformat()
-            })
+        if not self.store.exists():
+            self._save_data(empty_document())
+        
+        # Brands used to embed full copies of their source items
+        migrated = migrate_brand_sources(self.store)
+        if migrated:
+            print(f"🗜️ Moved source items of {migrated} brands into shared snapshots")
+        
+        # Items scanned before derivatives existed
+        linked = self._link_thumbnails()
+        if linked:
+            print(f"🖼️ Linked thumbnails for {linked} images")
+    
+    def _link_thumbnails(self):
+        """Give image items that have a content hash a thumbnail URL"""
+        updates = {
+            item['id']: {"thumbnail": thumbnail_url(item)}
+            for item in self.store.snapshot().get('items', [])
+            if item.get('type') == 'image' and item.get('content_hash') and not item.get('thumbnail')
+            and can_derive(item.get('path') or '')
+        }
+        if updates:
+            self.store.update_records('items', updates)
+        return len(updates)
     
     def _load_env_file(self):
         """Load environment variables from .env file"""
@@ -134,98 +188,268 @@ class SimpleContentManager:
                         os.environ[key.strip()] = value.strip()
     
     def _load_data(self):
-        """Load content data"""
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {"items": [], "tags": [], "last_updated": datetime.now().isoformat()}
+        """Load a mutable copy of the content data"""
+        return self.store.load()
+    
+    def snapshot(self):
+        """Shared read-only view of the content data (no copy, no re-parse)"""
+        return self.store.snapshot()
     
     def _save_data(self, data):
         """Save content data"""
-        data["last_updated"] = datetime.now().isoformat()
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.store.save(data)
     
-    def scan_images(self):
-        """Scan for new images and add to database"""
+    def get_item(self, item_id):
+        """Get a single item by ID"""
+        return self.store.get_record('items', item_id)
+    
+    def update_item(self, item_id, fields):
+        """Set fields on an item. Returns the updated item or None if not found."""
+        return self.store.update_record('items', item_id, fields)
+    
+    def update_items(self, updates):
+        """Set fields on several items in one write ({item_id: fields})"""
+        return self.store.update_records('items', updates)
+    
+    def get_campaign(self, campaign_id):
+        """Get a single campaign by ID"""
+        return self.store.get_record('campaigns', campaign_id)
+    
+    def update_campaign(self, campaign_id, fields):
+        """Set fields on a campaign. Returns the updated campaign or None if not found."""
+        return self.store.update_record('campaigns', campaign_id, fields)
+    
+    async def commit_updates(self, collection, record_ids, compute, attempts=3):
+        """
+        Update records from fields computed against their latest state.
+        
+        compute({record_id: record}) returns {record_id: fields}. The commit is
+        a compare-and-swap on the document version: if another write lands
+        while we wait for the write lock, the records are re-read and compute
+        runs again, so handlers that awaited something slow merge into
+        concurrent edits instead of overwriting them.
+        """
+        for attempt in range(attempts):
+            version = self.store.version
+            updates = compute({r['id']: r for r in self.store.get_records(collection, record_ids)})
+            if not updates:
+                return {}
+            try:
+                async with self.write_lock:
+                    with self.store.transaction(expected_version=version):
+                        return self.store.update_records(collection, updates)
+            except VersionConflict:
+                if attempt == attempts - 1:
+                    raise
+    
+    def get_brand(self, brand_id):
+        """Get a single brand by ID, with its source items resolved"""
+        return resolve_sources(self.store.get_record('brands', brand_id), self.store)
+    
+    async def scan_images(self, job=None):
+        """Scan for new images and add to database (reporting progress to job, if given)"""
         # Always use basic scanning for now to avoid async issues
         # AI analysis can be triggered separately via API
-        return self._scan_images_basic()
+        return await self._scan_images_basic(job)
     
     async def scan_images_with_ai(self):
         """Async method for AI-powered image analysis"""
         if self.ai_manager:
+            # Bring the library up to date first so AI analysis sees renames
+            await self._scan_images_basic()
             return await self.ai_manager.analyze_and_update_images()
         else:
-            return self._scan_images_basic()
+            return await self._scan_images_basic()
     
-    def _scan_images_basic(self):
-        """Basic image scanning without AI"""
-        data = self._load_data()
-        existing_files = {item.get('filename') for item in data['items'] if item.get('type') == 'image'}
-        
-        new_items = []
-        image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
-        
-        for image_file in self.images_dir.iterdir():
-            if image_file.suffix.lower() in image_extensions and image_file.name not in existing_files:
+    async def _scan_images_basic(self, job=None):
+        """
+        Basic image scanning without AI (analysis runs in the worker pool).
+        
+        Only the scan index delta is processed: new files become items,
+        renamed files keep their item, and replaced files are re-analyzed.
+        The items and the index are committed under the scan lock; analysis
+        runs after it is released, so uploads and other scans don't wait for
+        it, and its fields are added to the items when it finishes. Per-item
+        events go to job, if given.
+        """
+        # One scan at a time, so concurrent uploads don't add a file twice
+        async with self._scan_lock:
+            self.scan_index.refresh()
+            delta = await asyncio.to_thread(self.scan_index.scan)
+            if not delta:
+                return 0
+            
+            new_items = []
+            new_files = []
+            updates = {}
+            for old_name, image_file in delta.renamed:
+                item = self.store.item_by_filename(old_name)
+                if item is None:
+                    delta.added.append(image_file)
+                    continue
+                updates[item['id']] = {
+                    "filename": image_file.name,
+                    "path": f"content/images/{image_file.name}",
+                    "last_modified": datetime.now().isoformat()
+                }
+                print(f"🔀 Renamed {old_name} -> {image_file.name}")
+            
+            for image_file in delta.added:
+                content_hash = delta.hashes[image_file.name]
+                item = self.store.item_by_filename(image_file.name)
+                if item is not None:
+                    # Already in the library (first scan with an empty index)
+                    if item.get('content_hash') != content_hash or not item.get('thumbnail'):
+                        fields = {"content_hash": content_hash}
+                        if can_derive(image_file):
+                            fields["thumbnail"] = thumbnail_url({"id": item['id'], "content_hash": content_hash})
+                        updates[item['id']] = fields
+                    continue
                 # Create new image item
                 item = {
-                    "id": f"img_{len(data['items']) + len(new_items) + 1}",
+                    "id": new_record_id("img"),
                     "type": "image",
                     "filename": image_file.name,
                     "title": self._filename_to_title(image_file.name),
                     "path": f"content/images/{image_file.name}",
                     "tags": self._extract_tags_from_filename(image_file.name),
+                    "content_hash": content_hash,
                     "added_at": datetime.now().isoformat(),
                     "notes": ""
                 }
-                
-                # Add style vector analysis if available
-                if STYLE_VECTOR_AVAILABLE:
-                    try:
-                        style_data = analyze_style_vector(str(image_file))
-                        if style_data:
-                            item.update(style_data)
-                            print(f"✨ Style vector analyzed for {image_file.name}")
-                    except Exception as e:
-                        print(f"⚠️ Style vector analysis failed for {image_file.name}: {e}")
-                
-                # Add semantic analysis automatically
-                if SEMANTIC_ANALYZER_AVAILABLE:
-                    try:
-                        semantic_data = analyze_semantic(str(image_file), item.get('description', ''))
-                        if semantic_data and 'error' not in semantic_data:
-                            item['semantic_analysis'] = semantic_data
-                            
-                            # Extract key colors for quick access
-                            if 'colors' in semantic_data and 'most_common' in semantic_data['colors']:
-                                colors = semantic_data['colors']['most_common']
-                                if colors:
-                                    item['primary_color_actual'] = colors[0]['hex']
-                                    if len(colors) > 1:
-                                        item['secondary_color_actual'] = colors[1]['hex']
-                            
-                            print(f"🔍 Semantic analysis completed for {image_file.name}")
-                    except Exception as e:
-                        print(f"⚠️ Semantic analysis failed for {image_file.name}: {e}")
-                
+                if can_derive(image_file):
+                    item["thumbnail"] = thumbnail_url(item)
                 new_items.append(item)
-        
+                new_files.append(image_file)
+            
+            # Replaced files: same name, new contents
+            reanalyze = []
+            for image_file in delta.changed:
+                item = self.store.item_by_filename(image_file.name)
+                if item is None:
+                    continue
+                updates[item['id']] = {
+                    "content_hash": delta.hashes[image_file.name],
+                    "last_modified": datetime.now().isoformat()
+                }
+                if can_derive(image_file):
+                    updates[item['id']]["thumbnail"] = thumbnail_url(
+                        {"id": item['id'], "content_hash": delta.hashes[image_file.name]})
+                reanalyze.append((image_file, item['id']))
+            
+            self.store.update_records('items', updates)
+            self.store.add_records('items', new_items)
+            self.scan_index.save()
+        
+        to_analyze = [(f, item['id']) for f, item in zip(new_files, new_items)] + reanalyze
+        if job:
+            job.items_queued(item_id for _, item_id in to_analyze)
+        
+        # Images in parallel, in the analysis pool
+        analysis = {item_id: {} for _, item_id in to_analyze}
+        errors = await asyncio.gather(*(
+            self._analyze_image(image_file, analysis[item_id], item_id, delta.hashes[image_file.name], job)
+            for image_file, item_id in to_analyze
+        ))
+        self.update_items({item_id: fields for item_id, fields in analysis.items() if fields})
+        if job:
+            for (image_file, item_id), error in zip(to_analyze, errors):
+                job.item_done(item_id, result=image_file.name, error=error)
         if new_items:
-            data['items'].extend(new_items)
-            # Update tags
-            all_tags = set(data.get('tags', []))
-            for item in new_items:
-                all_tags.update(item.get('tags', []))
-            data['tags'] = sorted(list(all_tags))
-            
-            self._save_data(data)
             print(f"Added {len(new_items)} new images")
+        if reanalyze:
+            print(f"Re-analyzed {len(reanalyze)} replaced images")
         
         return len(new_items)
     
+    async def add_uploads(self, uploads):
+        """
+        Move streamed uploads (temp path, sha256, original filename) into
+        content/images under content-addressed names and create their items.
+        Returns (item, is_new) per upload; a duplicate of an image already in
+        the library returns that image's item.
+        """
+        results = []
+        new_items = []
+        # Under the scan lock, so a concurrent scan doesn't pick the files up as new
+        async with self._scan_lock:
+            self.scan_index.refresh()
+            for tmp_path, content_hash, original_filename in uploads:
+                existing = (self.store.item_by_hash(content_hash) or
+                            next((i for i in new_items if i['content_hash'] == content_hash), None))
+                if existing is not None:
+                    results.append((existing, False))
+                    continue
+                filename = f"{content_hash[:UPLOAD_NAME_LENGTH]}{Path(original_filename).suffix.lower()}"
+                file_path = self.images_dir / filename
+                os.replace(tmp_path, file_path)
+                self.scan_index.record(file_path, content_hash)
+                item = {
+                    "id": new_record_id("img"),
+                    "type": "image",
+                    "filename": filename,
+                    "original_filename": original_filename,
+                    "title": self._filename_to_title(original_filename),
+                    "path": f"content/images/{filename}",
+                    "tags": self._extract_tags_from_filename(original_filename),
+                    "content_hash": content_hash,
+                    "added_at": datetime.now().isoformat(),
+                    "notes": ""
+                }
+                if can_derive(file_path):
+                    item["thumbnail"] = thumbnail_url(item)
+                new_items.append(item)
+                results.append((item, True))
+            
+            self.store.add_records('items', new_items)
+            self.scan_index.save()
+        return results
+    
+    async def analyze_items(self, job, item_ids):
+        """Job handler: analysis and thumbnails for items added without them (uploads)"""
+        items = self.store.get_records('items', item_ids)
+        job.items_queued(item['id'] for item in items)
+        updates = {item['id']: {} for item in items}
+        errors = await asyncio.gather(*(
+            self._analyze_image(Path(item['path']), updates[item['id']], item['id'], item['content_hash'], job)
+            for item in items
+        ))
+        self.update_items({item_id: fields for item_id, fields in updates.items() if fields})
+        for item, error in zip(items, errors):
+            job.item_done(item['id'], result=item['filename'], error=error)
+        return {"analyzed": len(items) - sum(1 for e in errors if e)}
+    
+    async def _analyze_image(self, image_file, fields, item_id, content_hash, job=None):
+        """
+        Style/semantic analysis and gallery thumbnails for one new or replaced
+        image. Analysis results are added to fields; returns an error message
+        if any analysis failed (the others' fields are still added).
+        """
+        if job:
+            job.item_started(item_id, filename=image_file.name)
+        error = None
+        # Style vector and semantic analysis
+        if STYLE_VECTOR_AVAILABLE or SEMANTIC_ANALYZER_AVAILABLE:
+            analysis = self.analysis.run(analyze_image_fields, str(image_file), fields.get('description', ''))
+            try:
+                result = await (job.stage(item_id, 'analysis', analysis) if job else analysis)
+                fields.update(result['fields'])
+                if result['errors']:
+                    error = '; '.join(result['errors'])
+            except Exception as e:
+                print(f"⚠️ Analysis failed for {image_file.name}: {e}")
+                error = str(e)
+        if can_derive(image_file):
+            thumbnails = asyncio.gather(*(
+                self.derivatives.ensure(image_file, content_hash, width, default_format(), self.analysis)
+                for width in INGEST_WIDTHS
+            ))
+            try:
+                await (job.stage(item_id, 'thumbnail', thumbnails) if job else thumbnails)
+            except Exception as e:
+                print(f"⚠️ Thumbnail generation failed for {image_file.name}: {e}")
+        return error
+    
     def _filename_to_title(self, filename):
         """Convert filename to readable title"""
         name = Path(filename).stem
@@ -254,15 +478,13 @@ class SimpleContentManager:
         return tags[:5]  # Limit to 5 tags
     
     def get_all_content(self):
-        """Get all content"""
-        return self._load_data()
+        """Get all content (read-only snapshot)"""
+        return self.snapshot()
     
     def add_note(self, title, content, tags=None):
         """Add a text note"""
-        data = self._load_data()
-        
         note = {
-            "id": f"note_{len(data['items']) + 1}",
+            "id": new_record_id("note"),
             "type": "note",
             "title": title,
             "content": content,
@@ -270,18 +492,21 @@ class SimpleContentManager:
             "added_at": datetime.now().isoformat()
         }
         
-        data['items'].append(note)
-        
-        # Update tags
-        all_tags = set(data.get('tags', []))
-        all_tags.update(tags or [])
-        data['tags'] = sorted(list(all_tags))
-        
-        self._save_data(data)
+        self.store.add_records('items', [note])
         return note
 
-# Global content manager
-content_manager = SimpleContentManager()
+# Global content manager, built by create_app() or init() rather than on
+# import: analysis pool workers started with spawn or forkserver (and server
+# workers) import this module again, and must not each open the store, migrate
+# it and start their own job queue and analysis pool
+content_manager = None
+
+def get_content_manager():
+    """The process's content manager, created on first use"""
+    global content_manager
+    if content_manager is None:
+        content_manager = SimpleContentManager()
+    return content_manager
 
 
 async def working_dashboard(request):
@@ -1149,52 +1374,75 @@ async def working_dashboard(request):
                 return;
             }
             
-            // Build HTML for each item
-            let html = '';
-            items.forEach(item => {
-                // Safely get values with defaults
-                const title = item.title || 'Untitled';
-                const description = item.description || '';
-                const path = item.path || '';
-                const tags = item.tags || [];
-                const aiTags = item.ai_tags || [];
-                const notes = item.notes || '';
-                
-                if (item.type === 'image') {
-                    html += `
-                        <div class="content-item" onclick="showItemModal(${items.indexOf(item)})">
-                            <button class="edit-btn" onclick="event.stopPropagation(); editItem('${item.id}')" title="Edit this item">✏️ Edit</button>
-                            ${path ? `<img src="/${path}" alt="${title}" class="image-preview" onerror="this.style.display='none'">` : ''}
-                            <div class="item-content">
-                                <div class="item-title">${escapeHtml(title)}</div>
-                                ${description ? `<p class="item-description">${escapeHtml(description.substring(0, 150))}${description.length > 150 ? '... <em style="color: #667eea;">Click to read more</em>' : ''}</p>` : '<p class="item-description" style="color: #999; font-style: italic;">No description yet - click edit to add one</p>'}
-                                ${notes ? `<p style="color: #764ba2; font-style: italic;">📝 ${escapeHtml(notes)}</p>` : ''}
-                                <div class="item-tags">
-                                    ${aiTags.map(tag => `<span class="tag ai-tag">🤖 ${escapeHtml(tag)}</span>`).join('')}
-                                    ${tags.filter(t => !aiTags.includes(t)).map(tag => `<span class="tag">${escapeHtml(tag)}</span>`).join('')}
-                                </div>
-                                ${item.style_vector ? renderStyleVectorMini(item.style_vector, item.brand_tokens) : ''}
+            const html = items.map((item, index) => renderItemCard(item, index)).join('');
+            contentDiv.innerHTML = html || '<div class="loading">No items to display</div>';
+        }
+        
+        // HTML for one content card (index into contentData.items)
+        function renderItemCard(item, index) {
+            // Safely get values with defaults
+            const title = item.title || 'Untitled';
+            const description = item.description || '';
+            const path = item.path || '';
+            const tags = item.tags || [];
+            const aiTags = item.ai_tags || [];
+            const notes = item.notes || '';
+            
+            if (item.type === 'image') {
+                return `
+                    <div class="content-item" data-item-id="${item.id}" onclick="showItemModal(${index})">
+                        <button class="edit-btn" onclick="event.stopPropagation(); editItem('${item.id}')" title="Edit this item">✏️ Edit</button>
+                        ${path ? `<img src="${item.thumbnail || imageUrl(item)}" alt="${title}" class="image-preview" loading="lazy" onerror="this.style.display='none'">` : ''}
+                        <div class="item-content">
+                            <div class="item-title">${escapeHtml(title)}</div>
+                            ${description ? `<p class="item-description">${escapeHtml(description.substring(0, 150))}${description.length > 150 ? '... <em style="color: #667eea;">Click to read more</em>' : ''}</p>` : '<p class="item-description" style="color: #999; font-style: italic;">No description yet - click edit to add one</p>'}
+                            ${notes ? `<p style="color: #764ba2; font-style: italic;">📝 ${escapeHtml(notes)}</p>` : ''}
+                            <div class="item-tags">
+                                ${aiTags.map(tag => `<span class="tag ai-tag">🤖 ${escapeHtml(tag)}</span>`).join('')}
+                                ${tags.filter(t => !aiTags.includes(t)).map(tag => `<span class="tag">${escapeHtml(tag)}</span>`).join('')}
                             </div>
+                            ${item.style_vector ? renderStyleVectorMini(item.style_vector, item.brand_tokens) : ''}
                         </div>
-                    `;
-                } else {
-                    const content = item.content || '';
-                    html += `
-                        <div class="content-item" onclick="showItemModal(${items.indexOf(item)})">
-                            <button class="edit-btn" onclick="event.stopPropagation(); editItem('${item.id}')" title="Edit this item">✏️ Edit</button>
-                            <div class="item-content">
-                                <div class="item-title">${escapeHtml(title)}</div>
-                                <p>${escapeHtml(content.substring(0, 150))}${content.length > 150 ? '... <em style="color: #667eea;">Click to read more</em>' : ''}</p>
-                                <div class="item-tags">
-                                    ${tags.map(tag => `<span class="tag">${escapeHtml(tag)}</span>`).join('')}
-                                </div>
+                    </div>
+                `;
+            } else {
+                const content = item.content || '';
+                return `
+                    <div class="content-item" data-item-id="${item.id}" onclick="showItemModal(${index})">
+                        <button class="edit-btn" onclick="event.stopPropagation(); editItem('${item.id}')" title="Edit this item">✏️ Edit</button>
+                        <div class="item-content">
+                            <div class="item-title">${escapeHtml(title)}</div>
+                            <p>${escapeHtml(content.substring(0, 150))}${content.length > 150 ? '... <em style="color: #667eea;">Click to read more</em>' : ''}</p>
+                            <div class="item-tags">
+                                ${tags.map(tag => `<span class="tag">${escapeHtml(tag)}</span>`).join('')}
                             </div>
                         </div>
-                    `;
-                }
-            });
+                    </div>
+                `;
+            }
+        }
+        
+        // Re-fetch one item and re-render (or add) its card
+        async function updateItemCard(itemId) {
+            if (!contentData || !contentData.items) return;
+            const response = await fetch(`/api/content/items/${encodeURIComponent(itemId)}`);
+            if (!response.ok) return;
+            const item = await response.json();
             
-            contentDiv.innerHTML = html || '<div class="loading">No items to display</div>';
+            let index = contentData.items.findIndex(i => i.id === itemId);
+            if (index === -1) {
+                index = contentData.items.push(item) - 1;
+            } else {
+                contentData.items[index] = item;
+            }
+            const html = renderItemCard(item, index);
+            const card = document.querySelector(`.content-item[data-item-id="${CSS.escape(itemId)}"]`);
+            if (card) {
+                card.outerHTML = html;
+            } else {
+                document.getElementById('content').insertAdjacentHTML('beforeend', html);
+            }
+            updateStats(contentData);
         }
         
         // Render mini style vector display for content cards
@@ -1368,40 +1616,112 @@ async def working_dashboard(request):
             const statusDiv = document.getElementById('status');
             statusDiv.innerHTML = '<div class="loading">🔍 Scanning for new images...</div>';
             
+            // New images appear as they are analyzed
+            const source = new EventSource('/api/events');
+            followEvents(source, statusDiv, '🔍 Analyzing new images');
             try {
+                await new Promise(resolve => {
+                    source.addEventListener('open', resolve, { once: true });
+                    setTimeout(resolve, 2000);
+                });
                 const response = await fetch('/api/scan', { method: 'POST' });
                 const result = await response.json();
+                source.close();
                 
                 if (result.scanned > 0) {
                     statusDiv.innerHTML = `<div class="success">✅ Found ${result.scanned} new images!</div>`;
-                    setTimeout(loadContent, 1000);
                 } else {
                     statusDiv.innerHTML = '<div class="success">✅ No new images found</div>';
                 }
                 setTimeout(() => { statusDiv.innerHTML = ''; }, 3000);
                 
             } catch (error) {
+                source.close();
                 console.error('Error scanning:', error);
                 statusDiv.innerHTML = '<div class="error">❌ Scan failed</div>';
             }
         }
         
+        // Show a job's per-item events as they arrive and update cards in place
+        function followEvents(source, statusDiv, label, jobId) {
+            let total = 0, done = 0, current = '';
+            const render = () => {
+                const counts = total ? ` ${done}/${total}` : '';
+                const cancel = jobId ? ` <button onclick="cancelJob('${jobId}')">Cancel</button>` : '';
+                statusDiv.innerHTML = `<div class="loading">${label}${counts}${current ? ` · ${escapeHtml(current)}` : ''}...${cancel}</div>`;
+            };
+            source.addEventListener('queued', () => { total += 1; render(); });
+            source.addEventListener('started', e => {
+                const event = JSON.parse(e.data);
+                current = event.filename || event.item;
+                render();
+            });
+            source.addEventListener('stage', e => {
+                const event = JSON.parse(e.data);
+                console.log(`${event.item}: ${event.stage} took ${event.seconds}s`);
+            });
+            source.addEventListener('finished', e => {
+                done += 1;
+                render();
+                updateItemCard(JSON.parse(e.data).item);
+            });
+            source.addEventListener('failed', e => {
+                const event = JSON.parse(e.data);
+                done += 1;
+                render();
+                console.warn(`${event.item} failed: ${event.error}`);
+            });
+            render();
+        }
+        
+        // Follow a background job's event stream until it finishes
+        function waitForJob(job, statusDiv, label) {
+            return new Promise((resolve, reject) => {
+                const source = new EventSource(`/api/jobs/${job.id}/events`);
+                followEvents(source, statusDiv, label, job.id);
+                source.addEventListener('job_finished', async () => {
+                    source.close();
+                    try {
+                        const response = await fetch(`/api/jobs/${job.id}`);
+                        if (!response.ok) throw new Error(`Job ${job.id} not found`);
+                        resolve(await response.json());
+                    } catch (error) {
+                        reject(error);
+                    }
+                });
+            });
+        }
+        
+        async function cancelJob(jobId) {
+            await fetch(`/api/jobs/${jobId}/cancel`, { method: 'POST' });
+        }
+        
+        function showJobResult(job, statusDiv, successMessage) {
+            if (job.status === 'succeeded') {
+                const failures = job.failed ? ` (${job.failed} failed)` : '';
+                statusDiv.innerHTML = `<div class="success">✅ ${successMessage(job)}${failures}</div>`;
+            } else if (job.status === 'cancelled') {
+                statusDiv.innerHTML = `<div class="error">⏹️ Cancelled after ${job.completed} images</div>`;
+            } else {
+                statusDiv.innerHTML = `<div class="error">❌ ${job.error || job.message || 'Job failed'}</div>`;
+            }
+            setTimeout(() => { statusDiv.innerHTML = ''; }, 5000);
+        }
+        
         // Run AI Analysis on images
         async function runAIAnalysis() {
             const statusDiv = document.getElementById('status');
-            statusDiv.innerHTML = '<div class="loading">🤖 Running AI analysis on images... This may take 30-60 seconds</div>';
+            statusDiv.innerHTML = '<div class="loading">🤖 Starting AI analysis...</div>';
             
             try {
                 const response = await fetch('/api/ai-scan', { method: 'POST' });
                 const result = await response.json();
-                
-                if (response.ok && result.scanned >= 0) {
-                    statusDiv.innerHTML = `<div class="success">✅ AI Analysis complete! Analyzed ${result.scanned} images</div>`;
-                    setTimeout(loadContent, 1000);
-                } else {
+                if (!response.ok) {
                     statusDiv.innerHTML = `<div class="error">❌ ${result.message || 'AI analysis failed'}</div>`;
+                    return;
                 }
-                setTimeout(() => { statusDiv.innerHTML = ''; }, 5000);
+                const job = await waitForJob(result, statusDiv, '🤖 Running AI analysis on images');
+                showJobResult(job, statusDiv, job => `AI Analysis complete! Analyzed ${job.summary.scanned} images`);
                 
             } catch (error) {
                 console.error('Error with AI analysis:', error);
@@ -1412,19 +1732,19 @@ async def working_dashboard(request):
         // Run Style Vector Analysis on images
         async function runStyleAnalysis() {
             const statusDiv = document.getElementById('status');
-            statusDiv.innerHTML = '<div class="loading">🎨 Running style vector analysis... This may take 30-60 seconds</div>';
+            statusDiv.innerHTML = '<div class="loading">🎨 Starting style vector analysis...</div>';
             
             try {
                 const response = await fetch('/api/style-analysis', { method: 'POST' });
                 const result = await response.json();
-                
-                if (response.ok && result.success) {
-                    statusDiv.innerHTML = `<div class="success">✅ Style analysis complete! Analyzed ${result.processed} images with style vectors and brand tokens</div>`;
-                    setTimeout(loadContent, 1000);
-                } else {
+                if (!response.ok) {
                     statusDiv.innerHTML = `<div class="error">❌ ${result.error || result.message || 'Style analysis failed'}</div>`;
+                    return;
                 }
-                setTimeout(() => { statusDiv.innerHTML = ''; }, 5000);
+                const job = await waitForJob(result, statusDiv, '🎨 Running style vector analysis');
+                showJobResult(job, statusDiv, job => job.total
+                    ? `Style analysis complete! Analyzed ${job.completed} images with style vectors and brand tokens`
+                    : 'All images already have style vectors');
                 
             } catch (error) {
                 console.error('Error with style analysis:', error);
@@ -1433,6 +1753,12 @@ async def working_dashboard(request):
         }
         
         // Utility function to escape HTML
+        // Image URL pinned to the file's content, so the browser can cache it for good
+        function imageUrl(item) {
+            const path = `/${item.path}`;
+            return item.content_hash ? `${path}?v=${item.content_hash.slice(0, 16)}` : path;
+        }
+        
         function escapeHtml(text) {
             if (!text) return '';
             const div = document.createElement('div');
@@ -1458,7 +1784,7 @@ async def working_dashboard(request):
             
             // Image
             if (item.type === 'image' && item.path) {
-                modalContent += `<img src="/${item.path}" alt="${item.title}" class="modal-image" onerror="this.style.display='none'">`;
+                modalContent += `<img src="${imageUrl(item)}" alt="${item.title}" class="modal-image" onerror="this.style.display='none'">`;
             }
             
             // Description
@@ -1807,7 +2133,8 @@ async def working_dashboard(request):
             const selector = document.getElementById('imageSelector');
             
             try {
-                const response = await fetch('/api/content');
+                // Only the fields the selector shows (plus style_vector to filter on)
+                const response = await fetch('/api/content?fields=type,title,filename,path,thumbnail,style_vector');
                 const data = await response.json();
                 const images = data.items.filter(item => 
                     item.type === 'image' && item.style_vector
@@ -1825,7 +2152,7 @@ async def working_dashboard(request):
                                value="${item.id}" 
                                onchange="toggleImageSelection('${item.id}')"
                                style="margin-right: 1rem;">
-                        <img src="${item.path}" 
+                        <img src="${item.thumbnail || '/' + item.path}" 
                              alt="${item.title}" 
                              style="width: 40px; height: 40px; object-fit: cover; border-radius: 4px; margin-right: 1rem;">
                         <div>
@@ -2059,7 +2386,7 @@ async def working_dashboard(request):
                                     <strong style="color: #333; font-size: 0.8rem;">Source Images:</strong>
                                     <div style="display: flex; gap: 0.25rem; margin-top: 0.25rem; overflow-x: auto;">
                                         ${brand.source_items.slice(0, 3).map(item => 
-                                            `<img src="/${item.path}" 
+                                            `<img src="/thumb/${item.id}?w=160" 
                                                   style="width: 40px; height: 40px; object-fit: cover; border-radius: 6px; box-shadow: 0 1px 3px rgba(0,0,0,0.2);" 
                                                   title="${item.title || 'Source image'}" 
                                                   onclick="event.stopPropagation(); window.open('/#item-${item.id}', '_blank');">`
@@ -2256,15 +2583,136 @@ async def working_dashboard(request):
     """
     return web.Response(text=html, content_type='text/html')
 
+# Collections served by /api/content (source_snapshots are internal to brands)
+API_COLLECTIONS = ('items', 'projects', 'campaigns', 'brands')
+CONTENT_PAGE_MAX = 500
+
+
+def _encode_cursor(record_id):
+    return base64.urlsafe_b64encode(record_id.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text="Invalid cursor")
+
+
+def _project(record, fields):
+    """Copy of a record with only the requested fields (id is always kept)"""
+    if fields is None:
+        return record
+    return {k: record[k] for k in fields if k in record}
+
+
+def _content_page(query, view):
+    """
+    One page of a collection for /api/content?collection=&limit=&cursor=&fields=
+    
+    Records keep library order. The cursor names the last record returned,
+    so pages stay stable while new records are appended. `view` is the
+    store's ContentView the response (and its ETag) is built from.
+    """
+    collection = query.get('collection', 'items')
+    if collection not in API_COLLECTIONS:
+        raise web.HTTPBadRequest(text=f"Unknown collection: {collection}")
+    
+    store = content_manager.store
+    records = view.snapshot.get(collection, [])
+    start = 0
+    if query.get('cursor'):
+        after = _decode_cursor(query['cursor'])
+        position = view.position(collection, after)
+        if position is None:
+            raise web.HTTPBadRequest(text="Cursor refers to an unknown record")
+        start = position + 1
+    
+    try:
+        limit = min(int(query['limit']), CONTENT_PAGE_MAX) if 'limit' in query else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit must be an integer")
+    if limit is not None and limit < 1:
+        raise web.HTTPBadRequest(text="limit must be positive")
+    
+    page = records[start:start + limit] if limit is not None else records[start:]
+    if collection == 'brands':
+        page = [resolve_sources(b, store) for b in page]
+    
+    fields = None
+    if query.get('fields'):
+        fields = ['id'] + [f.strip() for f in query['fields'].split(',') if f.strip() and f.strip() != 'id']
+    
+    end = start + len(page)
+    return {
+        "collection": collection,
+        "items": [_project(r, fields) for r in page],
+        "total": len(records),
+        "next_cursor": _encode_cursor(page[-1]['id']) if page and end < len(records) else None
+    }
+
+
 async def api_content(request):
-    """API endpoint for content"""
-    data = content_manager.get_all_content()
-    return web.json_response(data)
+    """
+    API endpoint for content.
+    
+    Without parameters this is the whole library (items, tags, projects,
+    campaigns, brands). With collection/limit/cursor/fields it returns one
+    page of one collection, optionally projected to a few fields, e.g.
+    /api/content?limit=60&fields=title,path,tags for the gallery.
+    Responses carry an ETag; If-None-Match gets a 304 until content changes.
+    """
+    # The ETag and the body come from the same snapshot
+    view = content_manager.store.view()
+    etag = view_etag(view, 'content', query_key(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    if any(k in request.query for k in ('collection', 'limit', 'cursor', 'fields')):
+        payload = _content_page(request.query, view)
+    else:
+        data = view.snapshot
+        brands = [resolve_sources(b, content_manager.store) for b in data.get('brands', [])]
+        payload = {k: v for k, v in data.items() if k != 'source_snapshots'}
+        payload['brands'] = brands
+    return json_response(payload, headers=cache_headers(etag))
+
+
+async def api_content_record(request):
+    """
+    A single record, or one (possibly heavy) field of it:
+    /api/content/{collection}/{record_id}[/{field}], e.g.
+    /api/content/items/img_12/semantic_analysis
+    """
+    collection = request.match_info['collection']
+    record_id = request.match_info['record_id']
+    field = request.match_info.get('field')
+    if collection not in API_COLLECTIONS:
+        return json_response({"error": f"Unknown collection: {collection}"}, status=404)
+    
+    etag = content_etag(content_manager.store, 'record', collection, record_id, field)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    record = content_manager.store.get_record(collection, record_id)
+    if collection == 'brands':
+        record = resolve_sources(record, content_manager.store)
+    if record is None:
+        return json_response({"error": "Not found"}, status=404)
+    if field is not None:
+        if field not in record:
+            return json_response({"error": f"No field {field}"}, status=404)
+        payload = {"id": record_id, field: record[field]}
+    else:
+        payload = record
+    return json_response(payload, headers=cache_headers(etag))
 
 async def api_scan(request):
-    """API endpoint to scan for new content"""
-    new_items = content_manager.scan_images()
-    return web.json_response({"scanned": new_items, "method": "basic"})
+    """API endpoint to scan for new content (as a job, so its progress is streamed)"""
+    job = await content_manager.jobs.run('scan', content_manager.scan_images)
+    if job.status != 'succeeded':
+        return json_response({"error": job.error or job.message, "job_id": job.id}, status=500)
+    return json_response({"scanned": job.summary, "method": "basic", "job_id": job.id})
 
 async def api_update_item(request):
     """API endpoint to update an item (add notes, tags, etc)"""
@@ -2273,44 +2721,20 @@ async def api_update_item(request):
         item_id = item_data.get('id')
         
         if not item_id:
-            return web.json_response({"error": "No item ID provided"}, status=400)
-        
-        # Update the item
-        data = content_manager._load_data()
-        item_found = False
-        
-        for item in data['items']:
-            if item['id'] == item_id:
-                # Update allowed fields
-                if 'notes' in item_data:
-                    item['notes'] = item_data['notes']
-                if 'tags' in item_data:
-                    item['tags'] = item_data['tags']
-                if 'title' in item_data:
-                    item['title'] = item_data['title']
-                if 'description' in item_data:
-                    item['description'] = item_data['description']
-                if 'project_id' in item_data:
-                    item['project_id'] = item_data['project_id']
-                
-                item['last_modified'] = datetime.now().isoformat()
-                item_found = True
-                break
+            return json_response({"error": "No item ID provided"}, status=400)
         
-        if not item_found:
-            return web.json_response({"error": "Item not found"}, status=404)
+        # Update allowed fields (the store keeps the global tag list in sync)
+        updatable_fields = ['notes', 'tags', 'title', 'description', 'project_id']
+        fields = {field: item_data[field] for field in updatable_fields if field in item_data}
+        fields['last_modified'] = datetime.now().isoformat()
         
-        # Update global tags
-        all_tags = set()
-        for item in data['items']:
-            all_tags.update(item.get('tags', []))
-        data['tags'] = sorted(list(all_tags))
+        if not content_manager.update_item(item_id, fields):
+            return json_response({"error": "Item not found"}, status=404)
         
-        content_manager._save_data(data)
-        return web.json_response({"success": True, "message": "Item updated"})
+        return json_response({"success": True, "message": "Item updated"})
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def api_create_project(request):
     """API endpoint to create a new project/collection"""
@@ -2320,17 +2744,11 @@ async def api_create_project(request):
         description = project_data.get('description', '').strip()
         
         if not name:
-            return web.json_response({"error": "Project name is required"}, status=400)
-        
-        data = content_manager._load_data()
-        
-        # Initialize projects if not exists
-        if 'projects' not in data:
-            data['projects'] = []
+            return json_response({"error": "Project name is required"}, status=400)
         
         # Create new project
         project = {
-            "id": f"project_{len(data['projects']) + 1}",
+            "id": new_record_id("project"),
             "name": name,
             "description": description,
             "created_at": datetime.now().isoformat(),
@@ -2338,13 +2756,12 @@ async def api_create_project(request):
             "thumbnail": None
         }
         
-        data['projects'].append(project)
-        content_manager._save_data(data)
+        content_manager.store.add_records('projects', [project])
         
-        return web.json_response({"success": True, "project": project})
+        return json_response({"success": True, "project": project})
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def api_create_campaign(request):
     """API endpoint to create a new campaign concept"""
@@ -2355,17 +2772,11 @@ async def api_create_campaign(request):
         required = ['name', 'client', 'objective']
         for field in required:
             if not campaign_data.get(field, '').strip():
-                return web.json_response({"error": f"{field} is required"}, status=400)
-        
-        data = content_manager._load_data()
-        
-        # Initialize campaigns if not exists
-        if 'campaigns' not in data:
-            data['campaigns'] = []
+                return json_response({"error": f"{field} is required"}, status=400)
         
         # Create new campaign
         campaign = {
-            "id": f"campaign_{len(data['campaigns']) + 1}",
+            "id": new_record_id("campaign"),
             "name": campaign_data['name'].strip(),
             "client": campaign_data['client'].strip(),
             "objective": campaign_data['objective'].strip(),
@@ -2382,13 +2793,12 @@ async def api_create_campaign(request):
             "updated_at": datetime.now().isoformat()
         }
         
-        data['campaigns'].append(campaign)
-        content_manager._save_data(data)
+        content_manager.store.add_records('campaigns', [campaign])
         
-        return web.json_response({"success": True, "campaign": campaign})
+        return json_response({"success": True, "campaign": campaign})
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def api_update_campaign(request):
     """API endpoint to update a campaign concept"""
@@ -2397,38 +2807,25 @@ async def api_update_campaign(request):
         campaign_id = update_data.get('id')
         
         if not campaign_id:
-            return web.json_response({"error": "Campaign ID is required"}, status=400)
-        
-        data = content_manager._load_data()
-        
-        # Find and update campaign
-        campaign_found = False
-        for campaign in data.get('campaigns', []):
-            if campaign['id'] == campaign_id:
-                # Update allowed fields
-                updatable_fields = [
-                    'name', 'client', 'objective', 'target_audience',
-                    'key_messages', 'tone_voice', 'deliverables', 
-                    'timeline', 'budget_range', 'inspiration_notes',
-                    'linked_items', 'status'
-                ]
-                
-                for field in updatable_fields:
-                    if field in update_data:
-                        campaign[field] = update_data[field]
-                
-                campaign['updated_at'] = datetime.now().isoformat()
-                campaign_found = True
-                break
+            return json_response({"error": "Campaign ID is required"}, status=400)
+        
+        # Update allowed fields
+        updatable_fields = [
+            'name', 'client', 'objective', 'target_audience',
+            'key_messages', 'tone_voice', 'deliverables', 
+            'timeline', 'budget_range', 'inspiration_notes',
+            'linked_items', 'status'
+        ]
+        fields = {field: update_data[field] for field in updatable_fields if field in update_data}
+        fields['updated_at'] = datetime.now().isoformat()
         
-        if not campaign_found:
-            return web.json_response({"error": "Campaign not found"}, status=404)
+        if not content_manager.update_campaign(campaign_id, fields):
+            return json_response({"error": "Campaign not found"}, status=404)
         
-        content_manager._save_data(data)
-        return web.json_response({"success": True, "message": "Campaign updated"})
+        return json_response({"success": True, "message": "Campaign updated"})
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def api_link_campaign_items(request):
     """API endpoint to link mood board items to a campaign"""
@@ -2439,72 +2836,46 @@ async def api_link_campaign_items(request):
         action = link_data.get('action', 'add')  # 'add' or 'remove'
         
         if not campaign_id:
-            return web.json_response({"error": "Campaign ID is required"}, status=400)
+            return json_response({"error": "Campaign ID is required"}, status=400)
         
-        data = content_manager._load_data()
+        # Add or remove items (the store avoids duplicates)
+        linked_items = content_manager.store.link_items(campaign_id, item_ids, action)
         
-        # Find campaign
-        campaign = None
-        for c in data.get('campaigns', []):
-            if c['id'] == campaign_id:
-                campaign = c
-                break
+        if linked_items is None:
+            return json_response({"error": "Campaign not found"}, status=404)
         
-        if not campaign:
-            return web.json_response({"error": "Campaign not found"}, status=404)
-        
-        # Update linked items
-        if 'linked_items' not in campaign:
-            campaign['linked_items'] = []
-        
-        if action == 'add':
-            # Add items (avoid duplicates)
-            for item_id in item_ids:
-                if item_id not in campaign['linked_items']:
-                    campaign['linked_items'].append(item_id)
-        elif action == 'remove':
-            # Remove items
-            campaign['linked_items'] = [
-                item for item in campaign['linked_items'] 
-                if item not in item_ids
-            ]
-        
-        campaign['updated_at'] = datetime.now().isoformat()
-        content_manager._save_data(data)
-        
-        return web.json_response({
+        return json_response({
             "success": True, 
-            "linked_items": campaign['linked_items'],
+            "linked_items": linked_items,
             "message": f"Campaign mood board updated"
         })
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def api_get_campaigns(request):
     """API endpoint to get all campaigns"""
     try:
-        data = content_manager._load_data()
+        data = content_manager.snapshot()
         campaigns = data.get('campaigns', [])
         
-        # Add linked item details
+        # Add linked item details (on copies - the snapshot is read-only)
+        campaigns_with_details = []
         for campaign in campaigns:
             linked_details = []
-            for item_id in campaign.get('linked_items', []):
-                item = next((i for i in data['items'] if i['id'] == item_id), None)
-                if item:
-                    linked_details.append({
-                        'id': item['id'],
-                        'title': item.get('title', 'Untitled'),
-                        'type': item.get('type'),
-                        'path': item.get('path')
-                    })
-            campaign['linked_items_details'] = linked_details
+            for item in content_manager.store.campaign_items(campaign['id']):
+                linked_details.append({
+                    'id': item['id'],
+                    'title': item.get('title', 'Untitled'),
+                    'type': item.get('type'),
+                    'path': item.get('path')
+                })
+            campaigns_with_details.append(dict(campaign, linked_items_details=linked_details))
         
-        return web.json_response(campaigns)
+        return json_response(campaigns_with_details)
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def api_generate_concepts(request):
     """API endpoint to generate AI concepts for a campaign"""
@@ -2513,35 +2884,24 @@ async def api_generate_concepts(request):
         campaign_id = request_data.get('campaign_id')
         
         if not campaign_id:
-            return web.json_response({"error": "Campaign ID required"}, status=400)
+            return json_response({"error": "Campaign ID required"}, status=400)
         
         if not content_manager.concept_generator:
-            return web.json_response({
+            return json_response({
                 "error": "Concept generation not available",
                 "message": "OpenAI API key not configured"
             }, status=400)
         
-        data = content_manager._load_data()
-        
-        # Find campaign
-        campaign = None
-        for c in data.get('campaigns', []):
-            if c['id'] == campaign_id:
-                campaign = c
-                break
+        campaign = content_manager.get_campaign(campaign_id)
         
         if not campaign:
-            return web.json_response({"error": "Campaign not found"}, status=404)
+            return json_response({"error": "Campaign not found"}, status=404)
         
         # Get mood board items with full details
-        mood_board_items = []
-        for item_id in campaign.get('linked_items', []):
-            item = next((i for i in data['items'] if i['id'] == item_id), None)
-            if item:
-                mood_board_items.append(item)
+        mood_board_items = content_manager.store.campaign_items(campaign_id)
         
         if not mood_board_items:
-            return web.json_response({
+            return json_response({
                 "error": "No mood board items",
                 "message": "Please add images to the campaign mood board first"
             }, status=400)
@@ -2552,17 +2912,16 @@ async def api_generate_concepts(request):
             campaign, mood_board_items
         )
         
-        # Store concepts in campaign data
-        if 'generated_concepts' not in campaign:
-            campaign['generated_concepts'] = []
-        
-        campaign['generated_concepts'].append(result)
-        campaign['updated_at'] = datetime.now().isoformat()
-        
-        # Save updated data
-        content_manager._save_data(data)
+        # Append to the campaign's concepts as they are now, not as they were
+        # before the OpenAI call (another request may have added some since)
+        await content_manager.commit_updates('campaigns', [campaign_id], lambda current: {
+            campaign_id: {
+                'generated_concepts': list(current[campaign_id].get('generated_concepts', [])) + [result],
+                'updated_at': datetime.now().isoformat()
+            }
+        } if campaign_id in current else {})
         
-        return web.json_response({
+        return json_response({
             "success": True,
             "concepts": result,
             "message": f"Generated {len(result.get('concepts', []))} concepts"
@@ -2571,7 +2930,7 @@ async def api_generate_concepts(request):
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return web.json_response({
+        return json_response({
             "error": "Concept generation failed",
             "message": str(e)
         }, status=500)
@@ -2585,12 +2944,16 @@ async def api_search(request):
         project_id = request.query.get('project_id', None)
         
         if not query and not tags and not project_id:
-            return web.json_response({"error": "No search criteria provided"}, status=400)
+            return json_response({"error": "No search criteria provided"}, status=400)
         
-        data = content_manager._load_data()
+        # Narrow to the project's items up front when filtering by project
+        if project_id:
+            candidates = content_manager.store.items_in_project(project_id)
+        else:
+            candidates = content_manager.snapshot()['items']
         results = []
         
-        for item in data['items']:
+        for item in candidates:
             # Filter by type
             if filter_type != 'all' and item.get('type') != filter_type:
                 continue
@@ -2619,14 +2982,14 @@ async def api_search(request):
             
             results.append(item)
         
-        return web.json_response({
+        return json_response({
             "results": results,
             "count": len(results),
             "query": query
         })
         
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def run_collaborative_analysis(item):
     """Run collaborative multi-agent analysis on an image"""
@@ -2722,118 +3085,314 @@ async def synthesize_agent_insights(item, agent_analyses):
         print(f"Synthesis error: {e}")
         return None
 
+# Items analyzed between commits in background jobs
+JOB_BATCH = 8
+AI_SCAN_BATCH = 5
+
+def job_response(job, status=202):
+    """Accepted-job response pointing at its status URL"""
+    data = job.to_dict(details=False)
+    data["status_url"] = f"/api/jobs/{job.id}"
+    return json_response(data, status=status, headers={'Location': data["status_url"]})
+
+async def ai_scan_job(job):
+    """Analyze every image without an AI analysis, a few at a time"""
+    ai_manager = content_manager.ai_manager
+    await content_manager._scan_images_basic()
+    # Items whose analysis raised stay unanalyzed: don't pick them again
+    failed = set()
+    
+    def pending():
+        """(item id, image file) of the images still to analyze"""
+        for image_file in ai_manager.images_needing_analysis():
+            item = content_manager.store.item_by_filename(image_file.name)
+            if item and item['id'] not in failed:
+                yield item['id'], image_file
+    
+    def item_done(item_id, result=None, error=None):
+        if error is not None:
+            failed.add(item_id)
+        job.item_done(item_id, result=result, error=error)
+    
+    job.items_queued(item_id for item_id, _ in pending())
+    job.message = f"Analyzing {job.total} images with AI"
+    analyzed = 0
+    while True:
+        processed = job.completed + job.failed
+        batch = list(itertools.islice(pending(), AI_SCAN_BATCH))
+        if not batch:
+            break
+        for item_id, _ in batch:
+            job.item_started(item_id)
+        started = time.perf_counter()
+        analyzed += await ai_manager.analyze_and_update_images(
+            max_images=AI_SCAN_BATCH, progress=item_done, images=[image_file for _, image_file in batch])
+        for item_id, _ in batch:
+            job.emit('stage', item_id, stage='ai_analysis', seconds=round(time.perf_counter() - started, 3))
+        if job.completed + job.failed == processed:
+            break
+    job.message = f"Analyzed {analyzed} images with AI"
+    return {"scanned": analyzed, "method": "ai_analysis"}
+
 async def api_ai_scan(request):
-    """API endpoint to scan with AI analysis"""
+    """API endpoint to scan with AI analysis (runs as a background job)"""
+    if not content_manager.ai_manager:
+        return json_response({
+            "error": "AI analysis not available",
+            "message": "No OpenAI API key configured"
+        }, status=400)
+    return job_response(content_manager.jobs.submit('ai-scan', ai_scan_job))
+
+async def upload_analysis_job(job):
+    """Analysis and thumbnails for uploaded items (job.params["item_ids"])"""
+    return await content_manager.analyze_items(job, job.params["item_ids"])
+
+async def api_jobs(request):
+    """Recent and running jobs, newest first"""
+    return json_response({"jobs": [job.to_dict(details=False) for job in content_manager.jobs.list()]})
+
+async def api_job(request):
+    """Status, progress, per-item results and errors of one job"""
+    job = content_manager.jobs.get(request.match_info['job_id'])
+    if job is None:
+        return json_response({"error": "Job not found"}, status=404)
+    return json_response(job.to_dict())
+
+# Comment line sent on idle event streams, so proxies don't time them out
+SSE_KEEPALIVE_SECONDS = 15
+
+async def stream_events(request, job_id=None):
+    """
+    Server-Sent Events stream of job events, resuming after Last-Event-ID.
+    A job's own stream starts with its buffered events and ends with its
+    job_finished event.
+    """
     try:
-        if not content_manager.ai_manager:
-            return web.json_response({
-                "error": "AI analysis not available",
-                "message": "No OpenAI API key configured"
-            }, status=400)
-        
-        # Run AI scan with timeout protection
-        try:
-            new_count = await asyncio.wait_for(
-                content_manager.scan_images_with_ai(),
-                timeout=120  # 2 minute timeout
-            )
-            return web.json_response({
-                "scanned": new_count, 
-                "method": "ai_analysis",
-                "message": f"Analyzed {new_count} images with AI"
-            })
-        except asyncio.TimeoutError:
-            return web.json_response({
-                "error": "AI analysis timeout",
-                "message": "Analysis took too long. Try analyzing fewer images."
-            }, status=504)
-    except Exception as e:
-        return web.json_response({
-            "error": "AI analysis failed",
-            "message": str(e)
-        }, status=500)
+        after = int(request.headers.get('Last-Event-ID') or request.query.get('after') or 0)
+    except ValueError:
+        after = 0
+    queue = content_manager.jobs.subscribe(job_id, after=after)
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    try:
+        await response.prepare(request)
+        await response.write(b'retry: 2000\n\n')
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                await response.write(b': keepalive\n\n')
+                continue
+            if event is None:
+                break   # fell behind; the client reconnects and resumes
+            await response.write(
+                f"id: {event['seq']}\nevent: {event['type']}\ndata: {dumps(event)}\n\n".encode('utf-8'))
+            if job_id and event['type'] == 'job_finished':
+                break
+    except ConnectionResetError:
+        pass
+    finally:
+        content_manager.jobs.unsubscribe(queue)
+    return response
+
+async def api_events(request):
+    """Live events of all jobs (scans, analysis batches) as Server-Sent Events"""
+    return await stream_events(request)
+
+async def api_job_events(request):
+    """Events of one job as Server-Sent Events, ending when the job finishes"""
+    job_id = request.match_info['job_id']
+    if content_manager.jobs.get(job_id) is None:
+        return json_response({"error": "Job not found"}, status=404)
+    return await stream_events(request, job_id)
+
+async def api_cancel_job(request):
+    """Cancel a queued or running job (work it already committed is kept)"""
+    job = content_manager.jobs.cancel(request.match_info['job_id'])
+    if job is None:
+        return json_response({"error": "Job not found"}, status=404)
+    return json_response(job.to_dict(details=False))
+
+# Long-lived caching for URLs that name their content (?v=<content hash>)
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+CONTENT_HASH_PREFIX = 16
+
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/svg+xml', '.svg')
+
+
+def file_response(path, cache_control='no-cache'):
+    """FileResponse typed by the mimetypes table above (aiohttp keeps its own)"""
+    headers = {'Cache-Control': cache_control}
+    content_type = mimetypes.guess_type(str(path))[0]
+    if content_type:
+        headers['Content-Type'] = content_type
+    return web.FileResponse(path, headers=headers)
+
 
 async def serve_file(request):
-    """Serve static files"""
+    """
+    Serve static files.
+    
+    FileResponse streams the file with sendfile (no read into memory) and
+    handles Range requests, ETag/Last-Modified and If-None-Match/
+    If-Modified-Since. Images requested with ?v= matching their content hash
+    may be cached forever; everything else is revalidated.
+    """
     file_path = request.match_info['path']
     full_path = Path(file_path)
     
-    if not full_path.exists():
-        return web.Response(status=404, text="File not found")
-    
     # Security check - ensure file is within allowed directories
     try:
         full_path.resolve().relative_to(Path.cwd().resolve())
     except ValueError:
         return web.Response(status=403, text="Access denied")
+    # ...and never serve dotfiles such as .env
+    if any(part.startswith('.') for part in full_path.parts):
+        return web.Response(status=403, text="Access denied")
     
-    async with aiofiles.open(full_path, mode='rb') as f:
-        content = await f.read()
-    
-    # Determine content type
-    suffix = full_path.suffix.lower()
-    content_types = {
-        '.png': 'image/png',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.gif': 'image/gif',
-        '.webp': 'image/webp',
-        '.svg': 'image/svg+xml'
-    }
-    content_type = content_types.get(suffix, 'application/octet-stream')
+    if not full_path.is_file():
+        return web.Response(status=404, text="File not found")
     
-    return web.Response(body=content, content_type=content_type)
+    cache_control = 'no-cache'
+    version = request.query.get('v')
+    if version and full_path.parent.resolve() == content_manager.images_dir.resolve():
+        content_hash = content_manager.scan_index.sha256(full_path.name)
+        if content_hash and content_hash[:CONTENT_HASH_PREFIX] == version:
+            cache_control = IMMUTABLE_CACHE
+    
+    return file_response(full_path, cache_control)
+
+async def serve_thumbnail(request):
+    """
+    Downscaled derivative of an image item: /thumb/{item_id}?w=320[&format=jpeg]
+    
+    Widths round up to the next size bucket. Derivatives are generated on
+    first request (or at ingest) and cached on disk by content hash; with
+    &v= matching the item's content hash the response is cacheable forever.
+    """
+    item = content_manager.get_item(request.match_info['item_id'])
+    if not item or item.get('type') != 'image' or not item.get('path'):
+        return web.Response(status=404, text="Image not found")
+    source = Path(item['path'])
+    # Only ever serve the library's images, whatever path the record holds
+    try:
+        source.resolve().relative_to(content_manager.images_dir.resolve())
+    except ValueError:
+        return web.Response(status=403, text="Access denied")
+    if not source.is_file():
+        return web.Response(status=404, text="Image file not found")
+    if not can_derive(source):
+        # SVGs and other formats PIL can't decode are already small or scalable
+        return file_response(source)
+    
+    try:
+        width = bucket_for(int(request.query.get('w', 0)))
+    except ValueError:
+        return web.Response(status=400, text="w must be an integer")
+    fmt = request.query.get('format', default_format())
+    if fmt not in ('webp', 'jpeg'):
+        return web.Response(status=400, text="format must be webp or jpeg")
+    
+    content_hash = (content_manager.scan_index.sha256(source.name) or item.get('content_hash') or
+                    await asyncio.to_thread(file_sha256, source))
+    try:
+        derivative = await content_manager.derivatives.ensure(
+            source, content_hash, width, fmt, content_manager.analysis)
+    except Exception as e:
+        print(f"⚠️ Thumbnail failed for {item['id']}: {e}")
+        return file_response(source)
+    
+    cache_control = 'no-cache'
+    if request.query.get('v') == content_hash[:CONTENT_HASH_PREFIX]:
+        cache_control = IMMUTABLE_CACHE
+    return file_response(derivative, cache_control)
+
+# Uploads are stored as content/images/<first N hex digits of their sha256><ext>
+UPLOAD_NAME_LENGTH = 16
+UPLOAD_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+async def stream_upload(part, directory):
+    """Write a multipart file part to a temporary file, hashing as it streams"""
+    digest = hashlib.sha256()
+    tmp_path = Path(directory) / f".{new_record_id('upload')}.tmp"
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            while True:
+                chunk = await part.read_chunk()
+                if not chunk:
+                    break
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path, digest.hexdigest()
 
 async def api_upload(request):
-    """API endpoint to handle file uploads"""
+    """
+    API endpoint to handle file uploads.
+    
+    Files are streamed to disk and hashed on the way, deduplicated against the
+    library, and stored under content-addressed names. The response lists the
+    item of each file straight away; analysis runs as a background job.
+    """
+    uploads = []
     try:
         reader = await request.multipart()
-        uploaded_files = []
         
         async for part in reader:
             if part.name == 'file':
-                filename = part.filename
+                # Security: sanitize filename
+                filename = Path(part.filename or '').name
                 if not filename:
                     continue
-                    
-                # Security: sanitize filename
-                filename = Path(filename).name
                 
-                # Determine file type and directory
                 file_ext = Path(filename).suffix.lower()
-                if file_ext in {'.jpg', '.jpeg', '.png', '.gif', '.webp'}:
-                    file_path = content_manager.images_dir / filename
-                else:
-                    return web.json_response({
+                if file_ext not in UPLOAD_EXTENSIONS:
+                    return json_response({
                         "error": f"Unsupported file type: {file_ext}"
                     }, status=400)
                 
-                # Save file
-                async with aiofiles.open(file_path, 'wb') as f:
-                    while True:
-                        chunk = await part.read_chunk()
-                        if not chunk:
-                            break
-                        await f.write(chunk)
-                
-                uploaded_files.append(filename)
+                tmp_path, content_hash = await stream_upload(part, content_manager.images_dir)
+                uploads.append((tmp_path, content_hash, filename))
         
-        if uploaded_files:
-            # Scan for new content
-            new_items = content_manager.scan_images()
-            
-            return web.json_response({
-                "success": True,
-                "uploaded": uploaded_files,
-                "scanned": new_items
-            })
-        else:
-            return web.json_response({
+        if not uploads:
+            return json_response({
                 "error": "No files uploaded"
             }, status=400)
+        
+        results = await content_manager.add_uploads(uploads)
+        new_ids = [item['id'] for item, is_new in results if is_new]
+        response = {
+            "success": True,
+            "uploaded": [filename for _, _, filename in uploads],
+            "items": [
+                {"filename": filename, "item_id": item['id'], "duplicate": not is_new}
+                for (_, _, filename), (item, is_new) in zip(uploads, results)
+            ],
+            "item_ids": [item['id'] for item, _ in results],
+            "duplicates": sum(1 for _, is_new in results if not is_new),
+        }
+        if not new_ids:
+            return json_response(response)
+        
+        # Analyze in the background
+        job = content_manager.jobs.submit(
+            'upload-analysis', upload_analysis_job, params={"item_ids": new_ids}, unique=False)
+        response.update(job_id=job.id, status_url=f"/api/jobs/{job.id}")
+        return json_response(response, status=202)
             
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
+    finally:
+        # Duplicates and anything left by a failed request
+        for tmp_path, _, _ in uploads:
+            tmp_path.unlink(missing_ok=True)
 
 async def api_export(request):
     """API endpoint to export a collection as JSON or HTML"""
@@ -2841,12 +3400,12 @@ async def api_export(request):
         export_format = request.query.get('format', 'json')
         project_id = request.query.get('project_id', None)
         
-        data = content_manager._load_data()
+        data = content_manager.snapshot()
         
         # Filter items by project if specified
         if project_id:
-            items = [item for item in data['items'] if item.get('project_id') == project_id]
-            project = next((p for p in data.get('projects', []) if p['id'] == project_id), None)
+            items = content_manager.store.items_in_project(project_id)
+            project = content_manager.store.get_record('projects', project_id)
             export_data = {
                 "project": project,
                 "items": items,
@@ -2859,29 +3418,46 @@ async def api_export(request):
             }
         
         if export_format == 'html':
-            # Generate HTML mood board
-            html = generate_mood_board_html(export_data)
+            # Generate HTML mood board, embedding 640px JPEGs rather than originals
+            embedded = {}
+            for item in export_data['items']:
+                source = Path(item.get('path') or '')
+                if item.get('type') == 'image' and can_derive(source) and source.is_file():
+                    try:
+                        content_hash = item.get('content_hash') or await asyncio.to_thread(file_sha256, source)
+                        embedded[item['id']] = await content_manager.derivatives.ensure(
+                            source, content_hash, 640, 'jpeg', content_manager.analysis)
+                    except Exception as e:
+                        print(f"⚠️ Using original image for {item['id']}: {e}")
+            html = generate_mood_board_html(export_data, embedded)
             return web.Response(text=html, content_type='text/html', 
                               headers={'Content-Disposition': 'attachment; filename="mood-board.html"'})
         else:
             # Return JSON
-            return web.json_response(export_data, 
+            return json_response(export_data, 
                                     headers={'Content-Disposition': 'attachment; filename="export.json"'})
     
     except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
-def generate_mood_board_html(data):
-    """Generate a standalone HTML mood board"""
+def generate_mood_board_html(data, embedded_images=None):
+    """
+    Generate a standalone HTML mood board.
+    
+    embedded_images maps item IDs to smaller derivative files to embed
+    instead of the originals.
+    """
+    embedded_images = embedded_images or {}
     items_html = ""
     for item in data.get('items', []):
         if item.get('type') == 'image':
             # Embed image as base64 for portability
             try:
-                import base64
-                with open(item['path'], 'rb') as f:
+                image_path = embedded_images.get(item['id'], item['path'])
+                with open(image_path, 'rb') as f:
                     img_data = base64.b64encode(f.read()).decode()
-                img_src = f"data:image/{Path(item['path']).suffix[1:]};base64,{img_data}"
+                mime_type = mimetypes.guess_type(str(image_path))[0] or 'image/jpeg'
+                img_src = f"data:{mime_type};base64,{img_data}"
             except:
                 img_src = item['path']
             
@@ -2937,116 +3513,118 @@ async def api_multi_agent_analysis(request):
         item_id = data.get('item_id')
         
         if not item_id:
-            return web.json_response({"error": "No item ID provided"}, status=400)
+            return json_response({"error": "No item ID provided"}, status=400)
         
         # Get the item data
-        content_data = content_manager._load_data()
-        item = None
-        for i in content_data['items']:
-            if i['id'] == item_id:
-                item = i
-                break
+        item = content_manager.get_item(item_id)
         
         if not item or item.get('type') != 'image':
-            return web.json_response({"error": "Image not found"}, status=404)
+            return json_response({"error": "Image not found"}, status=404)
         
         # Run multi-agent analysis
         enhanced_analysis = await run_collaborative_analysis(item)
         
         # Update the item with enhanced analysis
         if enhanced_analysis:
-            item['enhanced_analysis'] = enhanced_analysis
-            item['analysis_type'] = 'multi_agent'
-            item['enhanced_at'] = datetime.now().isoformat()
-            content_manager._save_data(content_data)
+            await content_manager.commit_updates('items', [item_id], lambda current: {
+                record_id: {
+                    'enhanced_analysis': enhanced_analysis,
+                    'analysis_type': 'multi_agent',
+                    'enhanced_at': datetime.now().isoformat()
+                } for record_id in current
+            })
             
-            return web.json_response({
+            return json_response({
                 "success": True,
                 "message": "Enhanced multi-agent analysis completed",
                 "enhanced_analysis": enhanced_analysis
             })
         else:
-            return web.json_response({
+            return json_response({
                 "error": "Enhanced analysis failed"
             }, status=500)
             
     except Exception as e:
         print(f"Multi-agent analysis error: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
-async def api_batch_multi_agent_analysis(request):
+async def batch_multi_agent_job(job):
     """Run multi-agent analysis on all images missing descriptions"""
-    try:
-        # Get content data
-        content_data = content_manager._load_data()
-        
-        # Find images without descriptions
-        images_to_process = []
-        for item in content_data['items']:
-            if (item.get('type') == 'image' and 
-                (not item.get('description') or item.get('description') == '')):
-                images_to_process.append(item)
-        
-        if not images_to_process:
-            return web.json_response({
-                "success": True,
-                "message": "No images need processing - all have descriptions",
-                "processed": 0
-            })
-        
-        print(f"🚀 Starting batch multi-agent analysis on {len(images_to_process)} images...")
-        processed_count = 0
-        
-        # Process each image
-        for item in images_to_process:
+    # Find images without descriptions
+    images_to_process = [
+        item for item in content_manager.snapshot()['items']
+        if item.get('type') == 'image' and not item.get('description')
+    ]
+    job.total = len(images_to_process)
+    if not images_to_process:
+        job.message = "No images need processing - all have descriptions"
+        return {"processed": 0}
+    
+    print(f"🚀 Starting batch multi-agent analysis on {len(images_to_process)} images...")
+    job.message = f"Analyzing {len(images_to_process)} images"
+    job.items_queued(item['id'] for item in images_to_process)
+    
+    # Keep any description a user wrote meanwhile
+    def merge_updates(updates):
+        def compute(current):
+            merged = {}
+            for record_id, record in current.items():
+                fields = dict(updates[record_id])
+                if record.get('description'):
+                    fields.pop('description', None)
+                merged[record_id] = fields
+            return merged
+        return compute
+    
+    for start in range(0, len(images_to_process), JOB_BATCH):
+        updates = {}
+        for item in images_to_process[start:start + JOB_BATCH]:
             try:
                 print(f"Processing {item['filename']}...")
+                job.item_started(item['id'], filename=item['filename'])
+                enhanced_analysis = await job.stage(item['id'], 'multi_agent', run_collaborative_analysis(item))
+                if not enhanced_analysis:
+                    print(f"❌ Failed {item['filename']}")
+                    job.item_done(item['id'], error="Multi-agent analysis returned no result")
+                    continue
                 
-                # Run multi-agent analysis
-                enhanced_analysis = await run_collaborative_analysis(item)
+                fields = {
+                    'enhanced_analysis': enhanced_analysis,
+                    'analysis_type': 'multi_agent',
+                    'enhanced_at': datetime.now().isoformat()
+                }
+                # Also use enhanced description as the main description
+                if enhanced_analysis.get('enhanced_description'):
+                    fields['description'] = enhanced_analysis['enhanced_description']
+                updates[item['id']] = fields
+                print(f"✅ Completed {item['filename']}")
                 
-                if enhanced_analysis:
-                    # Update item with enhanced analysis
-                    item['enhanced_analysis'] = enhanced_analysis
-                    item['analysis_type'] = 'multi_agent'
-                    item['enhanced_at'] = datetime.now().isoformat()
-                    
-                    # Also use enhanced description as the main description
-                    if enhanced_analysis.get('enhanced_description'):
-                        item['description'] = enhanced_analysis['enhanced_description']
-                    
-                    processed_count += 1
-                    print(f"✅ Completed {item['filename']}")
-                else:
-                    print(f"❌ Failed {item['filename']}")
-                    
                 # Small delay to prevent overwhelming the system
                 await asyncio.sleep(0.5)
-                
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 print(f"Error processing {item['filename']}: {e}")
-                continue
-        
-        # Save all changes
-        content_manager._save_data(content_data)
-        
-        return web.json_response({
-            "success": True,
-            "message": f"Batch multi-agent analysis completed on {processed_count}/{len(images_to_process)} images",
-            "processed": processed_count,
-            "total_found": len(images_to_process)
-        })
+                job.item_done(item['id'], error=str(e))
         
-    except Exception as e:
-        print(f"Batch multi-agent analysis error: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        # Commit each batch so a cancelled job keeps its finished work
+        await content_manager.commit_updates('items', list(updates), merge_updates(updates))
+        for record_id, fields in updates.items():
+            job.item_done(record_id, result=fields.get('description', ''))
+    
+    job.message = f"Batch multi-agent analysis completed on {job.completed}/{job.total} images"
+    return {"processed": job.completed, "total_found": job.total}
+
+async def api_batch_multi_agent_analysis(request):
+    """Run multi-agent analysis on all images missing descriptions (as a background job)"""
+    return job_response(content_manager.jobs.submit('batch-multi-agent-analysis', batch_multi_agent_job))
 
 async def api_synthesize_brand(request):
     """API endpoint to synthesize a brand from selected images"""
     try:
         # Check if synthesis engine is available
         if not SYNTHESIS_ENGINE_AVAILABLE:
-            return web.json_response({
+            return json_response({
                 "error": "Brand synthesis engine not available"
             }, status=503)
         
@@ -3058,12 +3636,12 @@ async def api_synthesize_brand(request):
         generate_alternatives = req_data.get('generate_alternatives', False)
         
         if not image_ids:
-            return web.json_response({
+            return json_response({
                 "error": "No image IDs provided"
             }, status=400)
         
         # Create synthesizer
-        synthesizer = BrandSynthesizer()
+        synthesizer = BrandSynthesizer(store=content_manager.store)
         
         # Generate brand specification
         brand_spec = synthesizer.synthesize(image_ids, brief, weights)
@@ -3073,19 +3651,10 @@ async def api_synthesize_brand(request):
         if generate_alternatives:
             alternatives = synthesizer.generate_alternatives(brand_spec, count=3)
         
-        # Save to data.json
-        data = content_manager._load_data()
-        if 'brands' not in data:
-            data['brands'] = []
+        # Save main brand and alternatives (sources are stored once, by reference)
+        save_brands(content_manager.store, [brand_spec] + alternatives)
         
-        # Add main brand and alternatives
-        data['brands'].append(brand_spec)
-        for alt in alternatives:
-            data['brands'].append(alt)
-        
-        content_manager._save_data(data)
-        
-        return web.json_response({
+        return json_response({
             "success": True,
             "brand": brand_spec,
             "alternatives": alternatives,
@@ -3093,63 +3662,180 @@ async def api_synthesize_brand(request):
         })
         
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return json_response({"error": str(e)}, status=400)
     except Exception as e:
         print(f"Error in brand synthesis: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
+
+def _render_brand(kind, brand_id):
+    """Render a brand's preview HTML or Figma tokens as bytes (runs in a thread)"""
+    brand_spec = content_manager.get_brand(brand_id)
+    preview_generator = BrandPreviewGenerator()
+    if kind == 'tokens':
+        return dumps_bytes(preview_generator.generate_figma_tokens(brand_spec))
+    return preview_generator.generate_html_preview(brand_spec).encode('utf-8')
+
+async def brand_render_response(request, kind, content_type):
+    """
+    Cached, gzip-compressed render of a brand, keyed by its resolved spec.
+    Answers If-None-Match with 304.
+    """
+    brand_id = request.match_info['brand_id']
+    store = content_manager.store
+    renders = content_manager.renders
+    key = renders.key_for(kind, BrandPreviewGenerator.RENDER_VERSION, brand_id,
+                          (store.version, store.stamp()), lambda: content_manager.get_brand(brand_id))
+    if key is None:
+        return web.Response(text="Brand not found", status=404)
+    if etag_matches(request, render_etag(key)):
+        return not_modified(render_etag(key))
+    
+    rendered = await renders.get_or_render(key, lambda: _render_brand(kind, brand_id), content_type)
+    headers = cache_headers(rendered.etag, extra={'Vary': 'Accept-Encoding'})
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        body = rendered.gzipped
+    else:
+        body = rendered.body()
+    return web.Response(body=body, headers=headers, content_type=rendered.content_type, charset='utf-8')
 
 async def api_brand_preview(request):
     """API endpoint to generate brand preview HTML"""
     try:
         if not BRAND_PREVIEW_AVAILABLE:
-            return web.json_response({"error": "Brand preview generator not available"}, status=503)
-        
-        brand_id = request.match_info['brand_id']
-        
-        # Load data
-        data_file = Path('content/data.json')
-        if not data_file.exists():
-            return web.json_response({"error": "Data file not found"}, status=404)
+            return json_response({"error": "Brand preview generator not available"}, status=503)
         
-        with open(data_file) as f:
-            data = json.load(f)
+        if not content_manager.store.get_record('brands', request.match_info['brand_id']):
+            return json_response({"error": "Brand not found"}, status=404)
         
-        # Find brand by ID
-        brand_spec = None
-        for brand in data.get('brands', []):
-            if brand.get('id') == brand_id:
-                brand_spec = brand
-                break
-        
-        if not brand_spec:
-            return web.json_response({"error": "Brand not found"}, status=404)
-        
-        # Generate preview
-        preview_generator = BrandPreviewGenerator()
-        html_preview = preview_generator.generate_html_preview(brand_spec)
-        
-        return web.Response(text=html_preview, content_type='text/html')
+        return await brand_render_response(request, 'html', 'text/html')
         
     except Exception as e:
         print(f"Error generating brand preview: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
+
+# Brands per archive page (further pages load as the user scrolls)
+BRANDS_PER_PAGE = 24
+# Rendered brand cards, by brand ID: (fingerprint, html)
+BRAND_CARD_CACHE = 2048
+_brand_cards = OrderedDict()
+
+def _render_brand_card(brand):
+    """Archive card HTML for one brand"""
+    insights = brand.get('synthesized_insights', {})
+    keywords = insights.get('keywords', [])[:4]
+    visual_tone = insights.get('visual_tone', {})
+    
+    # Generate color swatches
+    color_swatches = []
+    for name, color in list(brand.get('colors', {}).items())[:5]:
+        color_swatches.append(f'<div class="color-swatch" style="background: {color};" title="{name}: {color}"></div>')
+    
+    # Generate trait tags
+    trait_tags = []
+    for trait in brand.get('personality', {}).get('traits', [])[:4]:
+        trait_tags.append(f'<span class="trait-tag">{trait}</span>')
+    
+    # DNA section
+    dna_section = ""
+    if keywords or visual_tone:
+        dna_content = []
+        if keywords:
+            dna_content.append(f'<div><strong>Themes:</strong> {", ".join(keywords)}</div>')
+        if visual_tone:
+            visual_desc = ', '.join([v for v in visual_tone.values() if v])
+            if visual_desc:
+                dna_content.append(f'<div><strong>Visual:</strong> {visual_desc}</div>')
+        
+        if dna_content:
+            dna_section = f'''
+            <div class="brand-dna">
+                <div class="dna-title">🧬 Brand DNA</div>
+                {"".join(dna_content)}
+            </div>
+            '''
+    
+    return f'''
+        <div class="brand-card">
+            <div class="brand-header">
+                <h3 class="brand-title">{brand.get('name', 'Untitled Brand')}</h3>
+                <div class="brand-date">{brand.get('created_at', '')[:10] if brand.get('created_at') else 'Unknown'}</div>
+            </div>
+            
+            <div class="brand-colors">
+                {"".join(color_swatches)}
+            </div>
+            
+            <div class="brand-traits">
+                {"".join(trait_tags)}
+            </div>
+            
+            {dna_section}
+            
+            <div class="brand-actions">
+                <a href="/brand/{brand.get('id')}" target="_blank" class="btn btn-primary">🔬 Full Analysis</a>
+                <a href="/api/brand-tokens/{brand.get('id')}" target="_blank" class="btn btn-purple">🎨 Tokens</a>
+            </div>
+        </div>
+    '''
+
+def brand_card_html(brand):
+    """Archive card for a brand, re-rendered only when the fields it shows change"""
+    insights = brand.get('synthesized_insights') or {}
+    fingerprint = hashlib.sha1(dumps_bytes([
+        brand.get('name'), brand.get('created_at'), brand.get('colors'),
+        (brand.get('personality') or {}).get('traits'),
+        insights.get('keywords'), insights.get('visual_tone'),
+    ], sort_keys=True)).hexdigest()
+    cached = _brand_cards.get(brand['id'])
+    if cached is not None and cached[0] == fingerprint:
+        _brand_cards.move_to_end(brand['id'])
+        return cached[1]
+    html = _render_brand_card(brand)
+    _brand_cards[brand['id']] = (fingerprint, html)
+    while len(_brand_cards) > BRAND_CARD_CACHE:
+        _brand_cards.popitem(last=False)
+    return html
 
 async def brands_archive(request):
-    """Serve brands archive page"""
+    """
+    Serve brands archive page, one page of brands at a time (newest first).
+    ?page=N selects a page; with &fragment=1 only its cards are returned,
+    for infinite scroll.
+    """
     try:
-        # Load brand data
-        data = content_manager._load_data()
-        brands = data.get('brands', [])
-        
-        # Sort brands by creation date (newest first)
-        brands_sorted = sorted(brands, key=lambda x: x.get('created_at', ''), reverse=True)
+        try:
+            page = max(1, int(request.query.get('page', 1)))
+        except ValueError:
+            return web.Response(text="page must be an integer", status=400)
+        fragment = request.query.get('fragment') == '1'
+        
+        etag = content_etag(content_manager.store, 'brands', page, fragment)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        counts = content_manager.store.brand_counts()
+        brands_page = content_manager.store.brands_newest_first((page - 1) * BRANDS_PER_PAGE, BRANDS_PER_PAGE)
+        cards = [brand_card_html(brand) for brand in brands_page]
+        next_page = page + 1 if page * BRANDS_PER_PAGE < counts['total'] else None
+        headers = cache_headers(etag, extra={'X-Next-Page': str(next_page)} if next_page else None)
+        if fragment:
+            return web.Response(text="".join(cards), content_type='text/html', headers=headers)
+        
+        load_more = ''
+        if next_page:
+            load_more = f'''
+                <div id="load-more" class="load-more" data-next="{next_page}">
+                    <a href="/brands?page={next_page}" class="btn btn-primary">Older brands →</a>
+                </div>
+            '''
         
         # Generate brand cards HTML
-        if not brands_sorted:
+        if not counts['total']:
             brands_html = '''
                 <div class="empty-state">
                     <h2>No brands created yet</h2>
@@ -3158,66 +3844,10 @@ async def brands_archive(request):
                 </div>
             '''
         else:
-            brands_cards = []
-            for brand in brands_sorted:
-                insights = brand.get('synthesized_insights', {})
-                keywords = insights.get('keywords', [])[:4]
-                visual_tone = insights.get('visual_tone', {})
-                
-                # Generate color swatches
-                color_swatches = []
-                for name, color in list(brand.get('colors', {}).items())[:5]:
-                    color_swatches.append(f'<div class="color-swatch" style="background: {color};" title="{name}: {color}"></div>')
-                
-                # Generate trait tags
-                trait_tags = []
-                for trait in brand.get('personality', {}).get('traits', [])[:4]:
-                    trait_tags.append(f'<span class="trait-tag">{trait}</span>')
-                
-                # DNA section
-                dna_section = ""
-                if keywords or visual_tone:
-                    dna_content = []
-                    if keywords:
-                        dna_content.append(f'<div><strong>Themes:</strong> {", ".join(keywords)}</div>')
-                    if visual_tone:
-                        visual_desc = ', '.join([v for v in visual_tone.values() if v])
-                        if visual_desc:
-                            dna_content.append(f'<div><strong>Visual:</strong> {visual_desc}</div>')
-                    
-                    if dna_content:
-                        dna_section = f'''
-                        <div class="brand-dna">
-                            <div class="dna-title">🧬 Brand DNA</div>
-                            {"".join(dna_content)}
-                        </div>
-                        '''
-                
-                brands_cards.append(f'''
-                    <div class="brand-card">
-                        <div class="brand-header">
-                            <h3 class="brand-title">{brand.get('name', 'Untitled Brand')}</h3>
-                            <div class="brand-date">{brand.get('created_at', '')[:10] if brand.get('created_at') else 'Unknown'}</div>
-                        </div>
-                        
-                        <div class="brand-colors">
-                            {"".join(color_swatches)}
-                        </div>
-                        
-                        <div class="brand-traits">
-                            {"".join(trait_tags)}
-                        </div>
-                        
-                        {dna_section}
-                        
-                        <div class="brand-actions">
-                            <a href="/brand/{brand.get('id')}" target="_blank" class="btn btn-primary">🔬 Full Analysis</a>
-                            <a href="/api/brand-tokens/{brand.get('id')}" target="_blank" class="btn btn-purple">🎨 Tokens</a>
-                        </div>
-                    </div>
-                ''')
-            
-            brands_html = f'<div class="brands-grid">{"".join(brands_cards)}</div>'
+            brands_html = f'''
+                <div class="brands-grid">{"".join(cards)}</div>
+                {load_more}
+            '''
         
         html_content = f'''<!DOCTYPE html>
 <html lang="en">
@@ -3416,6 +4046,16 @@ async def brands_archive(request):
             color: white;
         }}
         
+        .load-more {{
+            display: flex;
+            justify-content: center;
+            margin: 2rem 0;
+        }}
+        
+        .load-more .btn {{
+            flex: 0 0 auto;
+        }}
+        
         .empty-state {{
             text-align: center;
             padding: 3rem;
@@ -3447,25 +4087,53 @@ async def brands_archive(request):
     <div class="container">
         <div class="archive-stats">
             <div class="stat-item">
-                <div class="stat-number">{len(brands_sorted)}</div>
+                <div class="stat-number">{counts['total']}</div>
                 <div>Total Brands</div>
             </div>
             <div class="stat-item">
-                <div class="stat-number">{len([b for b in brands_sorted if b.get('synthesized_insights')])}</div>
+                <div class="stat-number">{counts['with_insights']}</div>
                 <div>With DNA Analysis</div>
             </div>
             <div class="stat-item">
-                <div class="stat-number">{len([b for b in brands_sorted if b.get('accessibility', {}).get('passed')])}</div>
+                <div class="stat-number">{counts['accessible']}</div>
                 <div>WCAG Compliant</div>
             </div>
         </div>
         
         {brands_html}
     </div>
+    
+    <script>
+        // Infinite scroll: append the next page of cards as the end comes into view
+        const loadMore = document.getElementById('load-more');
+        if (loadMore && 'IntersectionObserver' in window) {{
+            let loading = false;
+            const observer = new IntersectionObserver(async entries => {{
+                if (!entries[0].isIntersecting || loading) return;
+                loading = true;
+                try {{
+                    const response = await fetch(`/brands?page=${{loadMore.dataset.next}}&fragment=1`);
+                    if (!response.ok) return;
+                    document.querySelector('.brands-grid').insertAdjacentHTML('beforeend', await response.text());
+                    const next = response.headers.get('X-Next-Page');
+                    if (next) {{
+                        loadMore.dataset.next = next;
+                        loadMore.querySelector('a').href = `/brands?page=${{next}}`;
+                    }} else {{
+                        observer.disconnect();
+                        loadMore.remove();
+                    }}
+                }} finally {{
+                    loading = false;
+                }}
+            }}, {{ rootMargin: '600px' }});
+            observer.observe(loadMore);
+        }}
+    </script>
 </body>
 </html>'''
         
-        return web.Response(text=html_content, content_type='text/html')
+        return web.Response(text=html_content, content_type='text/html', headers=headers)
         
     except Exception as e:
         print(f"Error generating brands archive: {e}")
@@ -3479,26 +4147,11 @@ async def view_brand_preview(request):
         if not BRAND_PREVIEW_AVAILABLE:
             return web.Response(text="Brand preview generator not available", status=503)
         
-        brand_id = request.match_info['brand_id']
-        
-        # Find the brand
-        data = content_manager._load_data()
-        brands = data.get('brands', [])
-        
-        brand_spec = None
-        for brand in brands:
-            if brand.get('id') == brand_id:
-                brand_spec = brand
-                break
-        
-        if not brand_spec:
+        if not content_manager.store.get_record('brands', request.match_info['brand_id']):
             return web.Response(text="Brand not found", status=404)
         
-        # Generate preview using the same logic as API
-        preview_generator = BrandPreviewGenerator()
-        html_preview = preview_generator.generate_html_preview(brand_spec)
-        
-        return web.Response(text=html_preview, content_type='text/html')
+        # Same cached render as the API
+        return await brand_render_response(request, 'html', 'text/html')
         
     except Exception as e:
         print(f"Error generating brand view: {e}")
@@ -3510,119 +4163,166 @@ async def api_brand_tokens(request):
     """API endpoint to generate Figma tokens for a brand"""
     try:
         if not BRAND_PREVIEW_AVAILABLE:
-            return web.json_response({"error": "Brand preview generator not available"}, status=503)
-        
-        brand_id = request.match_info['brand_id']
-        
-        # Load data
-        data_file = Path('content/data.json')
-        if not data_file.exists():
-            return web.json_response({"error": "Data file not found"}, status=404)
-        
-        with open(data_file) as f:
-            data = json.load(f)
-        
-        # Find brand by ID
-        brand_spec = None
-        for brand in data.get('brands', []):
-            if brand.get('id') == brand_id:
-                brand_spec = brand
-                break
+            return json_response({"error": "Brand preview generator not available"}, status=503)
         
-        if not brand_spec:
-            return web.json_response({"error": "Brand not found"}, status=404)
+        if not content_manager.store.get_record('brands', request.match_info['brand_id']):
+            return json_response({"error": "Brand not found"}, status=404)
         
-        # Generate tokens
-        preview_generator = BrandPreviewGenerator()
-        tokens = preview_generator.generate_figma_tokens(brand_spec)
-        
-        return web.json_response(tokens)
+        return await brand_render_response(request, 'tokens', 'application/json')
         
     except Exception as e:
         print(f"Error generating brand tokens: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
+
+async def style_analysis_job(job):
+    """Compute style vectors for images that don't have one, a batch at a time"""
+    images_to_process = [
+        item for item in content_manager.snapshot()['items']
+        if item.get('type') == 'image' and not item.get('style_vector')
+    ]
+    job.total = len(images_to_process)
+    if not images_to_process:
+        job.message = "All images already have style vectors"
+        return {"processed": 0}
+    
+    print(f"🎨 Starting style vector analysis on {len(images_to_process)} images...")
+    job.message = f"Analyzing {len(images_to_process)} images"
+    job.items_queued(item['id'] for item in images_to_process)
+    
+    for start in range(0, len(images_to_process), JOB_BATCH):
+        # Process each batch in parallel in the analysis pool
+        existing = []
+        for item in images_to_process[start:start + JOB_BATCH]:
+            image_path = Path(item['path'])
+            if image_path.exists():
+                print(f"Analyzing style vector for {item['filename']}...")
+                job.item_started(item['id'], filename=item['filename'])
+                existing.append((item, image_path))
+            else:
+                print(f"⚠️ Image file not found: {image_path}")
+                job.item_done(item['id'], error=f"Image file not found: {image_path}")
+        
+        results = await asyncio.gather(
+            *(job.stage(item['id'], 'style_vector', content_manager.analysis.run(style_vector_fields, str(image_path)))
+              for item, image_path in existing),
+            return_exceptions=True
+        )
+        updates = {}
+        for (item, _), style_data in zip(existing, results):
+            if isinstance(style_data, Exception):
+                print(f"Error processing {item['filename']}: {style_data}")
+                job.item_done(item['id'], error=str(style_data))
+            elif style_data:
+                updates[item['id']] = style_data
+                print(f"✨ Style vector added to {item['filename']}")
+            else:
+                print(f"❌ Style analysis failed for {item['filename']}")
+                job.item_done(item['id'], error="Style analysis failed")
+        
+        # Commit each batch so a cancelled job keeps its finished work
+        content_manager.update_items(updates)
+        for record_id, style_data in updates.items():
+            job.item_done(record_id, result={"brand_tokens": style_data.get('brand_tokens')})
+    
+    job.message = f"Style vector analysis completed on {job.completed}/{job.total} images"
+    return {"processed": job.completed, "total_found": job.total}
 
 async def api_style_analysis(request):
-    """API endpoint to analyze or re-analyze style vectors for images"""
-    try:
-        # Check if style vector analysis is available
-        if not STYLE_VECTOR_AVAILABLE:
-            return web.json_response({
-                "error": "Style vector analysis not available. Install required dependencies: pip install scikit-learn pillow numpy"
-            }, status=503)
-        
-        data = content_manager._load_data()
-        
-        # Find images that need style analysis (don't have style_vector)
-        images_to_process = []
-        for item in data['items']:
-            if item.get('type') == 'image' and not item.get('style_vector'):
-                images_to_process.append(item)
-        
-        if not images_to_process:
-            return web.json_response({
-                "success": True,
-                "message": "All images already have style vectors",
-                "processed": 0
-            })
-        
-        print(f"🎨 Starting style vector analysis on {len(images_to_process)} images...")
-        processed_count = 0
-        
-        # Process each image
-        for item in images_to_process:
-            try:
-                image_path = Path(item['path'])
-                if image_path.exists():
-                    print(f"Analyzing style vector for {item['filename']}...")
-                    
-                    style_data = analyze_style_vector(str(image_path))
-                    if style_data:
-                        # Update item with style vector data
-                        item.update(style_data)
-                        processed_count += 1
-                        print(f"✨ Style vector added to {item['filename']}")
-                    else:
-                        print(f"❌ Style analysis failed for {item['filename']}")
-                else:
-                    print(f"⚠️ Image file not found: {image_path}")
-                    
-            except Exception as e:
-                print(f"Error processing {item['filename']}: {e}")
-                continue
-        
-        # Save updated data
-        content_manager._save_data(data)
-        
-        return web.json_response({
-            "success": True,
-            "message": f"Style vector analysis completed on {processed_count}/{len(images_to_process)} images",
-            "processed": processed_count,
-            "total_found": len(images_to_process)
-        })
-        
-    except Exception as e:
-        print(f"Style analysis error: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+    """API endpoint to analyze style vectors for images (as a background job)"""
+    # Check if style vector analysis is available
+    if not STYLE_VECTOR_AVAILABLE:
+        return json_response({
+            "error": "Style vector analysis not available. Install required dependencies: pip install scikit-learn pillow numpy"
+        }, status=503)
+    return job_response(content_manager.jobs.submit('style-analysis', style_analysis_job))
+
+
+def runtime_metrics():
+    """Gauges read at scrape time: cache sizes and hit counts, jobs, library size"""
+    samples = []
+    cache = analysis_cache()
+    if cache is not None:
+        stats = cache.stats()
+        samples += [
+            ('concierto_analysis_cache_entries', 'Entries in the analysis cache', {}, stats['entries']),
+            ('concierto_analysis_cache_bytes', 'Size of the analysis cache', {}, stats['bytes']),
+            ('concierto_analysis_cache_hits', 'Analysis cache hits, all processes', {}, stats['total_hits']),
+            ('concierto_analysis_cache_misses', 'Analysis cache misses, all processes', {}, stats['total_misses']),
+        ]
+    if content_manager is None:
+        return samples
+    renders = content_manager.renders.stats()
+    samples += [
+        ('concierto_render_cache_entries', 'Renders held in memory by this process', {}, renders['entries']),
+        ('concierto_render_cache_hits', 'Render cache hits in this process', {}, renders['hits']),
+        ('concierto_render_cache_misses', 'Render cache misses in this process', {}, renders['misses']),
+        ('concierto_jobs_active', 'Queued or running background jobs', {},
+         sum(1 for job in content_manager.jobs.list() if not job.finished)),
+        ('concierto_store_version', 'Content document version', {}, content_manager.store.version),
+    ]
+    for collection in ('items', 'brands'):
+        samples.append(('concierto_store_records', 'Records in the content store', {'collection': collection},
+                        content_manager.store.count(collection)))
+    return samples
 
+REGISTRY.add_collector(runtime_metrics)
 
 def create_app():
     """Create the web application"""
-    app = web.Application()
+    get_content_manager()
+    app = web.Application(middlewares=[metrics_middleware])
     
     # Configure max upload size (100MB)
     app['client_max_size'] = 100 * 1024 * 1024
     
+    # Stop background jobs and analysis worker processes with the server
+    async def shutdown_analysis(app):
+        await content_manager.jobs.stop()
+        content_manager.analysis.shutdown()
+    app.on_cleanup.append(shutdown_analysis)
+    
+    # Job kinds this process can run; with several server workers, jobs are
+    # queued on a shared board and run by whichever worker claims them
+    content_manager.jobs.register('ai-scan', ai_scan_job)
+    content_manager.jobs.register('style-analysis', style_analysis_job)
+    content_manager.jobs.register('batch-multi-agent-analysis', batch_multi_agent_job)
+    content_manager.jobs.register('upload-analysis', upload_analysis_job)
+    if content_manager.jobs.board is not None:
+        async def start_jobs(app):
+            content_manager.jobs.start()
+        app.on_startup.append(start_jobs)
+    
+    # With several server workers, publish this one's metrics for /metrics on the others
+    if metrics_dir():
+        async def flush_metrics():
+            while True:
+                REGISTRY.write_snapshot(metrics_dir())
+                await asyncio.sleep(FLUSH_SECONDS)
+        async def metrics_flusher(app):
+            task = asyncio.create_task(flush_metrics())
+            yield
+            task.cancel()
+        app.cleanup_ctx.append(metrics_flusher)
+    
     # Routes
     app.router.add_get('/', working_dashboard)
     app.router.add_get('/api/content', api_content)
+    app.router.add_get('/api/content/{collection}/{record_id}', api_content_record)
+    app.router.add_get('/api/content/{collection}/{record_id}/{field}', api_content_record)
     app.router.add_post('/api/scan', api_scan)
     app.router.add_post('/api/ai-scan', api_ai_scan)
     app.router.add_post('/api/style-analysis', api_style_analysis)
     app.router.add_post('/api/multi-agent-analysis', api_multi_agent_analysis)
     app.router.add_post('/api/batch-multi-agent-analysis', api_batch_multi_agent_analysis)
+    app.router.add_get('/metrics', metrics_handler)
+    app.router.add_get('/api/jobs', api_jobs)
+    app.router.add_get('/api/jobs/{job_id}', api_job)
+    app.router.add_get('/api/jobs/{job_id}/events', api_job_events)
+    app.router.add_get('/api/events', api_events)
+    app.router.add_post('/api/jobs/{job_id}/cancel', api_cancel_job)
+    app.router.add_delete('/api/jobs/{job_id}', api_cancel_job)
     app.router.add_post('/api/update-item', api_update_item)
     app.router.add_post('/api/create-project', api_create_project)
     app.router.add_post('/api/create-campaign', api_create_campaign)
@@ -3638,16 +4338,18 @@ def create_app():
     app.router.add_get('/api/search', api_search)
     app.router.add_get('/api/export', api_export)
     app.router.add_post('/api/upload', api_upload)
+    app.router.add_get('/thumb/{item_id}', serve_thumbnail)
     app.router.add_get('/{path:.*}', serve_file)
     
     return app
 
 async def init():
     """Initialize the application"""
+    manager = get_content_manager()
     try:
         # Scan for existing content on startup
         print("🔍 Scanning for existing content...")
-        new_items = content_manager.scan_images()
+        new_items = await manager.scan_images()
         if new_items > 0:
             print(f"📸 Found {new_items} new images")
         else:
@@ -3660,14 +4362,29 @@ async def init():
     return app
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concierto content dashboard")
+    parser.add_argument('--workers', type=int,
+                        help='Server processes sharing the port (default: $CONCIERTO_WEB_WORKERS or 1)')
+    args = parser.parse_args()
+    workers = web_worker_count(args.workers)
+    
     print("🎼 Starting Concierto - Simple Content Dashboard")
     print("📁 Make sure to put your images in: content/images/")
     print("🌐 Dashboard will be at: http://localhost:8084")
     print()
     
+    if workers > 1 and not get_content_manager().store.multiprocess_safe:
+        print("❌ Several server workers need a store that is safe to share: set CONCIERTO_STORE=sqlite")
+        sys.exit(1)
+    
     try:
         app = asyncio.run(init())
-        web.run_app(app, host='localhost', port=8084)
+        if workers > 1:
+            # The startup scan ran here; the workers start from its results
+            content_manager.analysis.shutdown()
+            serve(create_app, 'localhost', 8084, workers, content_manager.content_dir)
+        else:
+            web.run_app(app, host='localhost', port=8084)
     except KeyboardInterrupt:
         print("\n👋 Server stopped")
     except Exception as e:
@@ -10,13 +10,9 @@ import colorsys
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import json
-
-try:
-    from sklearn.cluster import KMeans
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    print("Warning: scikit-learn not available. Using fallback color extraction.")
-    SKLEARN_AVAILABLE = False
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+from palette import default_method
 
 class StyleVector:
     """
@@ -49,20 +45,14 @@ class StyleVector:
         Extract style vector from an image
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or an ImageContext
             
         Returns:
             StyleVector object
         """
         try:
-            # Open and prepare image
-            img = Image.open(image_path).convert('RGB')
-            img_array = np.array(img)
-            
-            # Resize for faster processing
-            if img.width > 800 or img.height > 800:
-                img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                img_array = np.array(img)
+            # Open and prepare image, resized for faster processing
+            img_array = ImageContext.of(image_path).downscaled(800).rgb
             
             # Extract dominant colors
             dominant_colors = cls._extract_dominant_colors(img_array)
@@ -90,28 +80,9 @@ class StyleVector:
     
     @staticmethod
     def _extract_dominant_colors(img_array, n_colors=5):
-        """Extract dominant colors using KMeans clustering or fallback method"""
-        # Reshape image to be a list of pixels
-        pixels = img_array.reshape(-1, 3)
-        
-        # Sample pixels for faster processing
-        if len(pixels) > 5000:
-            indices = np.random.choice(len(pixels), 5000, replace=False)
-            pixels = pixels[indices]
-        
-        if SKLEARN_AVAILABLE:
-            # Use KMeans clustering
-            kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-            kmeans.fit(pixels)
-            colors = kmeans.cluster_centers_.astype(int)
-        else:
-            # Fallback: simple quantization
-            # Reduce color space and find most common colors
-            quantized = (pixels // 32) * 32  # Reduce to 8 levels per channel
-            unique_colors, counts = np.unique(quantized, axis=0, return_counts=True)
-            # Get top n colors by frequency
-            top_indices = np.argsort(counts)[-n_colors:][::-1]
-            colors = unique_colors[top_indices]
+        """Extract dominant colors by palette quantization of the color histogram"""
+        # Clustered from every pixel's histogram bin, so no sampling needed
+        colors = ImageContext.of(img_array).palette(n_colors).rgb
         
         return colors
     
@@ -130,7 +101,7 @@ class StyleVector:
         avg_saturation = np.mean(saturations)
         
         # Calculate contrast using standard deviation of luminance
-        gray = np.dot(img_array[...,:3], [0.299, 0.587, 0.114])
+        gray = ImageContext.of(img_array).luminance
         contrast = np.std(gray) / 128.0  # Normalize to 0-1
         
         # Combine saturation and contrast
@@ -169,7 +140,7 @@ class StyleVector:
         More edges and detail = higher density
         """
         # Convert to grayscale
-        gray = np.dot(img_array[...,:3], [0.299, 0.587, 0.114])
+        gray = ImageContext.of(img_array).luminance
         
         # Simple edge detection using gradient
         gy, gx = np.gradient(gray)
@@ -235,7 +206,7 @@ class StyleVector:
         has_neon = any(s > 0.8 for s in saturations)
         
         # Check contrast
-        gray = np.dot(img_array[...,:3], [0.299, 0.587, 0.114])
+        gray = ImageContext.of(img_array).luminance
         contrast = np.std(gray) / 128.0
         
         # Calculate era score
@@ -440,13 +411,14 @@ class StyleVector:
                 f"era={self.era:.2f})")
 
 
+@cached_analysis('style_vector', version=2, settings={'palette_method': default_method})
 def analyze_style_vector(image_path) -> Dict:
     """
     Analyze an image and return its style vector for storage
     Integration function for content_manager.py
     
     Args:
-        image_path: Path to the image file
+        image_path: Path to the image file, or an ImageContext
         
     Returns:
         Dictionary with style vector data
@@ -10,14 +10,10 @@ from typing import Dict, List, Tuple, Optional
 import colorsys
 from pathlib import Path
 from collections import Counter
-
-# Check for optional dependencies
-try:
-    from sklearn.cluster import KMeans
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    print("Warning: scikit-learn not available. Using fallback color extraction.")
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+from palette import default_method
+import imageops
 
 class StyleVector:
     """
@@ -52,15 +48,14 @@ class StyleVector:
         Create style vector from image analysis with FIXED color extraction
         
         Args:
-            image_path: Path to image file
+            image_path: Path to image file, or an ImageContext
             
         Returns:
             StyleVector instance
         """
         try:
-            # Load and convert image
-            img = Image.open(image_path).convert('RGB')
-            img_array = np.array(img)
+            # Load and convert image (decoded once per context)
+            img_array = ImageContext.of(image_path).rgb
             
             # Extract comprehensive color palette
             color_data = cls._extract_comprehensive_colors(img_array)
@@ -99,75 +94,11 @@ class StyleVector:
         - primary_candidates: Best colors for primary brand color
         - color_weights: Percentage of image each color covers
         """
-        h, w = img_array.shape[:2]
-        pixels = img_array.reshape(-1, 3)
-        
-        if SKLEARN_AVAILABLE:
-            # Use more clusters to capture color variety
-            n_clusters = min(n_colors, len(np.unique(pixels, axis=0)))
-            
-            # Don't sample too aggressively - we want to catch accent colors
-            if len(pixels) > 50000:
-                # Stratified sampling to ensure we get colors from all regions
-                indices = []
-                
-                # Sample from different regions
-                regions = [
-                    (0, h//3, 0, w//3),      # top-left
-                    (0, h//3, w//3, 2*w//3),  # top-center  
-                    (0, h//3, 2*w//3, w),     # top-right
-                    (h//3, 2*h//3, 0, w//3),  # middle-left
-                    (h//3, 2*h//3, w//3, 2*w//3),  # center
-                    (h//3, 2*h//3, 2*w//3, w),  # middle-right
-                    (2*h//3, h, 0, w//3),      # bottom-left
-                    (2*h//3, h, w//3, 2*w//3),  # bottom-center
-                    (2*h//3, h, 2*w//3, w)      # bottom-right
-                ]
-                
-                samples_per_region = 5000 // len(regions)
-                
-                for y1, y2, x1, x2 in regions:
-                    region = img_array[y1:y2, x1:x2].reshape(-1, 3)
-                    if len(region) > 0:
-                        n_samples = min(samples_per_region, len(region))
-                        region_indices = np.random.choice(len(region), n_samples, replace=False)
-                        indices.extend([i for i in region_indices])
-                
-                # Sample the selected pixels
-                sampled_pixels = []
-                for y1, y2, x1, x2 in regions:
-                    region = img_array[y1:y2, x1:x2].reshape(-1, 3)
-                    if len(region) > 0:
-                        n_samples = min(samples_per_region, len(region))
-                        region_indices = np.random.choice(len(region), n_samples, replace=False)
-                        sampled_pixels.append(region[region_indices])
-                
-                if sampled_pixels:
-                    pixels = np.vstack(sampled_pixels)
-            
-            # Run KMeans
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            kmeans.fit(pixels)
-            
-            # Get cluster centers and their sizes
-            labels = kmeans.labels_
-            label_counts = np.bincount(labels)
-            
-            # Sort colors by cluster size (prominence)
-            sorted_indices = np.argsort(label_counts)[::-1]
-            colors = kmeans.cluster_centers_[sorted_indices].astype(int)
-            weights = label_counts[sorted_indices] / len(labels)
-            
-        else:
-            # Fallback method
-            # Quantize colors more carefully
-            quantized = (pixels // 64) * 64  # Less aggressive quantization
-            unique_colors, counts = np.unique(quantized, axis=0, return_counts=True)
-            
-            # Sort by frequency
-            sorted_indices = np.argsort(counts)[::-1][:n_colors]
-            colors = unique_colors[sorted_indices]
-            weights = counts[sorted_indices] / len(pixels)
+        # Cluster the histogram bins of every pixel, so accent colors count
+        # without sampling; colors come sorted by prominence
+        palette = ImageContext.of(img_array).palette(n_colors)
+        colors = palette.rgb
+        weights = palette.weights
         
         # Convert to hex and analyze color properties
         hex_colors = []
@@ -229,7 +160,7 @@ class StyleVector:
     def _calculate_energy(img_array, dominant_colors):
         """Calculate energy based on contrast and color vibrancy"""
         # Calculate contrast
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128.0  # Normalize to 0-1
         
         # Calculate edge density
@@ -288,20 +219,14 @@ class StyleVector:
     def _calculate_density(img_array):
         """Calculate visual density based on detail and texture"""
         # Calculate local variance as a measure of detail
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Compute local standard deviation
         kernel_size = 5
-        h, w = gray.shape
-        local_vars = []
-        
-        for i in range(0, h-kernel_size, kernel_size):
-            for j in range(0, w-kernel_size, kernel_size):
-                window = gray[i:i+kernel_size, j:j+kernel_size]
-                local_vars.append(np.var(window))
+        local_vars = imageops.block_stats(gray, kernel_size).var
         
         # Average local variance indicates density
-        if local_vars:
+        if local_vars.size:
             avg_variance = np.mean(local_vars)
             density = min(avg_variance / 1000.0, 1.0)
         else:
@@ -352,7 +277,7 @@ class StyleVector:
         era_score = 0.5
         
         # High contrast + saturated colors = more modern
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128.0
         
         # Color saturation indicates modernity
@@ -593,13 +518,14 @@ class StyleVector:
                 f"era={self.era:.2f})")
 
 
+@cached_analysis('style_vector_fixed', version=2, settings={'palette_method': default_method})
 def analyze_style_vector(image_path) -> Dict:
     """
     Analyze an image and return its style vector for storage
     Integration function for content_manager.py
     
     Args:
-        image_path: Path to the image file
+        image_path: Path to the image file, or an ImageContext
         
     Returns:
         Dictionary with style vector data including comprehensive color palette
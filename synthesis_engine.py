@@ -14,6 +14,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
+from content_store import ContentStore, JSONContentStore, shared_store
+from brand_sources import put_brand, source_snapshot
+
 try:
     from style_vector import StyleVector, analyze_style_vector
     STYLE_VECTOR_AVAILABLE = True
@@ -31,15 +34,15 @@ class BrandSynthesizer:
     spacing, and personality guidelines while ensuring accessibility compliance.
     """
     
-    def __init__(self, data_file: str = "content/data.json"):
+    def __init__(self, data_file: str = "content/data.json", store: Optional[ContentStore] = None):
         self.data_file = Path(data_file)
+        self.store = store or shared_store(JSONContentStore, self.data_file)
         self._load_data()
     
     def _load_data(self):
-        """Load content data from JSON file"""
-        if self.data_file.exists():
-            with open(self.data_file) as f:
-                self.data = json.load(f)
+        """Load a read-only snapshot of content data from the content store"""
+        if self.store.exists():
+            self.data = self.store.snapshot()
         else:
             self.data = {"items": [], "brands": []}
     
@@ -82,7 +85,9 @@ class BrandSynthesizer:
             "source_images": image_ids,
             "weights": weights,
             "style_vector": mixed_vector,
-            "source_items": source_items  # Include full source items for semantic data
+            # Only what the preview shows; stored brands reference these as
+            # shared snapshots (see brand_sources.py)
+            "source_items": [source_snapshot(item) for item in source_items]
         }
         
         # Extract and synthesize insights from source items
@@ -107,11 +112,8 @@ class BrandSynthesizer:
         return brand_spec
     
     def _get_item_by_id(self, item_id: str) -> Optional[Dict]:
-        """Find item in data by ID"""
-        for item in self.data.get('items', []):
-            if item.get('id') == item_id:
-                return item
-        return None
+        """Find item in data by ID (indexed lookup in the content store)"""
+        return self.store.get_record('items', item_id)
     
     def _mix_style_vectors(self, vectors: List[Dict], weights: List[float]) -> Dict:
         """Mix multiple style vectors using weighted averages"""
@@ -771,19 +773,10 @@ class BrandSynthesizer:
         return alternatives
     
     def save_brand(self, brand_spec: Dict) -> None:
-        """Save brand specification to data file"""
-        if "brands" not in self.data:
-            self.data["brands"] = []
-        
-        # Remove any existing brand with same ID
-        self.data["brands"] = [b for b in self.data["brands"] if b.get("id") != brand_spec["id"]]
-        
-        # Add new brand
-        self.data["brands"].append(brand_spec)
-        
-        # Save to file
-        with open(self.data_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Save brand specification to the content store"""
+        # Replaces any existing brand with the same ID
+        put_brand(self.store, brand_spec)
+        self._load_data()
     
     # Helper methods for color operations
     def _hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
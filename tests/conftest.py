@@ -0,0 +1,39 @@
+"""
+Fixtures for the server tests: a content manager over an empty library in a
+temporary directory, analyzing on a thread instead of a process pool.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import simple_server  # noqa: E402
+
+
+@pytest.fixture
+def content_manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('CONCIERTO_STORE', 'json')
+    monkeypatch.setenv('CONCIERTO_ANALYSIS_WORKERS', '0')
+    monkeypatch.setenv('CONCIERTO_ANALYSIS_CACHE', 'off')
+    monkeypatch.delenv('CONCIERTO_JOB_BOARD', raising=False)
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setattr(simple_server, 'content_manager', None)
+    manager = simple_server.get_content_manager()
+    yield manager
+    manager.analysis.shutdown()
+
+
+@pytest.fixture
+def png_bytes():
+    """A small PNG image"""
+    import io
+    import numpy as np
+    from PIL import Image
+    pixels = (np.random.default_rng(7).random((48, 64, 3)) * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
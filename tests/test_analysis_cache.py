@@ -0,0 +1,106 @@
+"""The on-disk analysis cache"""
+
+import pytest
+
+import analysis_cache
+from analysis_cache import cached_analysis
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('CONCIERTO_ANALYSIS_CACHE', str(tmp_path / 'analysis_cache.db'))
+    monkeypatch.setattr(analysis_cache, '_cache', None)
+    return analysis_cache.analysis_cache()
+
+
+@pytest.fixture
+def images(tmp_path, png_bytes):
+    """Two files with the same pixels"""
+    first, copy = tmp_path / 'first.png', tmp_path / 'copy.png'
+    first.write_bytes(png_bytes)
+    copy.write_bytes(png_bytes)
+    return first, copy
+
+
+def test_duplicate_image_gets_its_own_path_and_time(cache, images):
+    calls = []
+
+    @cached_analysis('stamped')
+    def analyze(image_path):
+        calls.append(image_path)
+        return {'analyzed_at': f'call {len(calls)}', 'file_path': str(image_path), 'score': 0.5}
+
+    first, copy = images
+    assert analyze(first) == {'analyzed_at': 'call 1', 'file_path': str(first), 'score': 0.5}
+    result = analyze(copy)
+
+    assert calls == [first]
+    assert result['file_path'] == str(copy)
+    assert result['analyzed_at'] != 'call 1'
+    assert result['score'] == 0.5
+    # Stored without them
+    stored = cache.get(cache.make_key(cache.image_hash(first), 'stamped', 1, {}))
+    assert 'file_path' not in stored and 'analyzed_at' not in stored
+
+
+def test_semantic_analysis_of_duplicate(cache, images):
+    from semantic_analyzer import analyze_semantic
+
+    first, copy = images
+    analyze_semantic(str(first))
+    result = analyze_semantic(str(copy))
+
+    assert result['file_path'] == str(copy)
+    assert cache.stats()['hits'] >= 1
+
+
+def test_hits_do_not_write(cache, images):
+    first, _ = images
+    key = cache.make_key(cache.image_hash(first), 'analyzer', 1, {})
+    cache.put(key, 'analyzer', {'score': 1})
+    cache.get(key)
+    conn = cache._connection()
+    changes = conn.total_changes
+
+    for _ in range(10):
+        assert cache.get(key) == {'score': 1}
+    assert cache.get(key + 'x') is None
+
+    assert conn.total_changes == changes
+    # Flushed when the totals are read
+    stats = cache.stats()
+    assert (stats['total_hits'], stats['total_misses']) == (11, 1)
+
+
+def test_stale_last_used_is_refreshed(cache, images):
+    first, _ = images
+    key = cache.make_key(cache.image_hash(first), 'analyzer', 1, {})
+    cache.put(key, 'analyzer', {'score': 1})
+    conn = cache._connection()
+    with conn:
+        conn.execute("UPDATE entries SET last_used = 0")
+
+    cache.get(key)
+
+    assert conn.execute("SELECT last_used FROM entries").fetchone()[0] > 0
+
+
+def test_image_hashes_are_bounded(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, 'HASH_MEMO_SIZE', 2)
+    paths = []
+    for i in range(5):
+        paths.append(tmp_path / f'{i}.png')
+        paths[-1].write_bytes(bytes([i]))
+        cache.image_hash(paths[-1])
+
+    assert len(cache._hashes) == 2
+    assert [key[0] for key in cache._hashes] == [str(paths[3]), str(paths[4])]
+
+
+def test_keys_hold_a_digest_of_the_params(cache):
+    existing = {'style_vector': [0.5] * 500, 'tags': ['poster'] * 100}
+    key = cache.make_key('0' * 64, 'brand_intelligence', 3, {'existing_analysis': existing})
+
+    assert len(key) < 200
+    assert key != cache.make_key('0' * 64, 'brand_intelligence', 3, {'existing_analysis': {**existing, 'tags': []}})
+    assert key == cache.make_key('0' * 64, 'brand_intelligence', 3, {'existing_analysis': dict(existing)})
@@ -0,0 +1,49 @@
+"""Analysis in the worker pool, and how its failures reach job events"""
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import analysis_executor
+import simple_server
+
+
+def failing_style_vector(image):
+    raise ValueError('no pixels')
+
+
+@pytest.fixture
+def failing_analyzer(monkeypatch):
+    """Style vector analysis that always raises; semantic analysis unavailable"""
+    monkeypatch.setattr(analysis_executor, '_style_vector', failing_style_vector)
+    monkeypatch.setattr(analysis_executor, '_semantic', False)
+    monkeypatch.setattr(simple_server, 'STYLE_VECTOR_AVAILABLE', True)
+
+
+def test_analyze_image_fields_reports_errors(failing_analyzer, tmp_path, png_bytes):
+    image = tmp_path / 'image.png'
+    image.write_bytes(png_bytes)
+
+    result = analysis_executor.analyze_image_fields(str(image))
+
+    assert result == {'fields': {}, 'errors': ['Style vector analysis failed: no pixels']}
+
+
+def test_failing_analyzer_emits_failed_item_event(content_manager, failing_analyzer, png_bytes):
+    async def upload_and_stream():
+        async with TestClient(TestServer(simple_server.create_app())) as client:
+            form = aiohttp.FormData()
+            form.add_field('file', png_bytes, filename='poster.png', content_type='image/png')
+            response = await client.post('/api/upload', data=form)
+            data = await response.json()
+            events = await client.get(f"/api/jobs/{data['job_id']}/events")
+            body = await asyncio.wait_for(events.text(), timeout=10)
+            return data['item_ids'][0], simple_server.content_manager.jobs.get(data['job_id']), body
+
+    item_id, job, body = asyncio.run(upload_and_stream())
+
+    assert 'event: failed' in body
+    assert job.failed == 1
+    assert 'no pixels' in job.errors[item_id]
@@ -0,0 +1,49 @@
+"""ColorHistogram ranks colours exactly like the Counter it replaced"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from color_histogram import ColorHistogram
+
+_rng = np.random.default_rng(3)
+
+
+def tied(colors, repeat):
+    """Every colour `repeat` times, shuffled, as an (n, 1, 3) image"""
+    pixels = np.repeat(np.array(colors, dtype=np.uint8), repeat, axis=0)
+    return _rng.permutation(pixels).reshape(-1, 1, 3)
+
+
+PALETTE = _rng.integers(0, 256, (12, 3))
+IMAGES = {
+    'all tied': tied(PALETTE, 4),
+    'tied groups': np.concatenate([tied(PALETTE[:4], 5), tied(PALETTE[4:], 3), tied(PALETTE[:2], 2)]),
+    'few colours': PALETTE[_rng.integers(0, 12, (20, 30))].astype(np.uint8),
+    'noise': _rng.integers(0, 256, (16, 16, 3), dtype=np.uint8),
+    'one pixel': np.array([[[10, 20, 30]]], dtype=np.uint8),
+}
+
+
+def counter_most_common(pixels, k, bits=8):
+    pixels = pixels.reshape(-1, 3).astype(int)
+    step = 1 << (8 - bits)
+    return Counter(map(tuple, (pixels // step) * step)).most_common(k)
+
+
+@pytest.mark.parametrize('image', list(IMAGES.values()), ids=list(IMAGES))
+@pytest.mark.parametrize('bits', [8, 6, 3])
+@pytest.mark.parametrize('k', [1, 3, 5, 12, 1000])
+def test_most_common_matches_counter(image, bits, k):
+    assert ColorHistogram.of(image, bits).most_common(k) == counter_most_common(image, k, bits)
+
+
+def test_weighted_ties_rank_by_first_occurrence():
+    rgb = [(1, 1, 1), (2, 2, 2), (3, 3, 3), (2, 2, 2), (1, 1, 1), (4, 4, 4)]
+    weights = [0.5, 0.25, 1.0, 0.25, 0.5, 1.0]
+    expected = Counter()
+    for color, weight in zip(rgb, weights):
+        expected[color] += weight
+
+    assert ColorHistogram.from_weights(rgb, weights).most_common(4) == expected.most_common(4)
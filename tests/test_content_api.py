@@ -0,0 +1,88 @@
+"""/api/content paging, field projection and conditional requests"""
+
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import simple_server
+
+
+def items(count, start=0):
+    return [{'id': f'item_{n:03d}', 'type': 'note', 'title': f'Note {n}', 'tags': ['note'],
+             'content': 'x' * 100} for n in range(start, start + count)]
+
+
+@pytest.fixture
+def library(content_manager):
+    content_manager.store.add_records('items', items(5))
+    return content_manager
+
+
+def with_client(test):
+    async def run():
+        async with TestClient(TestServer(simple_server.create_app())) as client:
+            return await test(client)
+    return asyncio.run(run())
+
+
+def test_cursor_is_stable_across_appends_and_updates(library):
+    async def page_through(client):
+        pages = [await (await client.get('/api/content?collection=items&limit=2')).json()]
+        library.store.update_record('items', 'item_000', {'title': 'Renamed'})
+        library.store.add_records('items', items(2, start=5))
+        while pages[-1]['next_cursor']:
+            response = await client.get(f"/api/content?collection=items&limit=2&cursor={pages[-1]['next_cursor']}")
+            pages.append(await response.json())
+        return pages
+
+    pages = with_client(page_through)
+
+    ids = [record['id'] for page in pages for record in page['items']]
+    assert ids == [f'item_{n:03d}' for n in range(7)]
+    assert [page['total'] for page in pages] == [5, 7, 7, 7]
+
+
+def test_unknown_cursor_is_rejected(library):
+    async def get(client):
+        return (await client.get('/api/content?collection=items&cursor=bm9wZQ')).status
+
+    assert with_client(get) == 400
+
+
+def test_fields_projection(library):
+    async def get(client):
+        response = await client.get('/api/content?limit=2&fields=title, tags,missing,id')
+        return response.status, await response.json()
+
+    status, body = with_client(get)
+
+    assert status == 200
+    assert body['items'] == [{'id': 'item_000', 'title': 'Note 0', 'tags': ['note']},
+                             {'id': 'item_001', 'title': 'Note 1', 'tags': ['note']}]
+
+
+def test_if_none_match_until_content_changes(library):
+    async def revalidate(client):
+        first = await client.get('/api/content?limit=2')
+        etag = first.headers['ETag']
+        cached = await client.get('/api/content?limit=2', headers={'If-None-Match': etag})
+        library.store.update_record('items', 'item_001', {'title': 'Renamed'})
+        changed = await client.get('/api/content?limit=2', headers={'If-None-Match': etag})
+        return etag, cached, changed, await changed.json()
+
+    etag, cached, changed, body = with_client(revalidate)
+
+    assert (cached.status, cached.headers['ETag']) == (304, etag)
+    assert changed.status == 200 and changed.headers['ETag'] != etag
+    assert body['items'][1]['title'] == 'Renamed'
+
+
+def test_view_is_one_snapshot(library):
+    view = library.store.view()
+    library.store.add_records('items', items(1, start=5))
+
+    # The shared index already knows the new record; the view's snapshot does not
+    assert view.position('items', 'item_004') == 4
+    assert view.position('items', 'item_005') is None
+    assert view.version == library.store.version - 1
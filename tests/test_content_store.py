@@ -0,0 +1,183 @@
+"""Content store backends: migration, journal recovery and compare-and-swap"""
+
+import asyncio
+import json
+
+import pytest
+
+from content_store import (CachedContentStore, JournaledContentStore, SQLiteContentStore,
+                           VersionConflict, empty_document, migrate_json_to_sqlite)
+
+
+@pytest.fixture
+def document():
+    return {
+        'items': [
+            {'id': 'item_1', 'type': 'image', 'filename': 'poster.png', 'title': 'Poster',
+             'tags': ['bold', 'poster'], 'project_id': 'proj_1', 'notes': None,
+             'style_vector': {'palette': [[255, 0, 0]], 'scores': {'minimal': 0.25}}},
+            {'id': 'item_2', 'type': 'note', 'title': 'Brief', 'content': 'Loud colours',
+             'tags': ['brief']},
+        ],
+        'projects': [{'id': 'proj_1', 'name': 'Launch', 'created_at': '2024-01-01T00:00:00'}],
+        'campaigns': [{'id': 'camp_1', 'name': 'Spring', 'status': 'draft',
+                       'linked_items': ['item_2', 'item_1']}],
+        'brands': [{'id': 'brand_1', 'name': 'Acme', 'source_item_ids': ['item_1'],
+                    'guidelines': {'tone': ['bold']}}],
+        'source_snapshots': [{'id': 'snap_1', 'item': {'id': 'item_1', 'title': 'Poster'}}],
+        'tags': ['bold', 'brief', 'poster'],
+        'version': 7,
+        'last_updated': '2024-01-02T00:00:00',
+    }
+
+
+def test_json_to_sqlite_migration_round_trip(tmp_path, document):
+    json_path, db_path = tmp_path / 'data.json', tmp_path / 'concierto.db'
+    json_path.write_text(json.dumps(document))
+
+    counts = migrate_json_to_sqlite(json_path, db_path)
+    store = SQLiteContentStore(db_path)
+    try:
+        migrated = store.load()
+        export_path = tmp_path / 'export.json'
+        store.export_json(export_path)
+    finally:
+        store.close()
+
+    assert counts == {'items': 2, 'projects': 1, 'campaigns': 1, 'brands': 1, 'source_snapshots': 1}
+    exported = json.loads(export_path.read_text())
+    for data in (migrated, exported):
+        for collection in ('items', 'projects', 'campaigns', 'brands', 'source_snapshots', 'tags'):
+            assert data[collection] == document[collection]
+        # Continues from the migrated version
+        assert data['version'] > document['version']
+    with pytest.raises(FileExistsError):
+        migrate_json_to_sqlite(json_path, db_path)
+
+
+def test_sqlite_keeps_fields_set_to_none(tmp_path, document):
+    store = SQLiteContentStore(tmp_path / 'concierto.db')
+    try:
+        store.save(document)
+        store.update_record('items', 'item_2', {'project_id': None})
+        store.update_record('items', 'item_1', {'notes': 'Reprint'})
+
+        assert store.get_record('items', 'item_2')['project_id'] is None
+        assert store.get_record('items', 'item_1')['notes'] == 'Reprint'
+        assert store.item_by_filename('poster.png')['id'] == 'item_1'
+    finally:
+        store.close()
+
+
+def write_journal(path, ops, tail=''):
+    path.write_text(''.join(json.dumps({**op, 'seq': seq, 'at': '2024-01-03T00:00:00'}) + '\n'
+                            for seq, op in enumerate(ops, 1)) + tail)
+
+
+def test_journal_replay_discards_truncated_tail(tmp_path):
+    data_path = tmp_path / 'data.json'
+    data_path.write_text(json.dumps(empty_document()))
+    journal_path = tmp_path / 'data.journal.jsonl'
+    write_journal(journal_path, [
+        {'op': 'add', 'collection': 'items', 'records': [{'id': 'item_1', 'tags': ['bold']}]},
+        {'op': 'set', 'collection': 'items', 'updates': {'item_1': {'title': 'Poster'}}},
+    ], tail='{"op": "set", "collection": "items", "updates": {"item_1": {"title": "Po')
+
+    store = JournaledContentStore(data_path)
+    try:
+        assert store.load()['items'] == [{'id': 'item_1', 'tags': ['bold'], 'title': 'Poster'}]
+        assert store.load()['tags'] == ['bold']
+        # The replayed operations are in the snapshot and the torn line is gone
+        assert json.loads(data_path.read_text())['journal_seq'] == 2
+        assert journal_path.read_text() == ''
+        store.update_record('items', 'item_1', {'notes': 'Reprint'})
+    finally:
+        store.close()
+
+    reopened = JournaledContentStore(data_path)
+    try:
+        assert reopened.get_record('items', 'item_1')['notes'] == 'Reprint'
+    finally:
+        reopened.close()
+
+
+def test_journal_torn_tail_is_truncated_before_appending(tmp_path):
+    data_path = tmp_path / 'data.json'
+    # Crashed after compacting but before emptying the journal, mid-write
+    data_path.write_text(json.dumps({**empty_document(), 'items': [{'id': 'item_1'}], 'journal_seq': 1}))
+    journal_path = tmp_path / 'data.journal.jsonl'
+    write_journal(journal_path, [
+        {'op': 'add', 'collection': 'items', 'records': [{'id': 'item_1'}]},
+    ], tail='{"op": "add", "coll')
+    complete = len(journal_path.read_text()) - len('{"op": "add", "coll')
+
+    store = JournaledContentStore(data_path, compact_seconds=3600)
+    try:
+        assert journal_path.stat().st_size == complete
+        store.add_records('items', [{'id': 'item_2'}])
+        lines = journal_path.read_text().splitlines()
+        assert [json.loads(line)['seq'] for line in lines] == [1, 2]
+    finally:
+        store.close()
+
+
+@pytest.fixture
+def workers(tmp_path, document):
+    """Two cached stores over one database, as in two server worker processes"""
+    db_path = tmp_path / 'concierto.db'
+    SQLiteContentStore(db_path).save(document)
+    stores = CachedContentStore(SQLiteContentStore(db_path)), CachedContentStore(SQLiteContentStore(db_path))
+    yield stores
+    for store in stores:
+        store.close()
+
+
+def test_transaction_with_stale_version_raises(workers):
+    ours, theirs = workers
+    version = ours.version
+    theirs.update_record('items', 'item_1', {'title': 'Their title'})
+
+    with pytest.raises(VersionConflict) as conflict:
+        with ours.transaction(expected_version=version):
+            ours.update_record('items', 'item_1', {'notes': 'Lost'})
+
+    assert (conflict.value.expected, conflict.value.actual) == (version, version + 1)
+    assert theirs.get_record('items', 'item_1')['title'] == 'Their title'
+    assert ours.get_record('items', 'item_1')['notes'] is None
+
+
+def test_commit_updates_retries_on_concurrent_write(content_manager, workers, monkeypatch):
+    ours, theirs = workers
+    monkeypatch.setattr(content_manager, 'store', ours)
+    seen = []
+
+    def add_tag(records):
+        seen.append(records['item_1']['tags'])
+        if len(seen) == 1:
+            # Another worker tags the item while we were computing
+            theirs.update_record('items', 'item_1', {'tags': records['item_1']['tags'] + ['theirs']})
+        return {'item_1': {'tags': records['item_1']['tags'] + ['ours']}}
+
+    updated = asyncio.run(content_manager.commit_updates('items', ['item_1'], add_tag))
+
+    assert seen == [['bold', 'poster'], ['bold', 'poster', 'theirs']]
+    assert updated['item_1']['tags'] == ['bold', 'poster', 'theirs', 'ours']
+    assert theirs.get_record('items', 'item_1')['tags'] == ['bold', 'poster', 'theirs', 'ours']
+
+
+def test_commit_updates_gives_up_after_repeated_conflicts(content_manager, workers, monkeypatch):
+    ours, theirs = workers
+    monkeypatch.setattr(content_manager, 'store', ours)
+    calls = []
+
+    def always_raced(records):
+        calls.append(records)
+        theirs.update_record('items', 'item_1', {'title': f'Their title {len(calls)}'})
+        return {'item_1': {'notes': 'Ours'}}
+
+    with pytest.raises(VersionConflict):
+        asyncio.run(content_manager.commit_updates('items', ['item_1'], always_raced, attempts=3))
+
+    assert len(calls) == 3
+    assert ours.get_record('items', 'item_1') == theirs.get_record('items', 'item_1')
+    assert theirs.get_record('items', 'item_1')['notes'] is None
@@ -0,0 +1,94 @@
+"""AI scans of uploaded images"""
+
+import asyncio
+
+import aiohttp
+from aiohttp.test_utils import TestClient, TestServer
+
+import simple_server
+
+
+async def upload(png_bytes, filename):
+    """POST one file to /api/upload; returns its item id and waits for its analysis job"""
+    async with TestClient(TestServer(simple_server.create_app())) as client:
+        form = aiohttp.FormData()
+        form.add_field('file', png_bytes, filename=filename, content_type='image/png')
+        response = await client.post('/api/upload', data=form)
+        assert response.status == 202
+        data = await response.json()
+        job = simple_server.content_manager.jobs.get(data['job_id'])
+        while not job.finished:
+            await asyncio.sleep(0.05)
+        return data['item_ids'][0]
+
+
+def scan(manager, result):
+    """AI-scan every image, the analyzer returning result for each"""
+    async def analyze_batch(paths, max_concurrent=2):
+        return {str(path): result for path in paths}
+    manager.ai_manager.analyzer.analyze_batch = analyze_batch
+    return asyncio.run(manager.ai_manager.analyze_and_update_images())
+
+
+def test_scan_titles_upload_by_original_filename(content_manager, png_bytes):
+    item_id = asyncio.run(upload(png_bytes, 'Minimal_Poster-Design.png'))
+    item = content_manager.get_item(item_id)
+    assert item['filename'] != 'Minimal_Poster-Design.png'   # stored under its content hash
+
+    analyzed = scan(content_manager, {'success': True, 'analysis': {
+        'content_description': '', 'ai_tags': ['bold'], 'creative_insights': '', 'technical_info': {}}})
+
+    assert analyzed == 1
+    item = content_manager.get_item(item_id)
+    assert item['title'] == 'Minimal Poster Design'
+    assert sorted(item['tags']) == ['bold', 'design', 'minimal', 'poster']
+    assert item['ai_analysis']['success']
+
+
+def test_failed_scan_keeps_original_filename_title(content_manager, png_bytes):
+    item_id = asyncio.run(upload(png_bytes, 'vintage-logo.png'))
+
+    scan(content_manager, {'success': False, 'error': 'API unavailable'})
+
+    item = content_manager.get_item(item_id)
+    assert item['title'] == 'Vintage Logo'
+    assert item['tags'] == ['logo', 'vintage']
+    assert item['ai_analysis']['error'] == 'API unavailable'
+
+
+def test_ai_scan_job_does_not_retry_failing_image(content_manager, png_bytes, monkeypatch):
+    for name in ('first.png', 'broken.png', 'last.png'):
+        (content_manager.images_dir / name).write_bytes(png_bytes + name.encode())
+    monkeypatch.setattr(simple_server, 'AI_SCAN_BATCH', 1)
+    ai_manager = content_manager.ai_manager
+    attempts = []
+
+    def smart_title(filename, ai_data):
+        attempts.append(filename)
+        if filename == 'broken.png':
+            raise ValueError('unreadable')
+        return filename
+    monkeypatch.setattr(ai_manager, '_generate_smart_title', smart_title)
+    result = {'success': True, 'analysis': {'content_description': '', 'ai_tags': []}}
+
+    async def analyze_batch(paths, max_concurrent=2):
+        await asyncio.sleep(0)
+        return {str(path): result for path in paths}
+    ai_manager.analyzer.analyze_batch = analyze_batch
+
+    async def run_job():
+        job = content_manager.jobs.submit('ai-scan', simple_server.ai_scan_job)
+        try:
+            for _ in range(500):
+                if job.finished:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await content_manager.jobs.stop()
+        return job
+
+    job = asyncio.run(run_job())
+
+    assert sorted(attempts) == ['broken.png', 'first.png', 'last.png']
+    assert (job.completed, job.failed) == (2, 1)
+    assert 'unreadable' in job.errors[content_manager.store.item_by_filename('broken.png')['id']]
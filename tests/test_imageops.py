@@ -0,0 +1,277 @@
+"""
+Numerical parity of the vectorized kernels (imageops) with per-pixel loops.
+
+The baseline_* functions are the analyzers' loops before they were ported,
+copied verbatim; the ported analyzer methods must return the same values.
+The reference_* functions check each kernel on its own.
+"""
+
+import numpy as np
+import pytest
+
+import imageops
+from deep_source_analyzer import DeepSourceAnalyzer
+from image_context import ImageContext
+from vibe_mapper import VibeMapper
+
+_rng = np.random.default_rng(0)
+IMAGES = {
+    'random': _rng.uniform(0, 255, (17, 23)),
+    'tall': _rng.uniform(0, 255, (40, 31)),
+    'quantized': np.round(_rng.uniform(0, 255, (24, 24)) / 64) * 64,
+    'flat': np.full((12, 9), 128.0),
+    '1x1': np.array([[200.0]]),
+    '2xN': _rng.uniform(0, 255, (2, 7)),
+    'Nx2': _rng.uniform(0, 255, (7, 2)),
+    '3x3': _rng.uniform(0, 255, (3, 3)),
+}
+
+
+@pytest.fixture(params=list(IMAGES), ids=list(IMAGES))
+def gray(request):
+    return IMAGES[request.param].copy()
+
+
+@pytest.fixture(scope='module')
+def deep_analyzer():
+    return DeepSourceAnalyzer()
+
+
+@pytest.fixture(scope='module')
+def vibe_mapper():
+    return VibeMapper()
+
+
+# Baseline loops (DeepSourceAnalyzer and VibeMapper before the port)
+
+def baseline_simple_edge_detection(gray):
+    # Sobel-like edge detection
+    kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
+    kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
+
+    # Manual convolution for edge detection
+    edges = np.zeros_like(gray)
+    h, w = gray.shape
+
+    for y in range(1, h-1):
+        for x in range(1, w-1):
+            region = gray[y-1:y+2, x-1:x+2]
+            gx = np.sum(region * kernel_x)
+            gy = np.sum(region * kernel_y)
+            edges[y, x] = np.sqrt(gx**2 + gy**2)
+
+    return edges
+
+
+def baseline_detect_motion_blur(gray):
+    # Look for directional streaking
+    h, w = gray.shape
+
+    # Check for horizontal streaking
+    h_blur = 0
+    for y in range(1, h-1):
+        row_diff = np.diff(gray[y, :])
+        if np.std(row_diff) < np.mean(np.abs(row_diff)) * 0.5:
+            h_blur += 1
+
+    # Check for vertical streaking
+    v_blur = 0
+    for x in range(1, w-1):
+        col_diff = np.diff(gray[:, x])
+        if np.std(col_diff) < np.mean(np.abs(col_diff)) * 0.5:
+            v_blur += 1
+
+    blur_score = max(h_blur / h, v_blur / w)
+    return min(1.0, blur_score)
+
+
+def baseline_calculate_dynamism(gray):
+    # Detect diagonal patterns
+    edges = baseline_simple_edge_detection(gray)
+
+    # Create diagonal kernels
+    diag1 = np.array([[1, 0, -1], [0, 0, 0], [-1, 0, 1]])  # / diagonal
+    diag2 = np.array([[-1, 0, 1], [0, 0, 0], [1, 0, -1]])  # \ diagonal
+
+    h, w = edges.shape
+    diag_strength = 0
+
+    for y in range(1, h-1):
+        for x in range(1, w-1):
+            region = edges[y-1:y+2, x-1:x+2]
+            d1 = np.sum(region * diag1)
+            d2 = np.sum(region * diag2)
+            diag_strength += max(abs(d1), abs(d2))
+
+    return min(1.0, diag_strength / (h * w * 255))
+
+
+def baseline_detect_directional_energy(edges):
+    h, w = edges.shape
+
+    # Check for diagonal patterns (high energy)
+    diag_energy = 0
+    for y in range(1, h-1):
+        for x in range(1, w-1):
+            # Sample diagonal gradients
+            diag1 = abs(edges[y-1, x-1] - edges[y+1, x+1])
+            diag2 = abs(edges[y-1, x+1] - edges[y+1, x-1])
+            diag_energy += max(diag1, diag2)
+
+    # Normalize
+    if h * w > 0:
+        return min(1.0, diag_energy / (h * w * 255))
+    return 0.0
+
+
+def baseline_text_likelihood(edges):
+    # Look for text-like patterns
+    h, w = edges.shape
+    text_likelihood = 0
+
+    # Check for horizontal line patterns (text)
+    for y in range(h):
+        row = edges[y, :]
+        if np.sum(row > np.mean(row)) > w * 0.1:  # Significant edges in row
+            text_likelihood += 1
+
+    return text_likelihood
+
+
+def test_deep_edge_detection(deep_analyzer, gray):
+    assert np.allclose(deep_analyzer._simple_edge_detection(gray), baseline_simple_edge_detection(gray))
+
+
+def test_vibe_edge_detection(vibe_mapper, gray):
+    assert np.allclose(vibe_mapper._simple_edge_detection(gray), baseline_simple_edge_detection(gray))
+
+
+def test_context_edges_match_baseline(deep_analyzer):
+    rgb = _rng.integers(0, 256, (19, 14, 3), dtype=np.uint8)
+    gray = ImageContext.of(rgb).gray
+    assert np.allclose(deep_analyzer._simple_edge_detection(gray), baseline_simple_edge_detection(gray.copy()))
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')   # the baseline's std/mean of empty rows
+def test_motion_blur(deep_analyzer, gray):
+    assert np.allclose(deep_analyzer._detect_motion_blur(gray), baseline_detect_motion_blur(gray))
+
+
+def test_dynamism(deep_analyzer, gray):
+    assert np.allclose(deep_analyzer._calculate_dynamism(gray), baseline_calculate_dynamism(gray))
+
+
+def test_directional_energy(vibe_mapper, gray):
+    edges = baseline_simple_edge_detection(gray)
+    assert np.allclose(vibe_mapper._detect_directional_energy(edges), baseline_detect_directional_energy(edges))
+
+
+def test_text_rows(vibe_mapper, gray):
+    edges = baseline_simple_edge_detection(gray)
+    assert vibe_mapper._count_text_rows(edges) == baseline_text_likelihood(edges)
+
+
+# Per-pixel references for the kernels themselves
+
+def reference_correlate(image, kernel):
+    kh, kw = kernel.shape
+    out = np.zeros(image.shape)
+    for y in range(kh // 2, image.shape[0] - (kh - 1 - kh // 2)):
+        for x in range(kw // 2, image.shape[1] - (kw - 1 - kw // 2)):
+            region = image[y - kh // 2:y - kh // 2 + kh, x - kw // 2:x - kw // 2 + kw]
+            out[y, x] = np.sum(region * kernel)
+    return out
+
+
+def reference_box_sum(image, size):
+    h, w = image.shape
+    out = np.zeros((max(0, h - size + 1), max(0, w - size + 1)))
+    for y in range(out.shape[0]):
+        for x in range(out.shape[1]):
+            out[y, x] = np.sum(image[y:y + size, x:x + size])
+    return out
+
+
+def reference_diagonal_difference(image):
+    h, w = image.shape
+    out = np.zeros((max(0, h - 2), max(0, w - 2)))
+    for y in range(1, h - 1):
+        for x in range(1, w - 1):
+            out[y - 1, x - 1] = max(abs(image[y - 1, x - 1] - image[y + 1, x + 1]),
+                                    abs(image[y - 1, x + 1] - image[y + 1, x - 1]))
+    return out
+
+
+def reference_orientation_histogram(gray, bins):
+    gx, gy = reference_correlate(gray, imageops.SOBEL_X), reference_correlate(gray, imageops.SOBEL_Y)
+    histogram = np.zeros(bins)
+    for g_x, g_y in zip(gx.ravel(), gy.ravel()):
+        angle = np.arctan2(g_y, g_x) % np.pi
+        histogram[min(int(angle / np.pi * bins), bins - 1)] += np.hypot(g_x, g_y)
+    return histogram / histogram.sum() if histogram.sum() > 0 else histogram
+
+
+def reference_block_stats(image, size, step):
+    ys, xs = range(0, image.shape[0] - size, step), range(0, image.shape[1] - size, step)
+    stats = {name: np.zeros((len(ys), len(xs))) for name in ('mean', 'var', 'min', 'max')}
+    for i, y in enumerate(ys):
+        for j, x in enumerate(xs):
+            window = image[y:y + size, x:x + size]
+            stats['mean'][i, j] = np.mean(window)
+            stats['var'][i, j] = np.var(window)
+            stats['min'][i, j] = np.min(window)
+            stats['max'][i, j] = np.max(window)
+    return stats
+
+
+def assert_matches(actual, expected):
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, rtol=1e-9, atol=1e-7)
+
+
+KERNELS = {
+    'sobel_x': imageops.SOBEL_X,
+    'sobel_y': imageops.SOBEL_Y,
+    'laplacian': imageops.LAPLACIAN,
+    'diagonal': np.array([[1, 0, -1], [0, 0, 0], [-1, 0, 1]]),
+    '5x5': _rng.normal(size=(5, 5)),
+    '2x3': _rng.normal(size=(2, 3)),
+}
+
+
+@pytest.mark.parametrize('kernel', list(KERNELS.values()), ids=list(KERNELS))
+@pytest.mark.parametrize('mode', ['same', 'valid'])
+def test_correlate(gray, kernel, mode):
+    expected = reference_correlate(gray, kernel)
+    if mode == 'valid':
+        kh, kw = kernel.shape
+        expected = expected[kh // 2:kh // 2 + max(0, gray.shape[0] - kh + 1),
+                            kw // 2:kw // 2 + max(0, gray.shape[1] - kw + 1)]
+    assert_matches(imageops.correlate(gray, kernel, mode), expected)
+
+
+def test_sobel(gray):
+    gx, gy = imageops.sobel(gray)
+    assert_matches(gx, reference_correlate(gray, imageops.SOBEL_X))
+    assert_matches(gy, reference_correlate(gray, imageops.SOBEL_Y))
+    assert_matches(imageops.laplacian(gray), reference_correlate(gray, imageops.LAPLACIAN))
+
+
+def test_orientation_histogram(gray):
+    assert_matches(imageops.gradient_orientation_histogram(gray, 8), reference_orientation_histogram(gray, 8))
+
+
+@pytest.mark.parametrize('size', [1, 3, 8])
+def test_box_sum(gray, size):
+    assert_matches(imageops.box_sum(gray, size), reference_box_sum(gray, size))
+
+
+def test_diagonal_difference(gray):
+    assert_matches(imageops.diagonal_difference(gray), reference_diagonal_difference(gray))
+
+
+@pytest.mark.parametrize('size,step', [(1, 1), (3, 3), (5, 5), (4, 2), (6, 3), (7, 4)])
+def test_block_stats(gray, size, step):
+    stats = imageops.block_stats(gray, size, step)
+    for name, expected in reference_block_stats(gray, size, step).items():
+        assert_matches(getattr(stats, name), expected)
@@ -0,0 +1,62 @@
+"""Palettes are deterministic, and cached analyses follow the palette method"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import analysis_cache
+from palette import METHODS, extract_palette
+
+IMAGE_SHAPE = (60, 80, 3)
+
+
+def image():
+    return np.random.default_rng(11).integers(0, 256, IMAGE_SHAPE, dtype=np.uint8)
+
+
+def palettes():
+    """Every method's palette of image(), as JSON-comparable lists"""
+    pixels = image()
+    return {method: [extract_palette(pixels, 6, method).colors.tolist(),
+                     extract_palette(pixels, 6, method).weights.tolist()]
+            for method in METHODS}
+
+
+@pytest.mark.parametrize('method', list(METHODS))
+def test_same_image_twice_gives_same_palette(method):
+    first, second = extract_palette(image(), 6, method), extract_palette(image(), 6, method)
+
+    assert np.array_equal(first.colors, second.colors)
+    assert np.array_equal(first.weights, second.weights)
+
+
+def test_palette_is_the_same_in_another_process():
+    tests_dir = Path(__file__).resolve().parent
+    script = (f"import sys, json; sys.path[:0] = [{str(tests_dir.parent)!r}, {str(tests_dir)!r}]; "
+              "import test_palette; print(json.dumps(test_palette.palettes()))")
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+
+    assert json.loads(output) == json.loads(json.dumps(palettes()))
+
+
+def test_cached_style_vector_follows_palette_method(tmp_path, monkeypatch, png_bytes):
+    from style_vector import analyze_style_vector
+
+    monkeypatch.setenv('CONCIERTO_ANALYSIS_CACHE', str(tmp_path / 'analysis_cache.db'))
+    monkeypatch.setattr(analysis_cache, '_cache', None)
+    path = tmp_path / 'image.png'
+    path.write_bytes(png_bytes)
+
+    results = {}
+    for method in ('kmeans', 'median_cut', 'kmeans'):
+        monkeypatch.setenv('CONCIERTO_PALETTE_METHOD', method)
+        results[method] = analyze_style_vector(str(path))
+
+    stats = analysis_cache.analysis_cache().stats()
+    assert (stats['total_hits'], stats['total_misses']) == (1, 2)
+    monkeypatch.setenv('CONCIERTO_PALETTE_METHOD', 'median_cut')
+    assert analyze_style_vector.uncached(str(path)) == results['median_cut']
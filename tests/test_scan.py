@@ -0,0 +1,41 @@
+"""Incremental scans of content/images"""
+
+import asyncio
+import hashlib
+import threading
+
+import simple_server
+
+
+def test_upload_does_not_wait_for_scan_analysis(content_manager, png_bytes, monkeypatch, tmp_path):
+    release = threading.Event()
+
+    def slow_analysis(image_path, description=''):
+        release.wait(10)
+        return {'fields': {'style_analyzed': True}, 'errors': []}
+    monkeypatch.setattr(simple_server, 'analyze_image_fields', slow_analysis)
+    monkeypatch.setattr(simple_server, 'STYLE_VECTOR_AVAILABLE', True)
+    (content_manager.images_dir / 'scanned.png').write_bytes(png_bytes)
+
+    upload = tmp_path / 'upload.tmp'
+    upload.write_bytes(png_bytes + b'\0')
+
+    async def scan_and_upload():
+        scan = asyncio.create_task(content_manager.scan_images())
+        while content_manager.store.item_by_filename('scanned.png') is None:
+            await asyncio.sleep(0.01)
+        # The scan is waiting for analysis; uploads go ahead meanwhile
+        content_hash = hashlib.sha256(upload.read_bytes()).hexdigest()
+        results = await asyncio.wait_for(
+            content_manager.add_uploads([(upload, content_hash, 'upload.png')]), timeout=5)
+        assert not scan.done()
+        release.set()
+        return await scan, results
+
+    added, [(uploaded, is_new)] = asyncio.run(scan_and_upload())
+
+    assert added == 1 and is_new
+    assert content_manager.store.item_by_filename('scanned.png')['style_analyzed']
+    assert content_manager.get_item(uploaded['id'])['original_filename'] == 'upload.png'
+    # Neither is picked up again
+    assert asyncio.run(content_manager.scan_images()) == 0
@@ -0,0 +1,130 @@
+"""Static files and thumbnails over HTTP: access checks, caching and validators"""
+
+import asyncio
+import hashlib
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import simple_server
+from simple_server import IMMUTABLE_CACHE
+
+
+@pytest.fixture
+def image(content_manager, png_bytes):
+    """An image item in the library: (item, content hash)"""
+    content_hash = hashlib.sha256(png_bytes).hexdigest()
+    path = content_manager.images_dir / f'{content_hash[:16]}.png'
+    path.write_bytes(png_bytes)
+    content_manager.scan_index.record(path, content_hash)
+    item = {'id': 'img_1', 'type': 'image', 'filename': path.name,
+            'path': f'content/images/{path.name}', 'content_hash': content_hash}
+    content_manager.store.add_records('items', [item])
+    return item, content_hash
+
+
+def fetch(*requests):
+    """GET each (path, headers); returns [(status, headers, body)]"""
+    async def run():
+        async with TestClient(TestServer(simple_server.create_app())) as client:
+            responses = []
+            for path, headers in requests:
+                response = await client.get(path, headers=headers)
+                responses.append((response.status, response.headers, await response.read()))
+            return responses
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('path', ['/.env', '/content/.secret/key.txt', '/content/images/.hidden.png'])
+def test_dotfiles_are_blocked(content_manager, tmp_path, path):
+    target = tmp_path / path.lstrip('/')
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text('OPENAI_API_KEY=secret')
+
+    [(status, _, body)] = fetch((path, {}))
+
+    assert status == 403
+    assert b'secret' not in body
+
+
+# Encoded slashes, so the client doesn't normalize the dot segments away
+@pytest.mark.parametrize('path', ['/..%2Foutside.txt', '/content/..%2F..%2Foutside.txt',
+                                  '/content/images/..%2F..%2F..%2Foutside.txt'])
+def test_files_outside_the_server_directory_are_blocked(content_manager, tmp_path, path):
+    (tmp_path.parent / 'outside.txt').write_text('secret')
+
+    [(status, _, body)] = fetch((path, {}))
+
+    assert status == 403
+    assert b'secret' not in body
+
+
+def test_immutable_only_when_version_matches(image):
+    item, content_hash = image
+    responses = fetch((f"/{item['path']}?v={content_hash[:16]}", {}),
+                      (f"/{item['path']}?v={'0' * 16}", {}),
+                      (f"/{item['path']}", {}))
+
+    assert [status for status, _, _ in responses] == [200, 200, 200]
+    assert [headers['Cache-Control'] for _, headers, _ in responses] == [IMMUTABLE_CACHE, 'no-cache', 'no-cache']
+    assert responses[0][1]['Content-Type'] == 'image/png'
+
+
+def test_immutable_only_for_library_images(content_manager, tmp_path):
+    (tmp_path / 'notes.txt').write_text('hello')
+    digest = hashlib.sha256(b'hello').hexdigest()
+
+    [(status, headers, _)] = fetch((f'/notes.txt?v={digest[:16]}', {}))
+
+    assert (status, headers['Cache-Control']) == (200, 'no-cache')
+
+
+def test_range_and_conditional_requests(image, png_bytes):
+    item, _ = image
+    path = f"/{item['path']}"
+    [(_, headers, _)] = fetch((path, {}))
+    etag = headers['ETag']
+
+    (ranged, range_headers, body), (cached, _, empty), (changed, _, _) = fetch(
+        (path, {'Range': 'bytes=8-23'}),
+        (path, {'If-None-Match': etag}),
+        (path, {'If-None-Match': '"something-else"'}))
+
+    assert ranged == 206
+    assert body == png_bytes[8:24]
+    assert range_headers['Content-Range'] == f'bytes 8-23/{len(png_bytes)}'
+    assert (cached, empty) == (304, b'')
+    assert changed == 200
+
+
+def test_thumbnail_caching_follows_version(image):
+    item, content_hash = image
+    (first, first_headers, body), (stale, stale_headers, _) = fetch(
+        (f"/thumb/{item['id']}?w=32&format=jpeg&v={content_hash[:16]}", {}),
+        (f"/thumb/{item['id']}?w=32&format=jpeg&v={'0' * 16}", {}))
+
+    assert (first, stale) == (200, 200)
+    assert first_headers['Content-Type'] == 'image/jpeg' and body[:2] == b'\xff\xd8'
+    assert first_headers['Cache-Control'] == IMMUTABLE_CACHE
+    assert stale_headers['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('path', ['../outside.txt', '.env', 'content/data.json', '/etc/hostname'])
+def test_thumbnail_only_serves_library_images(content_manager, tmp_path, path):
+    (tmp_path.parent / 'outside.txt').write_text('secret')
+    (tmp_path / '.env').write_text('OPENAI_API_KEY=secret')
+    content_manager.store.add_records('items', [{'id': 'img_evil', 'type': 'image', 'path': path}])
+
+    [(status, _, body)] = fetch(('/thumb/img_evil', {}))
+
+    assert status == 403
+    assert b'secret' not in body
+
+
+def test_thumbnail_item_id_cannot_traverse(content_manager, tmp_path):
+    (tmp_path / '.env').write_text('OPENAI_API_KEY=secret')
+
+    [(status, _, body)] = fetch(('/thumb/..%2F.env', {}))
+
+    assert status == 404
+    assert b'secret' not in body
@@ -9,11 +9,13 @@ of inspiration sources for brand generation
 import numpy as np
 from PIL import Image, ImageEnhance
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-import colorsys
+from typing import Dict, List, Optional, Tuple, Union
 import json
 from datetime import datetime
 from deep_source_analyzer import DeepSourceAnalyzer
+from analysis_cache import cached_analysis
+from image_context import ImageContext
+import imageops
 
 class VibeMapper:
     """
@@ -58,27 +60,29 @@ class VibeMapper:
             }
         }
     
-    def map_vibe_intensity(self, image_path: str, description: str = "") -> Dict:
+    @cached_analysis('vibe', version=2)
+    def map_vibe_intensity(self, image_path: Union[str, ImageContext], description: str = "") -> Dict:
         """
         Create comprehensive vibe intensity mapping from source material
+        (image_path may be an ImageContext, shared with the deep analysis)
         
         Returns vibe spectrum with intensity scores across multiple dimensions
         """
         try:
-            # Get deep source analysis first
-            deep_analysis = self.deep_analyzer.analyze_source_material(image_path, description)
+            # Get deep source analysis first, on the same decoded image
+            context = ImageContext.of(image_path)
+            deep_analysis = self.deep_analyzer.analyze_source_material(context, description)
             
             if 'error' in deep_analysis:
                 return deep_analysis
             
-            # Load image for vibe analysis
-            img = Image.open(image_path).convert('RGB')
-            img_array = np.array(img)
+            img = context.image
+            img_array = context.rgb
             
             # Create comprehensive vibe mapping
             vibe_map = {
                 'analyzed_at': datetime.now().isoformat(),
-                'source_path': str(image_path),
+                'source_path': str(context),
                 'vibe_spectrum': self._analyze_vibe_spectrum(img, img_array, description),
                 'emotional_intensity': self._calculate_emotional_intensity(img, img_array),
                 'mood_indicators': self._detect_mood_indicators(img, img_array, deep_analysis),
@@ -130,22 +134,15 @@ class VibeMapper:
         """Calculate energy vibe intensity"""
         
         # Visual energy indicators
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Contrast energy (high contrast = high energy)
         contrast = np.std(gray) / 128
         
         # Color saturation energy
-        saturations = []
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
-        
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            _, s, _ = colorsys.rgb_to_hsv(r, g, b)
-            saturations.append(s)
+        saturations = ImageContext.of(img_array).sample_hsv(sample_size)[:, 1]
         
         color_energy = np.mean(saturations)
         
@@ -185,33 +182,19 @@ class VibeMapper:
     
     def _simple_edge_detection(self, gray: np.ndarray) -> np.ndarray:
         """Simple edge detection for analysis"""
-        kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-        kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
-        
-        edges = np.zeros_like(gray)
-        h, w = gray.shape
-        
-        for y in range(1, h-1):
-            for x in range(1, w-1):
-                region = gray[y-1:y+2, x-1:x+2]
-                gx = np.sum(region * kernel_x)
-                gy = np.sum(region * kernel_y)
-                edges[y, x] = np.sqrt(gx**2 + gy**2)
+        # An image's gray plane has its edges computed once, by its context
+        context = ImageContext.owner(gray)
+        if context is not None:
+            return context.sobel
         
-        return edges
+        return imageops.sobel_magnitude(gray)
     
     def _detect_directional_energy(self, edges: np.ndarray) -> float:
         """Detect directional motion energy"""
         h, w = edges.shape
         
         # Check for diagonal patterns (high energy)
-        diag_energy = 0
-        for y in range(1, h-1):
-            for x in range(1, w-1):
-                # Sample diagonal gradients
-                diag1 = abs(edges[y-1, x-1] - edges[y+1, x+1])
-                diag2 = abs(edges[y-1, x+1] - edges[y+1, x-1])
-                diag_energy += max(diag1, diag2)
+        diag_energy = imageops.diagonal_difference(edges).sum()
         
         # Normalize
         if h * w > 0:
@@ -294,18 +277,8 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        hues = []
-        saturations = []
-        values = []
-        
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            hue, sat, val = colorsys.rgb_to_hsv(r, g, b)
-            hues.append(hue)
-            saturations.append(sat)
-            values.append(val)
+        hsv = ImageContext.of(img_array).sample_hsv(sample_size)
+        hues, saturations, values = hsv[:, 0].tolist(), hsv[:, 1], hsv[:, 2]
         
         # Sophisticated colors: consistent saturation, harmonious hues, balanced values
         sat_consistency = 1 - np.var(saturations)  # Lower variance = more sophisticated
@@ -352,7 +325,7 @@ class VibeMapper:
     
     def _calculate_whitespace_sophistication(self, img_array: np.ndarray) -> float:
         """Calculate whitespace sophistication"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Consider bright areas as potential whitespace
         brightness_threshold = 200
@@ -369,7 +342,7 @@ class VibeMapper:
     
     def _calculate_visual_balance_sophistication(self, img_array: np.ndarray) -> float:
         """Calculate visual balance sophistication"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         h, w = gray.shape
         
         # Check quadrant balance
@@ -393,23 +366,19 @@ class VibeMapper:
     
     def _analyze_texture_sophistication(self, img_array: np.ndarray) -> float:
         """Analyze texture sophistication"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Smooth textures = high sophistication
         # Calculate local standard deviation (roughness)
         h, w = gray.shape
-        roughness_values = []
         
         window_size = min(h, w) // 20
         if window_size < 3:
             window_size = 3
         
-        for y in range(0, h-window_size, window_size):
-            for x in range(0, w-window_size, window_size):
-                window = gray[y:y+window_size, x:x+window_size]
-                roughness_values.append(np.std(window))
+        roughness_values = imageops.block_stats(gray, window_size).std
         
-        if roughness_values:
+        if roughness_values.size:
             avg_roughness = np.mean(roughness_values)
             # Lower roughness = higher sophistication
             return 1 - min(1.0, avg_roughness / 64)
@@ -420,24 +389,24 @@ class VibeMapper:
         """Analyze typography sophistication (simplified)"""
         # This is a placeholder - would need OCR for full analysis
         
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         edges = self._simple_edge_detection(gray)
         
         # Look for text-like patterns
         h, w = edges.shape
-        text_likelihood = 0
-        
-        # Check for horizontal line patterns (text)
-        for y in range(h):
-            row = edges[y, :]
-            if np.sum(row > np.mean(row)) > w * 0.1:  # Significant edges in row
-                text_likelihood += 1
+        text_likelihood = self._count_text_rows(edges)
         
         text_score = text_likelihood / h if h > 0 else 0
         
         # Assume moderate sophistication if text detected
         return 0.6 if text_score > 0.1 else 0.5
     
+    def _count_text_rows(self, edges: np.ndarray) -> int:
+        """Rows with significant edges (horizontal line patterns, like text)"""
+        w = edges.shape[1]
+        above_mean = np.sum(edges > np.mean(edges, axis=1, keepdims=True), axis=1)
+        return int(np.count_nonzero(above_mean > w * 0.1))
+    
     def _calculate_warmth_vibe(self, img: Image, img_array: np.ndarray) -> Dict:
         """Calculate warmth vibe intensity"""
         
@@ -484,17 +453,12 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        warm_count = 0
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel
-            
-            # Warm colors: reds, oranges, yellows
-            if r > g and r > b:  # Red dominant
-                warm_count += 1
-            elif r > b and g > b:  # Yellow/orange
-                warm_count += 1
+        r, g, b = ImageContext.of(img_array).sample(sample_size).T
+        
+        # Warm colors: reds, oranges, yellows
+        red_dominant = (r > g) & (r > b)
+        yellow_orange = (r > b) & (g > b)
+        warm_count = int(np.count_nonzero(red_dominant | yellow_orange))
         
         return warm_count / sample_size
     
@@ -518,7 +482,7 @@ class VibeMapper:
     
     def _analyze_compositional_warmth(self, img_array: np.ndarray) -> float:
         """Analyze compositional warmth"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         h, w = gray.shape
         
         # Warm compositions often have subjects closer to center
@@ -540,7 +504,7 @@ class VibeMapper:
     
     def _analyze_texture_warmth(self, img_array: np.ndarray) -> float:
         """Analyze texture warmth"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Smooth textures feel warmer than rough ones
         edges = self._simple_edge_detection(gray)
@@ -596,16 +560,8 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        saturations = []
-        brightnesses = []
-        
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            _, s, v = colorsys.rgb_to_hsv(r, g, b)
-            saturations.append(s)
-            brightnesses.append(v)
+        hsv = ImageContext.of(img_array).sample_hsv(sample_size)
+        saturations, brightnesses = hsv[:, 1], hsv[:, 2]
         
         # High saturation + high brightness = playful
         avg_saturation = np.mean(saturations)
@@ -615,7 +571,7 @@ class VibeMapper:
     
     def _analyze_compositional_playfulness(self, img_array: np.ndarray) -> float:
         """Analyze compositional playfulness"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         h, w = gray.shape
         
         # Asymmetry = more playful
@@ -633,7 +589,7 @@ class VibeMapper:
     
     def _analyze_movement_playfulness(self, img_array: np.ndarray) -> float:
         """Analyze movement playfulness"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         edges = self._simple_edge_detection(gray)
         
         # Curved, flowing edges = more playful than straight lines
@@ -648,7 +604,7 @@ class VibeMapper:
     
     def _analyze_contrast_playfulness(self, img_array: np.ndarray) -> float:
         """Analyze contrast playfulness"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # High contrast can be playful
         contrast = np.std(gray) / 128
@@ -710,23 +666,18 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        unnatural_count = 0
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            _, s, v = colorsys.rgb_to_hsv(r, g, b)
-            
-            # Very high saturation or very extreme values might indicate processing
-            if s > 0.9 or v > 0.95 or v < 0.05:
-                unnatural_count += 1
+        hsv = ImageContext.of(img_array).sample_hsv(sample_size)
+        s, v = hsv[:, 1], hsv[:, 2]
+        
+        # Very high saturation or very extreme values might indicate processing
+        unnatural_count = int(np.count_nonzero((s > 0.9) | (v > 0.95) | (v < 0.05)))
         
         # More natural colors = higher authenticity
         return 1 - (unnatural_count / sample_size)
     
     def _analyze_compositional_authenticity(self, img_array: np.ndarray) -> float:
         """Analyze compositional authenticity"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Perfect center composition might be less authentic
         h, w = gray.shape
@@ -749,7 +700,7 @@ class VibeMapper:
     def _analyze_lighting_authenticity(self, img_array: np.ndarray) -> float:
         """Analyze lighting authenticity"""
         # Natural lighting has more variation than artificial
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Calculate lighting variation across the image
         lighting_variance = np.var(gray) / (255**2)
@@ -764,7 +715,7 @@ class VibeMapper:
     
     def _analyze_texture_authenticity(self, img_array: np.ndarray) -> float:
         """Analyze texture authenticity"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Natural textures have irregular, organic patterns
         # Calculate local pattern regularity
@@ -861,7 +812,7 @@ class VibeMapper:
             unusual_ratio_score = 0.3
         
         # Composition innovation (breaking conventional rules)
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # Check for rule-breaking compositions
         edges = self._simple_edge_detection(gray)
@@ -901,13 +852,7 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        colors = []
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            hue, sat, val = colorsys.rgb_to_hsv(r, g, b)
-            colors.append((hue, sat, val))
+        colors = ImageContext.of(img_array).sample_hsv(sample_size).tolist()
         
         # Look for unusual color combinations
         innovation_score = 0
@@ -1025,7 +970,7 @@ class VibeMapper:
     
     def _calculate_visual_intensity(self, img_array: np.ndarray) -> float:
         """Calculate visual intensity"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         
         # High contrast = high intensity
         contrast = np.std(gray) / 128
@@ -1041,19 +986,13 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(1000, h * w)
         
-        saturations = []
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            _, s, _ = colorsys.rgb_to_hsv(r, g, b)
-            saturations.append(s)
+        saturations = ImageContext.of(img_array).sample_hsv(sample_size)[:, 1]
         
         return np.mean(saturations)
     
     def _calculate_composition_intensity(self, img_array: np.ndarray) -> float:
         """Calculate composition intensity"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         h, w = gray.shape
         
         # Asymmetry creates intensity
@@ -1104,7 +1043,7 @@ class VibeMapper:
                     mood_indicators['mood_elements']['luxury'] = 'high'
         
         # Add color mood analysis
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         brightness = np.mean(gray) / 255
         
         if brightness > 0.7:
@@ -1171,18 +1110,8 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(500, h * w)
         
-        hues = []
-        saturations = []
-        values = []
-        
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            hue, sat, val = colorsys.rgb_to_hsv(r, g, b)
-            hues.append(hue)
-            saturations.append(sat)
-            values.append(val)
+        hsv = ImageContext.of(img_array).sample_hsv(sample_size)
+        hues, saturations, values = hsv[:, 0], hsv[:, 1], hsv[:, 2]
         
         # Coherent palettes have consistent characteristics
         hue_consistency = 1 - min(1.0, np.std(hues) * 2)
@@ -1202,7 +1131,7 @@ class VibeMapper:
         desc_lower = description.lower()
         
         # Analyze image characteristics
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         brightness = np.mean(gray) / 255
         contrast = np.std(gray) / 128
         
@@ -1239,7 +1168,7 @@ class VibeMapper:
         }
         
         # Get visual characteristics
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         brightness = np.mean(gray) / 255
         contrast = np.std(gray) / 128
         
@@ -1247,19 +1176,11 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(500, h * w)
         
-        warm_colors = 0
-        saturations = []
+        hsv = ImageContext.of(img_array).sample_hsv(sample_size)
+        hues, saturations = hsv[:, 0], hsv[:, 1]
         
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            hue, sat, val = colorsys.rgb_to_hsv(r, g, b)
-            saturations.append(sat)
-            
-            # Warm colors (red, orange, yellow)
-            if (0 <= hue <= 0.17) or (0.92 <= hue <= 1.0):
-                warm_colors += 1
+        # Warm colors (red, orange, yellow)
+        warm_colors = int(np.count_nonzero(((0 <= hues) & (hues <= 0.17)) | ((0.92 <= hues) & (hues <= 1.0))))
         
         warm_ratio = warm_colors / sample_size
         avg_saturation = np.mean(saturations)
@@ -1402,7 +1323,7 @@ class VibeMapper:
             transferability += 0.2
         
         # Balanced compositions transfer better
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         h, w = gray.shape
         
         # Check visual balance
@@ -1451,7 +1372,7 @@ class VibeMapper:
         transferability = 0.5
         
         # Texture consistency
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         texture_variance = self._calculate_texture_variance(gray)
         
         if texture_variance < 0.5:  # Consistent texture
@@ -1461,15 +1382,9 @@ class VibeMapper:
         h, w = img_array.shape[:2]
         sample_size = min(500, h * w)
         
-        hues = []
-        for _ in range(sample_size):
-            y, x = np.random.randint(0, h), np.random.randint(0, w)
-            pixel = img_array[y, x]
-            r, g, b = pixel[0]/255, pixel[1]/255, pixel[2]/255
-            hue, _, _ = colorsys.rgb_to_hsv(r, g, b)
-            hues.append(hue)
+        hues = ImageContext.of(img_array).sample_hsv(sample_size)[:, 0]
         
-        if hues:
+        if hues.size:
             hue_consistency = 1 - min(1.0, np.std(hues))
             if hue_consistency > 0.7:
                 transferability += 0.2
@@ -1523,7 +1438,7 @@ class VibeMapper:
         return list(set(applications))  # Remove duplicates
 
 
-def map_vibe_intensity(image_path: str, description: str = "") -> Dict:
+def map_vibe_intensity(image_path: Union[str, ImageContext], description: str = "") -> Dict:
     """
     Simple integration function for vibe intensity mapping
     
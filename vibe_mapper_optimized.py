@@ -7,10 +7,12 @@ Fast emotional intensity quantification with simplified calculations
 import numpy as np
 from PIL import Image
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import colorsys
 from datetime import datetime
 from deep_source_analyzer_optimized import DeepSourceAnalyzerOptimized
+from analysis_cache import cached_analysis
+from image_context import ImageContext
 
 class VibeMapperOptimized:
     """
@@ -22,9 +24,11 @@ class VibeMapperOptimized:
         self.deep_analyzer = DeepSourceAnalyzerOptimized()
         self._cache = {}
         
-    def map_vibe_intensity(self, image_path: str, description: str = "") -> Dict:
+    @cached_analysis('vibe_optimized', version=2)
+    def map_vibe_intensity(self, image_path: Union[str, ImageContext], description: str = "") -> Dict:
         """
         Fast vibe intensity mapping with essential characteristics
+        (image_path may be an ImageContext, shared with the deep analysis)
         """
         try:
             # Check cache
@@ -33,22 +37,19 @@ class VibeMapperOptimized:
                 return self._cache[cache_key]
             
             # Get optimized deep analysis
-            deep_analysis = self.deep_analyzer.analyze_source_material(image_path, description)
+            context = ImageContext.of(image_path)
+            deep_analysis = self.deep_analyzer.analyze_source_material(context, description)
             
             if 'error' in deep_analysis:
                 return deep_analysis
             
-            # Load and downsample image
-            img = Image.open(image_path).convert('RGB')
-            if img.width > 256 or img.height > 256:
-                img.thumbnail((256, 256), Image.Resampling.LANCZOS)
-            
-            img_array = np.array(img)
+            # Downsample image
+            img_array = context.downscaled(256).rgb
             
             # Fast vibe mapping
             vibe_map = {
                 'analyzed_at': datetime.now().isoformat(),
-                'source_path': str(image_path),
+                'source_path': str(context),
                 'vibe_spectrum': self._analyze_vibe_spectrum_fast(img_array, description),
                 'emotional_intensity': self._calculate_emotional_intensity_fast(img_array),
                 'brand_personality_mapping': self._map_to_brand_personality_fast(img_array, description),
@@ -72,7 +73,7 @@ class VibeMapperOptimized:
         
         # Calculate once, use multiple times
         brightness = np.mean(img_array) / 255
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128
         
         # Sample colors efficiently
@@ -254,7 +255,7 @@ class VibeMapperOptimized:
     
     def _calculate_emotional_intensity_fast(self, img_array: np.ndarray) -> Dict:
         """Fast emotional intensity calculation"""
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128
         
         # Sample saturation quickly
@@ -286,7 +287,7 @@ class VibeMapperOptimized:
     def _map_to_brand_personality_fast(self, img_array: np.ndarray, description: str) -> Dict:
         """Fast brand personality mapping"""
         brightness = np.mean(img_array) / 255
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128
         
         personality = {
@@ -319,7 +320,7 @@ class VibeMapperOptimized:
         """Fast transferability assessment"""
         # Simple metrics for transferability
         brightness = np.mean(img_array) / 255
-        gray = np.mean(img_array, axis=2)
+        gray = ImageContext.of(img_array).gray
         contrast = np.std(gray) / 128
         
         # Good transferability = balanced properties
@@ -348,7 +349,7 @@ class VibeMapperOptimized:
         }
 
 
-def map_vibe_intensity_optimized(image_path: str, description: str = "") -> Dict:
+def map_vibe_intensity_optimized(image_path: Union[str, ImageContext], description: str = "") -> Dict:
     """
     Optimized vibe intensity mapping - fast and efficient
     """
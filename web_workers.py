@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Serving the dashboard from several processes.
+
+web.run_app() runs a single process, so every page, API call and event
+stream shared one event loop however many cores the machine had (only the
+image analysis itself ran in a process pool). `python simple_server.py
+--workers N` (or CONCIERTO_WEB_WORKERS=N) starts a supervisor instead, which
+
+- binds the listening socket once and hands it to N worker processes, each
+  running its own aiohttp app and accepting connections from it
+- creates the shared job board (content/jobs.db, see job_board.py) through
+  which workers queue, claim, track and cancel jobs and relay job events
+- restarts a worker that dies, failing the jobs it was running
+- splits the analysis pool between the workers unless
+  CONCIERTO_ANALYSIS_WORKERS is set
+- gives the workers a directory to publish their metrics to, so /metrics
+  on any of them reports the whole server (see metrics.py)
+
+Workers share the content store, which must be the SQLite backend: every
+worker's cached snapshot revalidates against the database on each read, so a
+write made by one worker is seen by the next request to any other. The other
+per-process caches need no invalidation messages: renders, brand cards and
+thumbnails are keyed by content, the analysis cache is itself a shared
+database, and the scan index is reloaded when another worker has saved it.
+Scans and uploads are serialized across workers with a ProcessLock.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import time
+from pathlib import Path
+from typing import Callable
+
+from aiohttp import web
+
+from analysis_executor import default_worker_count
+from job_board import JobBoard
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Interval between attempts to take a ProcessLock held by another process
+LOCK_RETRY_SECONDS = 0.05
+# A worker exiting this soon after it started is treated as a startup failure
+MIN_WORKER_UPTIME = 5
+SHUTDOWN_TIMEOUT = 10
+
+
+class ProcessLock:
+    """
+    asyncio lock that also excludes other processes (an flock on a lock file).
+    Waiting for another process polls, so cancelling a waiter is safe.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = asyncio.Lock()
+        self._fd = None
+
+    async def __aenter__(self):
+        await self._lock.acquire()
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                while FCNTL_AVAILABLE:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(LOCK_RETRY_SECONDS)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        fd, self._fd = self._fd, None
+        os.close(fd)   # releases the flock
+        self._lock.release()
+
+
+def web_worker_count(configured=None) -> int:
+    """Server processes to run: the --workers option, else CONCIERTO_WEB_WORKERS, else 1"""
+    if configured is None:
+        configured = os.getenv('CONCIERTO_WEB_WORKERS', '').strip() or 1
+    return max(1, int(configured))
+
+
+def listening_socket(host: str, port: int) -> socket.socket:
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(create_app: Callable[[], web.Application], sock: socket.socket):
+    web.run_app(create_app(), sock=sock, print=None)
+
+
+def serve(create_app: Callable[[], web.Application], host: str, port: int, workers: int,
+          content_dir="content"):
+    """
+    Run create_app() in `workers` processes sharing one listening socket,
+    until interrupted. create_app must be a module-level function: workers
+    are spawned fresh and import it again.
+    """
+    board = JobBoard.create(Path(content_dir) / "jobs.db")
+    os.environ['CONCIERTO_JOB_BOARD'] = str(board.path)
+    metrics_path = Path(content_dir) / "metrics"
+    shutil.rmtree(metrics_path, ignore_errors=True)
+    metrics_path.mkdir(parents=True)
+    os.environ['CONCIERTO_METRICS_DIR'] = str(metrics_path)
+    if not os.getenv('CONCIERTO_ANALYSIS_WORKERS', '').strip():
+        os.environ['CONCIERTO_ANALYSIS_WORKERS'] = str(max(1, default_worker_count() // workers))
+
+    sock = listening_socket(host, port)
+    # Spawned, not forked: each worker opens its own database connections
+    context = multiprocessing.get_context('spawn')
+
+    def start():
+        process = context.Process(target=_run_worker, args=(create_app, sock), daemon=False)
+        process.start()
+        process.started_at = time.monotonic()
+        return process
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    processes = [start() for _ in range(workers)]
+    print(f"🧵 Serving on http://{host}:{port} with {workers} worker processes "
+          f"({os.environ['CONCIERTO_ANALYSIS_WORKERS']} analysis processes each)")
+    try:
+        while True:
+            time.sleep(1)
+            for i, process in enumerate(processes):
+                if process.is_alive():
+                    continue
+                failed = board.fail_owner(process.pid, "Server worker exited")
+                print(f"⚠️ Worker {process.pid} exited with code {process.exitcode}"
+                      f"{f', failing {failed} running jobs' if failed else ''}")
+                if time.monotonic() - process.started_at < MIN_WORKER_UPTIME:
+                    print("❌ Worker failed at startup; stopping")
+                    return
+                processes[i] = start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()   # SIGTERM: aiohttp shuts down gracefully
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for process in processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        sock.close()
+        board.close()